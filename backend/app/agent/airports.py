@@ -1,19 +1,15 @@
-AIRPORTS = {
-    "paris": "CDG",
-    "bangkok": "BKK",
-    "lisbonne": "LIS",
-    "rome": "FCO",
-    "madrid": "MAD",
-    "barcelone": "BCN"
-}
+# Codes IATA: référentiel app/agent/data/gazetteer_full.json (voir app/agent/gazetteer.py)
+from app.agent.gazetteer import find_city
 
-import re
 
 def get_airport_code(city: str) -> str | None:
-    if not city:
+    """
+    Aéroport principal d'une ville (nom FR/EN, alias ou code IATA): "lisbonne" -> "LIS".
+    """
+    found = find_city(city)
+    if not found:
         return None
+    code = city.strip().upper()
+    # code d'aéroport explicite ("ORY") conservé, sinon aéroport principal
+    return code if code in found["airports"] else found["airports"][0]
 
-    city = city.lower()
-    city = re.sub(r"[^a-zàâçéèêëîïôûùüÿñæœ\-]", "", city)
-
-    return AIRPORTS.get(city)
@@ -0,0 +1,231 @@
+import os
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+# Budget de tokens du prompt de generate_answer (system + contexte), estimation ~3.5 caractères/token
+ANSWER_PROMPT_TOKEN_BUDGET = int(os.getenv("ANSWER_PROMPT_TOKEN_BUDGET", "700"))
+CHARS_PER_TOKEN = 3.5
+
+
+def estimate_tokens(text: str) -> int:
+    return int(len(text) / CHARS_PER_TOKEN) + 1
+
+
+def _dumps(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def _freshness(result: Dict[str, Any], out: Dict[str, Any]) -> Dict[str, Any]:
+    # scraped_at n'est utile que si la donnée vient du cache (règle du system prompt)
+    if result.get("cached"):
+        out["cached"] = True
+        out["scraped_at"] = result.get("scraped_at")
+    return out
+
+
+def _compact_flights(r: Dict[str, Any]) -> Dict[str, Any]:
+    out = {
+        "route": f"{r.get('origin')} -> {r.get('destination')}",
+        "dates": f"{r.get('depart_date')} / {r.get('return_date')}",
+        "price": r.get("cheapest_price"),
+        "source": r.get("url"),
+    }
+    fares = r.get("fares") or []
+    if len(fares) > 1:
+        # autres tarifs classés, en euros (3 max)
+        out["other_prices_eur"] = [f["price"] for f in fares[1:4]]
+    grid = [row for row in r.get("grid") or [] if row.get("price") is not None]
+    if len(grid) > 1:
+        # dates flexibles: les couples suivants les moins chers (3 max)
+        out["other_dates"] = [
+            {"dates": f"{row['depart_date']} / {row['return_date']}", "price_eur": row["price"]}
+            for row in grid[1:4]
+        ]
+    return _freshness(r, out)
+
+
+def _compact_hotels(r: Dict[str, Any]) -> Dict[str, Any]:
+    return _freshness(r, {
+        "city": r.get("city"),
+        "dates": f"{r.get('checkin')} / {r.get('checkout')}",
+        "min_price_eur": r.get("min_price_eur"),
+        "avg_price_eur": r.get("avg_price_eur"),
+        "source": r.get("url"),
+    })
+
+
+def _compact_weather(r: Dict[str, Any]) -> Dict[str, Any]:
+    return _freshness(r, {"now": r.get("raw"), "source": r.get("url")})
+
+
+COMPACTORS = {
+    "flights": _compact_flights,
+    "hotels": _compact_hotels,
+    "weather": _compact_weather,
+}
+
+
+def compact_tool_results(tool_results: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Ne garde que les champs utiles à la réponse (prix, dates, source).
+    Un tool en erreur devient "indisponible" (l'erreur brute n'aide pas le LLM).
+    """
+    out: Dict[str, Any] = {}
+    for name, compact in COMPACTORS.items():
+        result = (tool_results or {}).get(name)
+        if isinstance(result, dict) and result.get("status") == "ok":
+            out[name] = compact(result)
+        elif result is not None:
+            out[name] = "indisponible"
+    return out
+
+
+def compact_kb(kb_info: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if not kb_info:
+        return None
+    return {
+        "best_periods": kb_info.get("best_periods"),
+        "climate": kb_info.get("climate"),
+        "tips": list(kb_info.get("tips") or []),
+    }
+
+
+# Réductions appliquées dans l'ordre (de la moins utile à la plus utile) tant que le budget
+# est dépassé. Chaque fonction retourne True si elle a retiré quelque chose.
+def _keep_two_tips(c: Dict[str, Any]) -> bool:
+    kb = c.get("kb_info")
+    if not kb or len(kb.get("tips") or []) <= 2:
+        return False
+    kb["tips"] = kb["tips"][:2]
+    return True
+
+
+def _drop_tips(c: Dict[str, Any]) -> bool:
+    kb = c.get("kb_info")
+    return bool(kb) and kb.pop("tips", None) is not None
+
+
+def _drop_weather_source(c: Dict[str, Any]) -> bool:
+    weather = c.get("tool_results", {}).get("weather")
+    return isinstance(weather, dict) and weather.pop("source", None) is not None
+
+
+def _shorten_user_message(c: Dict[str, Any]) -> bool:
+    if len(c["user_message"]) <= 200:
+        return False
+    c["user_message"] = c["user_message"][:200]
+    return True
+
+
+def _drop_kb(c: Dict[str, Any]) -> bool:
+    return c.pop("kb_info", None) is not None
+
+
+REDUCTIONS = [
+    ("kb_tips_2", _keep_two_tips),
+    ("kb_tips", _drop_tips),
+    ("weather_source", _drop_weather_source),
+    ("user_message", _shorten_user_message),
+    ("kb_info", _drop_kb),
+]
+
+
+def build_answer_context(
+    user_message: str,
+    destination: Optional[str],
+    kb_info: Optional[Dict[str, Any]],
+    tool_results: Optional[Dict[str, Any]],
+    reserved_tokens: int = 0,
+    budget: int = ANSWER_PROMPT_TOKEN_BUDGET,
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Contexte JSON compact pour generate_answer, réduit jusqu'à tenir dans le budget.
+    - reserved_tokens: tokens déjà pris par le reste du prompt (system, consignes)
+    Retourne (context_json, stats) avec stats = {prompt_tokens_est, budget, trimmed}.
+    """
+    context: Dict[str, Any] = {"user_message": user_message, "destination": destination}
+    kb = compact_kb(kb_info)
+    if kb:
+        context["kb_info"] = kb
+    tools = compact_tool_results(tool_results)
+    if tools:
+        context["tool_results"] = tools
+
+    text = _dumps(context)
+    trimmed: List[str] = []
+    for label, reduce in REDUCTIONS:
+        if estimate_tokens(text) + reserved_tokens <= budget:
+            break
+        if reduce(context):
+            text = _dumps(context)
+            trimmed.append(label)
+
+    return text, {
+        "prompt_tokens_est": estimate_tokens(text) + reserved_tokens,
+        "budget": budget,
+        "trimmed": trimmed,
+    }
+
+
+TOOL_LABELS = {"flights": "vols", "hotels": "hôtels", "weather": "météo"}
+
+
+def template_answer(
+    destination: Optional[str],
+    kb_info: Optional[Dict[str, Any]],
+    tool_results: Optional[Dict[str, Any]],
+    omitted: Optional[List[str]] = None,
+) -> str:
+    """
+    Réponse sans LLM (échéance de la requête trop proche), à partir des mêmes données compactes.
+    - omitted: tools abandonnés à l'échéance, signalés à l'utilisateur
+    """
+    place = (destination or "ta destination").title()
+    lines = [f"Voici ce que j'ai pu rassembler pour {place} :"]
+
+    kb = compact_kb(kb_info)
+    if kb:
+        if kb.get("best_periods"):
+            lines.append(f"- Meilleures périodes : {', '.join(kb['best_periods'])}")
+        if kb.get("climate"):
+            lines.append(f"- Climat : {kb['climate']}")
+
+    tools = compact_tool_results(tool_results)
+    unavailable = [name for name, value in tools.items() if value == "indisponible"]
+    flights = tools.get("flights")
+    if isinstance(flights, dict) and flights.get("price") is not None:
+        lines.append(f"- Vols {flights['route']} ({flights['dates']}) : {flights['price']} ({flights['source']})")
+    hotels = tools.get("hotels")
+    if isinstance(hotels, dict) and hotels.get("min_price_eur") is not None:
+        lines.append(
+            f"- Hôtels ({hotels['dates']}) : dès {hotels['min_price_eur']} € la nuit, "
+            f"{hotels.get('avg_price_eur')} € en moyenne ({hotels['source']})"
+        )
+    weather = tools.get("weather")
+    if isinstance(weather, dict) and weather.get("now"):
+        lines.append(f"- Météo actuelle : {weather['now']}")
+
+    missing = [TOOL_LABELS.get(name, name) for name in [*(omitted or []), *unavailable]]
+    if len(lines) == 1:
+        lines = ["Je n'ai pas pu rassembler les informations à temps."]
+    if missing:
+        lines.append(f"(Indisponible pour le moment : {', '.join(dict.fromkeys(missing))}. Réessaie dans un instant.)")
+    return "\n".join(lines)
+
+
+def kb_suggestions_answer(suggestions: List[Tuple[str, Dict[str, Any]]], criteria: List[str]) -> str:
+    """
+    Réponse sans LLM à "où partir en avril ?": destinations de la KB qui remplissent les critères.
+    - suggestions: (nom affiché, fiche KB)
+    - criteria: critères lisibles ("en avril", "climat chaud", "plage")
+    """
+    lines = [f"Destinations conseillées ({', '.join(criteria)}) :"]
+    for name, info in suggestions:
+        line = f"- {name}"
+        if info.get("climate"):
+            line += f" : {info['climate']}"
+        if info.get("best_periods"):
+            line += f" (meilleures périodes : {', '.join(info['best_periods'])})"
+        lines.append(line)
+    lines.append("Dis-moi laquelle te tente et je regarde la météo, les vols ou les hôtels.")
+    return "\n".join(lines)
@@ -0,0 +1,110 @@
+import os
+import time
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Dict, Iterator, Optional, TypeVar
+
+# Délai de bout en bout d'une requête /agent/query (intention, décision, tools, réponse).
+# Les tâches asyncio héritent du contexte: chaque appel LLM / fetch lancé pendant la requête
+# voit la même échéance et borne son timeout au temps restant.
+AGENT_DEADLINE_SECONDS = float(os.getenv("AGENT_DEADLINE_SECONDS", "45"))
+AGENT_DEADLINE_MAX_SECONDS = float(os.getenv("AGENT_DEADLINE_MAX_SECONDS", "120"))
+# temps gardé pour la réponse finale: les tools sont coupés avant
+AGENT_ANSWER_RESERVE_SECONDS = float(os.getenv("AGENT_ANSWER_RESERVE_SECONDS", "8"))
+# en dessous, la réponse finale est rédigée sans LLM (template)
+AGENT_ANSWER_MIN_SECONDS = float(os.getenv("AGENT_ANSWER_MIN_SECONDS", "3"))
+
+_deadline: ContextVar[Optional[float]] = ContextVar("agent_deadline", default=None)
+
+T = TypeVar("T")
+
+
+class DeadlineExceeded(Exception):
+    """
+    Plus assez de temps avant l'échéance de la requête.
+    """
+
+
+def budget_for(requested: Optional[float]) -> float:
+    """
+    Délai effectif: celui demandé par le client (borné à AGENT_DEADLINE_MAX_SECONDS) ou le défaut.
+    """
+    if requested is None or requested <= 0:
+        return AGENT_DEADLINE_SECONDS
+    return min(requested, AGENT_DEADLINE_MAX_SECONDS)
+
+
+@contextmanager
+def request_deadline(seconds: float) -> Iterator[float]:
+    deadline = time.monotonic() + seconds
+    token = _deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _deadline.reset(token)
+
+
+def detach_deadline() -> None:
+    """
+    À appeler au début d'une tâche partagée entre requêtes (fetch single-flight, refresh en arrière-plan):
+    la tâche a copié le contexte de la requête qui l'a lancée et ne doit pas hériter de son échéance.
+    Le changement reste local au contexte de la tâche.
+    """
+    _deadline.set(None)
+
+
+def remaining() -> Optional[float]:
+    """
+    Secondes restantes avant l'échéance (peut être négatif), None hors requête agent.
+    """
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def tools_timeout() -> Optional[float]:
+    """
+    Temps laissé aux tools: le restant moins la réserve de la réponse finale
+    (au plus la moitié du restant, pour qu'un petit budget laisse quand même une chance aux tools).
+    """
+    left = remaining()
+    if left is None:
+        return None
+    return max(0.0, left - min(AGENT_ANSWER_RESERVE_SECONDS, left / 2))
+
+
+def clamp_timeout(timeout: float) -> float:
+    """
+    timeout borné au temps restant. Lève DeadlineExceeded si l'échéance est passée.
+    """
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded("request deadline exceeded")
+    return min(timeout, left)
+
+
+async def within_deadline(aw: Awaitable[T]) -> T:
+    """
+    Attend aw au plus jusqu'à l'échéance (les timeouts httpx sont par lecture, pas globaux).
+    """
+    left = remaining()
+    if left is None:
+        return await aw
+    if left <= 0:
+        if asyncio.iscoroutine(aw):
+            aw.close()
+        raise DeadlineExceeded("request deadline exceeded")
+    try:
+        return await asyncio.wait_for(aw, left)
+    except asyncio.TimeoutError as e:
+        raise DeadlineExceeded("request deadline exceeded") from e
+
+
+def deadline_info(budget: float) -> Dict[str, Any]:
+    left = remaining()
+    return {
+        "budget_seconds": budget,
+        "remaining_seconds": round(left, 2) if left is not None else None,
+    }
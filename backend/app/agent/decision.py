@@ -1,5 +1,123 @@
+from typing import Any, Dict, List, Optional
+
+# listes ré-exportées pour compatibilité (source: app/agent/keywords.py)
+from app.agent.keywords import WEATHER_KEYWORDS, FLIGHT_KEYWORDS, HOTEL_KEYWORDS, KB_KEYWORDS  # noqa: F401
+from app.agent.matcher import match_message
+
+TOOL_KEYWORDS = {
+    "weather": WEATHER_KEYWORDS,
+    "flights": FLIGHT_KEYWORDS,
+    "hotels": HOTEL_KEYWORDS,
+}
+
+OVERRIDE_REASONS = {
+    "weather": "Rule-based override: user asked for current weather",
+    "flights": "Rule-based override: user asked for flights/prices",
+    "hotels": "Rule-based override: user asked for hotels/accommodation",
+}
+
+
 def needs_weather_info(message: str) -> bool:
-    keywords = ["météo", "temps", "aujourd'hui", "actuel", "maintenant"]
-    message = message.lower()
+    return match_message(message).has("weather_info")
+
+
+def keyword_tools(message: str) -> List[str]:
+    """
+    Tools explicitement demandés par mots-clés, dans l'ordre weather, flights, hotels.
+    """
+    matches = match_message(message)
+    return [name for name in TOOL_KEYWORDS if matches.has(name)]
+
+
+def _tool_call(name: str, destination: str, origin: Optional[str], month: Optional[str]) -> Dict[str, Any]:
+    if name == "weather":
+        return {"name": "weather", "params": {"city": destination}}
+    if name == "hotels":
+        return {"name": "hotels", "params": {"city": destination, "month": month}}
+    return {"name": "flights", "params": {"from": origin, "to": destination, "month": month}}
+
+
+def decide_tools_rules(
+    message: str,
+    destination: Optional[str],
+    kb_info: Optional[Dict[str, Any]],
+    origin: Optional[str] = None,
+    month: Optional[str] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Décision déterministe tool/no-tool, même format que llm.decide_tools.
+    Retourne None si les règles ne suffisent pas (il faut alors demander au LLM).
+    """
+    if not destination:
+        return {"use_tools": False, "tools": [], "reason": "No destination detected"}
+
+    tools = keyword_tools(message)
+    if tools:
+        return {
+            "use_tools": True,
+            "tools": [_tool_call(name, destination, origin, month) for name in tools],
+            "reason": "Rule-based: user asked for " + ", ".join(tools),
+        }
+
+    if kb_info and match_message(message).has("kb"):
+        return {"use_tools": False, "tools": [], "reason": "Rule-based: period/climate/tips answered from KB"}
+
+    return None
+
+
+def apply_keyword_overrides(llm_decision: Dict[str, Any], message: str, destination: Optional[str]) -> Dict[str, Any]:
+    """
+    Complète une décision LLM avec les tools demandés explicitement par mots-clés.
+    """
+    if not destination:
+        return llm_decision
+
+    for name in keyword_tools(message):
+        if not llm_decision.get("use_tools"):
+            llm_decision["use_tools"] = True
+            llm_decision["tools"] = [{"name": name, "params": {}}]
+            llm_decision["reason"] = OVERRIDE_REASONS[name]
+        elif not any(t.get("name") == name for t in llm_decision.get("tools", [])):
+            llm_decision["tools"].append({"name": name, "params": {}})
+            llm_decision["reason"] = (llm_decision.get("reason", "") + f" + {name} override").strip()
+
+    return llm_decision
+
+
+def decide_tools_from_analysis(
+    analysis: Dict[str, Any],
+    destination: Optional[str],
+    origin: Optional[str] = None,
+    month: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Décision au format decide_tools à partir de llm.analyze_message (mode structured).
+    """
+    if not destination:
+        return {"use_tools": False, "tools": [], "reason": "No destination detected"}
+
+    tools = [name for name in analysis.get("tools", []) if name in TOOL_KEYWORDS]
+    return {
+        "use_tools": bool(tools),
+        "tools": [_tool_call(name, destination, origin, month) for name in tools],
+        "reason": "Structured LLM analysis",
+    }
+
 
-    return any(word in message for word in keywords)
+def decide_tools_from_session(
+    tools: List[str],
+    destination: Optional[str],
+    origin: Optional[str] = None,
+    month: Optional[str] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Reprend les tools d'un tour précédent resté en attente de clarification
+    (la réponse "Paris" ou "en mai" complète un slot, pas besoin de redécider).
+    """
+    if not destination or not tools:
+        return None
+    return {
+        "use_tools": True,
+        "tools": [_tool_call(name, destination, origin, month) for name in tools if name in TOOL_KEYWORDS],
+        "reason": "Session: clarification answered, pending tools resumed",
+    }
@@ -0,0 +1,43 @@
+import os
+from typing import Any, Dict
+
+from app.mcp.service import TOOLS, run_tool, run_flights_batch
+from app.mcp.tools.http_client import http_post
+
+# local  = appel direct des tools dans le process, via le cache MCP (défaut)
+# remote = POST vers un serveur MCP qui tourne ailleurs (MCP_BASE_URL)
+MCP_MODE = os.getenv("MCP_MODE", "local").strip().lower()
+MCP_BASE_URL = os.getenv("MCP_BASE_URL", "http://127.0.0.1:8000").rstrip("/")
+
+# timeouts HTTP du mode remote (les scrapers ont leurs propres timeouts)
+TOOL_TIMEOUTS = {"weather": 20, "flights": 45, "hotels": 45, "flights_batch": 90}
+
+# tools composés: name -> (chemin sous /mcp, fonction locale)
+COMPOSITE_TOOLS = {"flights_batch": ("flights/batch", run_flights_batch)}
+
+
+async def _call_remote(name: str, payload: Dict[str, Any]) -> Any:
+    path = COMPOSITE_TOOLS[name][0] if name in COMPOSITE_TOOLS else name
+    resp = await http_post(
+        f"{MCP_BASE_URL}/mcp/{path}",
+        json=payload,
+        timeout=TOOL_TIMEOUTS.get(name, 45)
+    )
+    resp.raise_for_status()
+    return resp.json()
+
+
+async def call_tool(name: str, payload: Dict[str, Any]) -> Any:
+    """
+    Appelle un tool MCP.
+    - name: weather | flights | hotels | flights_batch
+    - payload: même format que POST /mcp/<name> (ex: {"from": "CDG", "to": "BKK", "month": "2026-03"})
+    """
+    if name not in TOOLS and name not in COMPOSITE_TOOLS:
+        raise ValueError(f"Unknown MCP tool: {name}")
+
+    if MCP_MODE == "remote":
+        return await _call_remote(name, payload)
+    if name in COMPOSITE_TOOLS:
+        return await COMPOSITE_TOOLS[name][1](payload)
+    return await run_tool(name, payload)
@@ -0,0 +1,74 @@
+import time
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.metrics import AGENT_TOOL_SECONDS, record_timing
+
+# erreur des tools encore en cours à l'expiration du timeout (abandonnés)
+TOOL_TIMEOUT_ERROR = "deadline exceeded"
+
+
+async def run_tools_concurrently(
+    calls: Dict[str, Callable[[], Awaitable[Any]]],
+    on_start: Optional[Callable[[str], None]] = None,
+    on_finish: Optional[Callable[[str, Optional[str]], None]] = None,
+    timeout: Optional[float] = None,
+) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    Lance tous les tools en même temps et attend le plus lent.
+    - calls: {"weather": <coroutine function sans argument>, ...}
+    - on_start(name) / on_finish(name, error|None): hooks de progression optionnels
+    - timeout: au-delà, les tools pas encore terminés sont annulés (erreur TOOL_TIMEOUT_ERROR)
+    Retourne (results, errors): une erreur d'un tool n'interrompt pas les autres.
+    """
+    if not calls:
+        return {}, {}
+
+    async def _run(name: str):
+        if on_start:
+            on_start(name)
+        start = time.perf_counter()
+        status = "omitted"  # annulé au timeout
+        try:
+            result = await calls[name]()
+        except Exception as e:
+            status = "error"
+            if on_finish:
+                on_finish(name, str(e))
+            raise
+        else:
+            status = result.get("status", "ok") if isinstance(result, dict) else "ok"
+        finally:
+            elapsed = time.perf_counter() - start
+            AGENT_TOOL_SECONDS.observe(elapsed, tool=name, status=status)
+            record_timing(f"tool.{name}", elapsed)
+        if on_finish:
+            on_finish(name, None)
+        return result
+
+    tasks = {name: asyncio.create_task(_run(name)) for name in calls}
+    try:
+        _, pending = await asyncio.wait(tasks.values(), timeout=max(timeout, 0.0) if timeout is not None else None)
+    except BaseException:
+        # requête annulée: on n'abandonne pas les tools en arrière-plan
+        for task in tasks.values():
+            task.cancel()
+        raise
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    results: Dict[str, Any] = {}
+    errors: Dict[str, str] = {}
+    for name, task in tasks.items():
+        if task in pending:
+            errors[name] = TOOL_TIMEOUT_ERROR
+            if on_finish:
+                on_finish(name, TOOL_TIMEOUT_ERROR)
+        elif task.exception() is not None:
+            errors[name] = str(task.exception())
+        else:
+            results[name] = task.result()
+
+    return results, errors
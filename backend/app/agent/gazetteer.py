@@ -0,0 +1,195 @@
+import os
+import json
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.agent.text import normalize
+
+# Référentiel villes / aéroports (noms FR/EN, alias, codes IATA, métropoles multi-aéroports).
+# data/gazetteer_full.json (milliers de villes) est généré par scripts/build_gazetteer.py
+# à partir de data/gazetteer.json (villes de base, noms FR, kayak_stay) et d'une liste d'aéroports.
+# Un autre fichier (même format) via GAZETTEER_PATH.
+GAZETTEER_PATH = os.getenv("GAZETTEER_PATH", str(Path(__file__).parent / "data" / "gazetteer_full.json"))
+
+# Recherche approchée: distance d'édition max selon la longueur du mot (fautes de frappe).
+# Mots courts exclus: trop de mots courants à une lettre d'une ville ("cuire" / Le Caire, "porte" / Porto).
+FUZZY_MIN_LENGTH = 6
+FUZZY_LONG_LENGTH = 9
+
+_IATA_RE = re.compile(r"^[A-Z]{3}$")
+
+
+def _max_distance(key: str) -> int:
+    if len(key) < FUZZY_MIN_LENGTH:
+        return 0
+    return 1 if len(key) < FUZZY_LONG_LENGTH else 2
+
+
+class _Node:
+    __slots__ = ("children", "ids")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.ids: List[str] = []
+
+
+class Gazetteer:
+    """
+    Index des villes:
+    - _by_key: nom/alias normalisé (sans accents) -> ids de ville
+    - _by_iata: code aéroport ou métropole -> id de ville
+    - _trie: mêmes clés en trie, pour la complétion par préfixe et la recherche approchée
+    """
+
+    def __init__(self, cities: Iterable[Dict[str, Any]]):
+        self._cities: Dict[str, Dict[str, Any]] = {}
+        self._by_key: Dict[str, List[str]] = {}
+        self._by_iata: Dict[str, str] = {}
+        self._trie = _Node()
+
+        for city in cities:
+            city_id = city["id"]
+            self._cities[city_id] = city
+            for name in [city_id, city.get("fr"), city.get("en"), *city.get("aliases", [])]:
+                key = normalize(name or "")
+                if key:
+                    self._index(key, city_id)
+            for code in [city.get("metro"), *city.get("airports", [])]:
+                # le premier qui déclare un code le garde (ex: KIX -> osaka, pas kyoto)
+                if code and code not in self._by_iata:
+                    self._by_iata[code] = city_id
+
+    @classmethod
+    def load(cls, path: str) -> "Gazetteer":
+        # pas de repli sur le référentiel de base: sans le fichier complet, l'app ne démarre pas
+        if not Path(path).is_file():
+            raise FileNotFoundError(
+                f"référentiel introuvable: {path} "
+                "(python scripts/build_gazetteer.py airports.csv app/agent/data/gazetteer_full.json)"
+            )
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["cities"])
+
+    def _index(self, key: str, city_id: str) -> None:
+        ids = self._by_key.setdefault(key, [])
+        if city_id in ids:
+            return
+        ids.append(city_id)
+        node = self._trie
+        for ch in key:
+            node = node.children.setdefault(ch, _Node())
+        node.ids.append(city_id)
+
+    def __len__(self) -> int:
+        return len(self._cities)
+
+    def get(self, city_id: str) -> Optional[Dict[str, Any]]:
+        return self._cities.get(city_id)
+
+    def names(self) -> List[str]:
+        """
+        Toutes les clés normalisées (noms + alias), pour app/agent/matcher.py.
+        """
+        return list(self._by_key)
+
+    def by_iata(self, code: str) -> Optional[Dict[str, Any]]:
+        city_id = self._by_iata.get((code or "").strip().upper())
+        return self._cities.get(city_id) if city_id else None
+
+    def lookup(self, name: str, fuzzy: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Ville par id, nom FR/EN, alias, code IATA ("CDG", "PAR") ou, à défaut, nom approché.
+        """
+        if not name:
+            return None
+        raw = name.strip()
+        if _IATA_RE.match(raw):
+            city = self.by_iata(raw)
+            if city:
+                return city
+        key = normalize(raw)
+        ids = self._by_key.get(key)
+        if ids:
+            return self._cities[ids[0]]
+        if len(key) == 3 and key.isalpha():
+            # code IATA extrait en minuscules ("vol cdg -> bkk")
+            city = self.by_iata(key)
+            if city:
+                return city
+        return self.fuzzy(key) if fuzzy else None
+
+    def complete(self, prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Villes dont un nom/alias commence par prefix (ordre alphabétique des clés).
+        """
+        node = self._trie
+        for ch in normalize(prefix or ""):
+            node = node.children.get(ch)
+            if node is None:
+                return []
+
+        out: List[str] = []
+        stack = [node]
+        while stack and len(out) < limit:
+            current = stack.pop()
+            for city_id in current.ids:
+                if city_id not in out:
+                    out.append(city_id)
+            stack.extend(current.children[ch] for ch in sorted(current.children, reverse=True))
+        return [self._cities[city_id] for city_id in out[:limit]]
+
+    def fuzzy(self, key: str, max_distance: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Nom le plus proche à distance d'édition <= max_distance (Levenshtein sur le trie:
+        une ligne de la matrice par nœud, branche abandonnée dès que la ligne dépasse le seuil).
+        La première lettre doit être juste: seul son sous-arbre est parcouru.
+        Retourne None si rien d'assez proche ou si deux villes différentes sont à égalité.
+        """
+        key = normalize(key or "")
+        if max_distance is None:
+            max_distance = _max_distance(key)
+        if not key or max_distance <= 0:
+            return None
+
+        root = self._trie.children.get(key[0])
+        if root is None:
+            return None
+
+        best: Dict[str, int] = {}
+        first_row = list(range(len(key) + 1))
+        stack = [(root, key[0], first_row)]
+        while stack:
+            node, ch, prev = stack.pop()
+            row = [prev[0] + 1]
+            for i in range(1, len(key) + 1):
+                cost = 0 if key[i - 1] == ch else 1
+                row.append(min(row[i - 1] + 1, prev[i] + 1, prev[i - 1] + cost))
+            if row[-1] <= max_distance:
+                for city_id in node.ids:
+                    best[city_id] = min(best.get(city_id, row[-1]), row[-1])
+            if min(row) <= max_distance:
+                stack.extend((child, nxt, row) for nxt, child in node.children.items())
+
+        if not best:
+            return None
+        ranked = sorted(best.items(), key=lambda item: item[1])
+        if len(ranked) > 1 and ranked[0][1] == ranked[1][1]:
+            return None
+        return self._cities[ranked[0][0]]
+
+
+GAZETTEER = Gazetteer.load(GAZETTEER_PATH)
+
+
+def find_city(name: str, fuzzy: bool = True) -> Optional[Dict[str, Any]]:
+    return GAZETTEER.lookup(name, fuzzy=fuzzy)
+
+
+def city_id(name: str, fuzzy: bool = True) -> Optional[str]:
+    """
+    Id canonique (nom français sans accents, clé de la KB): "Lisbon" -> "lisbonne".
+    """
+    city = find_city(name, fuzzy=fuzzy)
+    return city["id"] if city else None
@@ -1,62 +1,165 @@
-KB = {
-    "destinations": {
-        "lisbonne": {
-            "best_periods": ["mars", "avril", "mai"],
-            "climate": "doux et ensoleillé",
-            "tips": [
-                "Ville très marchable",
-                "Transports publics abordables",
-                "Printemps idéal pour éviter la foule"
-            ]
-        },
-        "paris": {
-            "best_periods": ["mai", "juin", "septembre"],
-            "climate": "tempéré",
-            "tips": [
-                "Éviter août pour les fermetures",
-                "Beaucoup de musées gratuits certains jours",
-                "Printemps et automne plus agréables"
-            ]
-        },
-        "rome": {
-            "best_periods": ["avril", "mai", "septembre", "octobre"],
-            "climate": "méditerranéen",
-            "tips": [
-                "Été très chaud",
-                "Beaucoup de sites à pied",
-                "Réserver les monuments à l’avance"
-            ]
-        },
-        "madrid": {
-            "best_periods": ["avril", "mai", "septembre"],
-            "climate": "sec et chaud",
-            "tips": [
-                "Été caniculaire",
-                "Ville animée toute l’année",
-                "Musées majeurs concentrés"
-            ]
-        },
-        "barcelone": {
-            "best_periods": ["mai", "juin", "septembre"],
-            "climate": "méditerranéen",
-            "tips": [
-                "Mélange plage et culture",
-                "Éviter août pour la foule",
-                "Transports très efficaces"
-            ]
-        },
-        "bangkok": {
-            "best_periods": ["novembre", "décembre", "janvier", "février"],
-            "climate": "tropical",
-            "tips": [
-                "Éviter la saison des pluies",
-                "Ville très dense",
-                "Climatisation omniprésente"
-            ]
-        }
-    }
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.agent.gazetteer import city_id
+from app.agent.text import normalize
+
+# Base de connaissances destinations (meilleures périodes, climat, tags, conseils), un objet par ligne.
+# Ids = ids du référentiel app/agent/gazetteer.py. Un autre fichier (même format) via KB_PATH.
+# Chargée au premier accès, index (mois, climat, tag) construits à la première recherche.
+KB_PATH = os.getenv("KB_PATH", str(Path(__file__).parent / "data" / "kb.json"))
+
+MONTH_NUMBERS = {
+    "janvier": 1, "fevrier": 2, "mars": 3, "avril": 4, "mai": 5, "juin": 6,
+    "juillet": 7, "aout": 8, "septembre": 9, "octobre": 10, "novembre": 11, "decembre": 12,
 }
+MONTH_NAMES = {n: name for name, n in MONTH_NUMBERS.items()}
+
+# mots des descriptions de climat non indexés ("sec et chaud" -> "sec", "chaud")
+_CLIMATE_STOPWORDS = {"et", "ou", "tres", "assez", "plutot"}
+_MONTH_RE = re.compile(r"^(?:\d{4}-)?(\d{1,2})(?:-\d{2}(?:/.*)?)?$")
+
+
+def month_number(month: Optional[str]) -> Optional[int]:
+    """
+    "avril", "Avril", "2026-04", "04", "2026-04-02/2026-04-09" -> 4.
+    """
+    if not month:
+        return None
+    key = normalize(month)
+    if key in MONTH_NUMBERS:
+        return MONTH_NUMBERS[key]
+    match = _MONTH_RE.match(month.strip())
+    if match and 1 <= int(match.group(1)) <= 12:
+        return int(match.group(1))
+    return None
+
+
+class KnowledgeBase:
+    """
+    - _destinations: id -> fiche (best_periods, climate, tags, tips), dans l'ordre du fichier
+    - _by_month: numéro de mois -> ids
+    - _by_climate: climat normalisé et chacun de ses mots -> ids
+    - _by_tag: tag normalisé -> ids
+    Les ids des index sont des dict ordonnés (ordre du fichier, appartenance en O(1)):
+    une recherche ne parcourt que la plus petite liste de candidats.
+    """
+
+    def __init__(self, destinations: Iterable[Dict[str, Any]]):
+        self._destinations: Dict[str, Dict[str, Any]] = {}
+        for entry in destinations:
+            info = {k: v for k, v in entry.items() if k != "id"}
+            self._destinations[entry["id"]] = info
+        self._by_month: Optional[Dict[int, Dict[str, None]]] = None
+        self._by_climate: Dict[str, Dict[str, None]] = {}
+        self._by_tag: Dict[str, Dict[str, None]] = {}
+
+    @classmethod
+    def load(cls, path: str) -> "KnowledgeBase":
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        return cls(data["destinations"])
+
+    def __len__(self) -> int:
+        return len(self._destinations)
+
+    def get(self, destination_id: str) -> Optional[Dict[str, Any]]:
+        return self._destinations.get(destination_id)
+
+    def _build_indexes(self) -> None:
+        by_month: Dict[int, Dict[str, None]] = {}
+        keys: Dict[str, str] = {}  # climats et tags se répètent: normalize une fois par valeur
+        for dest_id, info in self._destinations.items():
+            for month in info.get("best_periods") or []:
+                n = month_number(month)
+                if n:
+                    by_month.setdefault(n, {})[dest_id] = None
+            climate = info.get("climate") or ""
+            if climate not in keys:
+                keys[climate] = normalize(climate)
+            if keys[climate]:
+                key = keys[climate]
+                for word in [key, *(w for w in key.split() if w not in _CLIMATE_STOPWORDS)]:
+                    self._by_climate.setdefault(word, {})[dest_id] = None
+            for tag in info.get("tags") or []:
+                if tag not in keys:
+                    keys[tag] = normalize(tag)
+                if keys[tag]:
+                    self._by_tag.setdefault(keys[tag], {})[dest_id] = None
+        self._by_month = by_month
+
+    def _indexes(self) -> None:
+        if self._by_month is None:
+            self._build_indexes()
+
+    def climates(self) -> List[str]:
+        self._indexes()
+        return list(self._by_climate)
+
+    def tags(self) -> List[str]:
+        self._indexes()
+        return list(self._by_tag)
+
+    def search(self, month: Optional[str] = None, climate: Optional[str] = None, tag: Optional[str] = None) -> List[str]:
+        """
+        Ids des destinations qui remplissent tous les critères donnés (ordre du fichier).
+        month: nom français ou "YYYY-MM"; climate: climat ou un de ses mots ("chaud"); tag: "plage"...
+        """
+        self._indexes()
+        criteria = []
+        if month is not None:
+            criteria.append(self._by_month.get(month_number(month), {}))
+        if climate is not None:
+            criteria.append(self._by_climate.get(normalize(climate), {}))
+        if tag is not None:
+            criteria.append(self._by_tag.get(normalize(tag), {}))
+        if not criteria:
+            return list(self._destinations)
+        criteria.sort(key=len)
+        smallest = criteria[0]
+        if len(criteria) == 1:
+            return list(smallest)
+        common = smallest.keys()
+        for ids in criteria[1:]:
+            common = common & ids.keys()
+        return [dest_id for dest_id in smallest if dest_id in common]
+
+    def match_terms(self, message: str) -> Dict[str, Optional[str]]:
+        """
+        Climat et tag cités dans le message ("une plage au chaud" -> climate "chaud", tag "plage").
+        """
+        self._indexes()
+        words = normalize(message or "").split()
+        found: Dict[str, Optional[str]] = {"climate": None, "tag": None}
+        for n in (2, 1):
+            for i in range(len(words) - n + 1):
+                key = " ".join(words[i:i + n])
+                if found["climate"] is None and key in self._by_climate:
+                    found["climate"] = key
+                if found["tag"] is None and key in self._by_tag:
+                    found["tag"] = key
+        return found
+
+
+_kb: Optional[KnowledgeBase] = None
+
+
+def get_kb() -> KnowledgeBase:
+    global _kb
+    if _kb is None:
+        _kb = KnowledgeBase.load(KB_PATH)
+    return _kb
+
+
 def get_destination_info(destination: str):
     if not destination:
         return None
-    return KB["destinations"].get(destination.lower())
+    # "Lisbon", "lisboa" -> "lisbonne" (ids du référentiel app/agent/gazetteer.py)
+    key = city_id(destination) or destination.lower()
+    return get_kb().get(key)
+
+
+def destinations_for(month: Optional[str] = None, climate: Optional[str] = None, tag: Optional[str] = None) -> List[str]:
+    return get_kb().search(month=month, climate=climate, tag=tag)
@@ -0,0 +1,36 @@
+# Listes de mots-clés des règles (intention, décision tools, parsing).
+# Elles sont compilées une seule fois dans app/agent/matcher.py.
+
+SMALL_TALK_PATTERNS = [
+    "bonjour", "salut", "hello", "bonsoir",
+    "ça va", "comment ça va", "merci", "merci beaucoup",
+    "au revoir", "a bientôt", "à bientôt",
+    "tu es qui", "qui es-tu", "comment tu t'appelles",
+]
+
+# réponses courtes "ok", "super"... (mots entiers)
+ACK_WORDS = ["ok", "super", "cool", "merci", "top"]
+
+# Verbes / mots-clés "métier" (voyage)
+TRAVEL_KEYWORDS = [
+    "partir", "voyage", "voyager", "aller", "visiter", "destination",
+    "vol", "vols", "avion", "train", "bus",
+    "hotel", "hôtel", "logement", "hébergement",
+    "météo", "temps", "budget", "prix", "réserver", "reservation", "réservation",
+    "itinéraire", "itineraire", "dates", "mois","météo", "temps", "climat","meteo",
+]
+
+# Mots-clés qui imposent un tool
+WEATHER_KEYWORDS = ["météo", "meteo", "temps", "aujourd", "actuel", "actuelle", "maintenant", "prévision", "prevision"]
+FLIGHT_KEYWORDS = ["vol", "vols", "billet", "billets", "avion", "aéroport", "aeroport", "prix"]
+HOTEL_KEYWORDS = ["hotel", "hôtel", "logement", "hébergement", "hebergement", "nuit", "nuits", "booking"]
+
+# Questions auxquelles la KB répond seule (période, climat, conseils)
+KB_KEYWORDS = [
+    "quand", "meilleure période", "meilleure periode", "période", "periode", "saison",
+    "climat", "conseil", "conseils", "astuce", "astuces", "que faire", "à voir", "a voir",
+]
+
+WEATHER_INFO_KEYWORDS = ["météo", "temps", "aujourd'hui", "actuel", "maintenant"]
+
+PERIOD_KEYWORDS = ["quand", "meilleure période", "partir", "voyager", "aller"]
@@ -1,30 +1,57 @@
 import os
 import json
 import re
-import requests
-from typing import Optional, Dict, Any, List
+import time
+import httpx
+from typing import Optional, Dict, Any, AsyncIterator, List, Tuple
+
+from app.agent.ollama_client import OllamaClient
+from app.agent.intent import _normalize
+from app.agent.memo import memoize_llm
+from app.agent.context import build_answer_context, estimate_tokens
+from app.agent.deadline import DeadlineExceeded, clamp_timeout, remaining, within_deadline
+from app.metrics import LLM_CALL_SECONDS, LLM_CALLS_IN_FLIGHT, LLM_FALLBACKS
 
 OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434").rstrip("/")
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "qwen2.5:1.5b")
 OLLAMA_TEMPERATURE = float(os.getenv("OLLAMA_TEMPERATURE", "0.2"))
-OLLAMA_TIMEOUT_SECONDS = int(os.getenv("OLLAMA_TIMEOUT_SECONDS", "120"))
+OLLAMA_TIMEOUT_SECONDS = int(os.getenv("OLLAMA_TIMEOUT_SECONDS", "120"))  # timeout de lecture
+OLLAMA_CONNECT_TIMEOUT_SECONDS = float(os.getenv("OLLAMA_CONNECT_TIMEOUT_SECONDS", "5"))
 OLLAMA_MAX_TOKENS = int(os.getenv("OLLAMA_MAX_TOKENS", "220"))  # ~6-10 lignes
-
-
-def _ollama_chat(system_prompt: str, user_prompt: str) -> str:
-    url = f"{OLLAMA_BASE_URL}/api/chat"
-
-    strict_system = (
-        system_prompt.strip()
-        + "\n\nIMPORTANT:\n"
-          "- Réponds UNIQUEMENT avec la réponse finale.\n"
-          "- Ne fournis jamais d'analyse, de raisonnement, ni d'étapes.\n"
-          "- Pas de contenu caché, pas de 'thinking'.\n"
-    )
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")  # garde le modèle chargé entre deux rafales
+OLLAMA_RETRIES = int(os.getenv("OLLAMA_RETRIES", "2"))
+# classic    = classify_intent_llm_4cats puis decide_tools (un appel LLM chacun)
+# structured = un seul appel analyze_message (format JSON schema) pour intention + tools + slots
+AGENT_PIPELINE_MODE = os.getenv("AGENT_PIPELINE_MODE", "classic").strip().lower()
+
+ollama = OllamaClient(
+    OLLAMA_BASE_URL,
+    keep_alive=OLLAMA_KEEP_ALIVE,
+    connect_timeout=OLLAMA_CONNECT_TIMEOUT_SECONDS,
+    read_timeout=OLLAMA_TIMEOUT_SECONDS,
+    retries=OLLAMA_RETRIES,
+)
+
+
+STRICT_SUFFIX = (
+    "\n\nIMPORTANT:\n"
+    "- Réponds UNIQUEMENT avec la réponse finale.\n"
+    "- Ne fournis jamais d'analyse, de raisonnement, ni d'étapes.\n"
+    "- Pas de contenu caché, pas de 'thinking'.\n"
+)
+
+
+def _chat_payload(
+    system_prompt: str,
+    user_prompt: str,
+    stream: bool,
+    format: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    strict_system = system_prompt.strip() + STRICT_SUFFIX
 
     payload = {
         "model": OLLAMA_MODEL,
-        "stream": False,
+        "stream": stream,
         "messages": [
             {"role": "system", "content": strict_system},
             {"role": "user", "content": user_prompt},
@@ -34,16 +61,81 @@ def _ollama_chat(system_prompt: str, user_prompt: str) -> str:
             "num_predict": OLLAMA_MAX_TOKENS,
         },
     }
+    if format is not None:
+        # sortie contrainte par un JSON schema (Ollama >= 0.5)
+        payload["format"] = format
+    return payload
+
+
+def _request_timeout() -> Optional[httpx.Timeout]:
+    """
+    Timeouts Ollama bornés au temps restant de la requête agent (None: timeouts du client).
+    """
+    if remaining() is None:
+        return None
+    return httpx.Timeout(
+        clamp_timeout(OLLAMA_TIMEOUT_SECONDS),
+        connect=clamp_timeout(OLLAMA_CONNECT_TIMEOUT_SECONDS),
+    )
+
 
+async def _ollama_chat(system_prompt: str, user_prompt: str, format: Optional[Dict[str, Any]] = None) -> str:
+    payload = _chat_payload(system_prompt, user_prompt, stream=False, format=format)
+
+    start = time.perf_counter()
+    status = "error"
     try:
-        r = requests.post(url, json=payload, timeout=OLLAMA_TIMEOUT_SECONDS)
-        r.raise_for_status()
-        data = r.json()
+        with LLM_CALLS_IN_FLIGHT.track(mode="chat"):
+            data = await within_deadline(ollama.chat(payload, timeout=_request_timeout()))
+        status = "ok"
         return (data.get("message", {}).get("content", "") or "").strip()
-    except requests.RequestException as e:
+    except DeadlineExceeded:
+        status = "deadline"
+        raise
+    except httpx.HTTPError as e:
         raise RuntimeError(f"Ollama request failed: {e}") from e
     except ValueError as e:
         raise RuntimeError(f"Ollama returned invalid JSON: {e}") from e
+    finally:
+        LLM_CALL_SECONDS.observe(time.perf_counter() - start, mode="chat", status=status)
+
+
+async def _ollama_chat_stream(system_prompt: str, user_prompt: str) -> AsyncIterator[str]:
+    """
+    Comme _ollama_chat mais rend le texte morceau par morceau (une ligne NDJSON par chunk Ollama).
+    """
+    payload = _chat_payload(system_prompt, user_prompt, stream=True)
+
+    chunks = ollama.chat_stream(payload, timeout=_request_timeout()).__aiter__()
+    start = time.perf_counter()
+    status = "error"
+    LLM_CALLS_IN_FLIGHT.inc(mode="stream")
+    try:
+        while True:
+            try:
+                data = await within_deadline(chunks.__anext__())
+            except StopAsyncIteration:
+                status = "ok"
+                break
+            except DeadlineExceeded:
+                # échéance atteinte: le texte déjà envoyé reste la réponse
+                status = "deadline"
+                break
+            chunk = data.get("message", {}).get("content", "") or ""
+            if chunk:
+                yield chunk
+    except GeneratorExit:
+        # le client a fermé le flux avant la fin
+        status = "cancelled"
+        raise
+    except httpx.HTTPError as e:
+        raise RuntimeError(f"Ollama request failed: {e}") from e
+    except ValueError as e:
+        raise RuntimeError(f"Ollama returned invalid JSON: {e}") from e
+    finally:
+        LLM_CALLS_IN_FLIGHT.dec(mode="stream")
+        LLM_CALL_SECONDS.observe(time.perf_counter() - start, mode="stream", status=status)
+        await chunks.aclose()
 
 
 def _extract_json_object(text: str) -> Dict[str, Any]:
@@ -62,19 +154,34 @@ def _extract_json_object(text: str) -> Dict[str, Any]:
     return json.loads(m.group(0))
 
 
+def _classify_key(message: str) -> str:
+    return _normalize(message)
+
+
+def _decide_key(
+    user_message: str,
+    destination: Optional[str],
+    kb_info: Optional[Dict[str, Any]],
+    available_tools: Optional[List[str]] = None,
+):
+    tools = tuple(available_tools) if available_tools is not None else None
+    return (_normalize(user_message), (destination or "").lower(), bool(kb_info), tools)
+
+
 #classification des intentions de l'utilisateur
-def classify_intent(message: str) -> str:
+async def classify_intent(message: str) -> str:
     system = (
         "Tu es un classificateur d'intention utilisateur.\n"
         "Réponds STRICTEMENT par un seul mot en minuscules: social OU travel.\n"
         "travel = voyage/transport/destination/période/météo/vol/hôtel/budget.\n"
         "Aucun autre texte."
     )
-    out = _ollama_chat(system, f"Message utilisateur: {message}").lower().strip()
+    out = (await _ollama_chat(system, f"Message utilisateur: {message}")).lower().strip()
     return "travel" if "travel" in out else "social"
 
 
-def classify_intent_llm_4cats(message: str) -> str:
+@memoize_llm("classify", _classify_key, default_ttl=3600)
+async def classify_intent_llm_4cats(message: str) -> str:
     system = (
         "Tu es un classificateur d'intention.\n"
         "Tu dois répondre STRICTEMENT par UNE SEULE catégorie parmi:\n"
@@ -92,7 +199,7 @@ def classify_intent_llm_4cats(message: str) -> str:
         "- Ne justifie pas.\n"
     )
 
-    out = _ollama_chat(system, f"Message: {message}").strip().lower()
+    out = (await _ollama_chat(system, f"Message: {message}")).strip().lower()
     allowed = {"small_talk", "intent_metier", "hors_perimetre", "ambigu"}
 
     if out in allowed:
@@ -102,10 +209,12 @@ def classify_intent_llm_4cats(message: str) -> str:
         if cat in out:
             return cat
 
+    LLM_FALLBACKS.inc(stage="classify_intent_llm_4cats", reason="unparsed")
     return "ambigu"
 
 
-def decide_tools(
+@memoize_llm("decide", _decide_key, default_ttl=3600)
+async def decide_tools(
     user_message: str,
     destination: Optional[str],
     kb_info: Optional[Dict[str, Any]],
@@ -152,7 +261,7 @@ def decide_tools(
         "Décide maintenant et retourne uniquement le JSON."
     )
 
-    raw = _ollama_chat(system, user_prompt)
+    raw = await _ollama_chat(system, user_prompt)
     decision = _extract_json_object(raw)
 
     use_tools = bool(decision.get("use_tools", False))
@@ -188,6 +297,65 @@ def decide_tools(
     return {"use_tools": use_tools, "tools": cleaned_tools, "reason": reason}
 
 
+ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "intent": {"type": "string", "enum": ["small_talk", "intent_metier", "hors_perimetre", "ambigu"]},
+        "tools": {"type": "array", "items": {"type": "string", "enum": ["weather", "flights", "hotels"]}},
+        "origin": {"type": ["string", "null"]},
+        "destination": {"type": ["string", "null"]},
+        "month": {"type": ["string", "null"]},
+    },
+    "required": ["intent", "tools", "origin", "destination", "month"],
+}
+
+
+def _clean_slot(value: Any) -> Optional[str]:
+    if not isinstance(value, str):
+        return None
+    value = value.strip().lower()
+    return value if value and value not in {"null", "none", "inconnu"} else None
+
+
+@memoize_llm("analyze", _classify_key, default_ttl=3600)
+async def analyze_message(message: str) -> Dict[str, Any]:
+    """
+    Mode structured: un seul appel LLM contraint par ANALYSIS_SCHEMA.
+    Retourne {"intent", "tools", "origin", "destination", "month"} (slots en minuscules ou None).
+    """
+    system = (
+        "Tu analyses le message d'un utilisateur d'un agent de voyage.\n"
+        "intent: small_talk (politesse), intent_metier (voyage: destination, période, météo, vols, hôtels, budget), "
+        "hors_perimetre (hors voyage), ambigu (trop court pour décider).\n"
+        "tools: weather si météo actuelle, flights si vols/billets/prix, hotels si hôtel/logement; [] sinon.\n"
+        "origin / destination: noms de villes en français, null si absents.\n"
+        "month: 'YYYY-MM' ou 'YYYY-MM-DD/YYYY-MM-DD', null si absent.\n"
+        "Réponds uniquement avec le JSON demandé."
+    )
+
+    raw = await _ollama_chat(system, f"Message: {message}", format=ANALYSIS_SCHEMA)
+    data = _extract_json_object(raw)
+
+    intent = data.get("intent")
+    if intent not in {"small_talk", "intent_metier", "hors_perimetre", "ambigu"}:
+        intent = "ambigu"
+
+    tools = data.get("tools") if isinstance(data.get("tools"), list) else []
+    tools = [t for t in dict.fromkeys(tools) if t in {"weather", "flights", "hotels"}]
+
+    month = _clean_slot(data.get("month"))
+    if month and not re.fullmatch(r"\d{4}-\d{2}(-\d{2}/\d{4}-\d{2}-\d{2})?", month):
+        month = None
+
+    return {
+        "intent": intent,
+        "tools": tools,
+        "origin": _clean_slot(data.get("origin")),
+        "destination": _clean_slot(data.get("destination")),
+        "month": month,
+    }
+
+
 def _safe_get(d: Optional[Dict[str, Any]], *keys, default=None):
     cur = d
     for k in keys:
@@ -197,21 +365,18 @@ def _safe_get(d: Optional[Dict[str, Any]], *keys, default=None):
     return cur
 
 
-def generate_answer(
+def _answer_prompts(
     user_message: str,
     destination: Optional[str],
     kb_info: Optional[Dict[str, Any]],
     tool_results: Optional[Dict[str, Any]],
-) -> str:
+) -> Tuple[str, str, Dict[str, Any]]:
     """
-    Génère la réponse finale.
+    Prompts (system, user) de la réponse finale + stats de taille du prompt.
     - Anti-hallucination prix: si aucun tool_results.flights => ne donne aucun prix.
     - Ajoute Source (url) si disponible.
     - Formulation: 'de ORIGINE à DESTINATION' (pas 'à Paris à Bangkok').
     """
-    flights = _safe_get(tool_results, "flights", default=None) if tool_results else None
-    weather = _safe_get(tool_results, "weather", default=None) if tool_results else None
-    hotels = _safe_get(tool_results, "hotels", default=None) if tool_results else None
 
     system = (
         "Tu es un assistant de planification de voyage.\n"
@@ -222,25 +387,55 @@ def generate_answer(
         "- Si aucune donnée de vol n'est fournie (tool_results.flights absent), ne donne AUCUN prix.\n"
         "- Si des données de vol sont fournies, utilise uniquement ces données pour le prix et les dates.\n"
         "- Si une URL source est fournie, ajoute une ligne 'Source: <url>' à la fin.\n"
+        "- Une donnée 'indisponible' n'a pas pu être récupérée: dis-le sans inventer de valeur.\n"
+        "- Si une donnée porte cached=true, précise la date de relevé (scraped_at) du prix ou de la météo.\n"
         "- Quand tu exprimes un itinéraire, écris 'de ORIGINE à DESTINATION'.\n"
     )
 
-    # Contexte compact
-    context = {
-        "user_message": user_message,
-        "destination": destination,
-        "kb_info": kb_info,
-        "tool_results": {
-            "flights": flights,
-            "weather": weather,
-            "hotels": hotels,
-        }
-    }
+    head = "Voici le contexte JSON à utiliser:\n"
+    tail = "\n\nRédige la meilleure réponse possible pour l'utilisateur."
 
-    user_prompt = (
-        "Voici le contexte JSON à utiliser:\n"
-        f"{json.dumps(context, ensure_ascii=False, indent=2)}\n\n"
-        "Rédige la meilleure réponse possible pour l'utilisateur."
+    # Contexte compact (champs utiles uniquement, borné par ANSWER_PROMPT_TOKEN_BUDGET)
+    context, stats = build_answer_context(
+        user_message,
+        destination,
+        kb_info,
+        tool_results,
+        reserved_tokens=estimate_tokens(system + STRICT_SUFFIX + head + tail),
     )
 
-    return _ollama_chat(system, user_prompt)
+    return system, head + context + tail, stats
+
+
+async def generate_answer(
+    user_message: str,
+    destination: Optional[str],
+    kb_info: Optional[Dict[str, Any]],
+    tool_results: Optional[Dict[str, Any]],
+    prompt_stats: Optional[Dict[str, Any]] = None,
+) -> str:
+    """
+    Génère la réponse finale (voir _answer_prompts pour les règles).
+    - prompt_stats: dict optionnel rempli avec la taille estimée du prompt
+    """
+    system, user_prompt, stats = _answer_prompts(user_message, destination, kb_info, tool_results)
+    if prompt_stats is not None:
+        prompt_stats.update(stats)
+    return await _ollama_chat(system, user_prompt)
+
+
+async def generate_answer_stream(
+    user_message: str,
+    destination: Optional[str],
+    kb_info: Optional[Dict[str, Any]],
+    tool_results: Optional[Dict[str, Any]],
+    prompt_stats: Optional[Dict[str, Any]] = None,
+) -> AsyncIterator[str]:
+    """
+    Même réponse que generate_answer, rendue au fil des tokens Ollama.
+    """
+    system, user_prompt, stats = _answer_prompts(user_message, destination, kb_info, tool_results)
+    if prompt_stats is not None:
+        prompt_stats.update(stats)
+    async for chunk in _ollama_chat_stream(system, user_prompt):
+        yield chunk
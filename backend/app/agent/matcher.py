@@ -0,0 +1,127 @@
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.agent import keywords as kw
+from app.agent.gazetteer import GAZETTEER
+from app.agent.text import normalize
+
+
+class KeywordMatcher:
+    """
+    Automate Aho-Corasick sur toutes les listes de mots-clés à la fois.
+    Un seul parcours du message normalisé retrouve tous les mots-clés de toutes les catégories,
+    quel que soit le nombre de mots-clés.
+    - categories: {"travel": [...], "city": [...], ...}
+    - whole_word: catégories qui ne matchent que des mots entiers (sinon: sous-chaîne)
+    """
+
+    def __init__(self, categories: Dict[str, Iterable[str]], whole_word: Iterable[str] = ()):
+        self.whole_word = set(whole_word)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[str, str, int]]] = [[]]  # (category, keyword, length)
+
+        for category, words in categories.items():
+            for word in words:
+                key = normalize(word)
+                if key:
+                    self._add(category, key)
+        self._build()
+
+    def _add(self, category: str, key: str) -> None:
+        state = 0
+        for ch in key:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        if (category, key, len(key)) not in self._out[state]:
+            self._out[state].append((category, key, len(key)))
+
+    def _build(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def scan(self, text: str) -> "Matches":
+        """
+        text doit déjà être normalisé (voir normalize).
+        """
+        found: Dict[str, List[str]] = {}
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            for category, key, length in self._out[state]:
+                if category in self.whole_word:
+                    start = i - length + 1
+                    if start > 0 and text[start - 1] != " ":
+                        continue
+                    if i + 1 < len(text) and text[i + 1] != " ":
+                        continue
+                hits = found.setdefault(category, [])
+                if key not in hits:
+                    hits.append(key)
+        return Matches(text, found)
+
+
+class Matches:
+    """
+    Résultat d'un parcours: mots-clés trouvés par catégorie, dans l'ordre d'apparition
+    (fin de mot-clé) dans le message.
+    """
+
+    def __init__(self, text: str, found: Dict[str, List[str]]):
+        self.text = text
+        self.words = text.split()
+        self.found = found
+
+    def has(self, category: str) -> bool:
+        return bool(self.found.get(category))
+
+    def get(self, category: str) -> List[str]:
+        return list(self.found.get(category, []))
+
+    def first(self, category: str) -> Optional[str]:
+        hits = self.found.get(category)
+        return hits[0] if hits else None
+
+
+MATCHER = KeywordMatcher(
+    {
+        "small_talk": kw.SMALL_TALK_PATTERNS,
+        "ack": kw.ACK_WORDS,
+        "travel": kw.TRAVEL_KEYWORDS,
+        "weather": kw.WEATHER_KEYWORDS,
+        "flights": kw.FLIGHT_KEYWORDS,
+        "hotels": kw.HOTEL_KEYWORDS,
+        "kb": kw.KB_KEYWORDS,
+        "weather_info": kw.WEATHER_INFO_KEYWORDS,
+        "period": kw.PERIOD_KEYWORDS,
+        # noms et alias du référentiel (app/agent/data/gazetteer_full.json), mots entiers
+        "city": GAZETTEER.names(),
+    },
+    whole_word={"ack", "city"},
+)
+
+
+@lru_cache(maxsize=1024)
+def match_message(message: str) -> Matches:
+    """
+    Normalise le message une fois et retourne toutes les catégories trouvées.
+    Mis en cache: intent, decision et parser réutilisent le même parcours pour un message.
+    """
+    return MATCHER.scan(normalize(message or ""))
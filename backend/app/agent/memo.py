@@ -0,0 +1,61 @@
+import os
+import copy
+import functools
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from app.mcp.cache import TTLCache
+from app.metrics import LLM_MEMO
+
+LLM_MEMO_MAXSIZE = int(os.getenv("LLM_MEMO_MAXSIZE", "2000"))
+
+# nom -> fonction mémoïsée (pour les stats)
+_memos: Dict[str, Callable[..., Awaitable[Any]]] = {}
+
+
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).strip().lower() in {"1", "true", "yes", "on"}
+
+
+def memoize_llm(
+    name: str,
+    key_fn: Callable[..., Hashable],
+    default_ttl: float,
+):
+    """
+    Mémoïse une fonction LLM async (cache LRU + TTL).
+    - key_fn(*args, **kwargs): clé normalisée, reçoit les mêmes arguments que la fonction
+    Cache en mémoire du process: OLLAMA_MODEL est lu au démarrage, le modèle ne change pas pendant sa vie.
+    Configuration par fonction: LLM_MEMO_<NAME>=0/1 et LLM_MEMO_<NAME>_TTL (secondes).
+    """
+    env = f"LLM_MEMO_{name.upper()}"
+    enabled = _env_flag(env, "1")
+    cache = TTLCache(LLM_MEMO_MAXSIZE, float(os.getenv(f"{env}_TTL", str(default_ttl))))
+
+    def decorator(fn: Callable[..., Awaitable[Any]]):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            if not enabled:
+                return await fn(*args, **kwargs)
+
+            key = key_fn(*args, **kwargs)
+            hit = cache.get(key)
+            if hit is not None:
+                LLM_MEMO.inc(name=name, result="hit")
+                # copie: l'appelant peut modifier le résultat (ex: overrides du router)
+                return copy.deepcopy(hit[0])
+            LLM_MEMO.inc(name=name, result="miss")
+
+            result = await fn(*args, **kwargs)
+            cache.set(key, copy.deepcopy(result))
+            return result
+
+        wrapper.cache = cache
+        wrapper.enabled = enabled
+        _memos[name] = wrapper
+        return wrapper
+
+    return decorator
+
+
+def memo_stats() -> Dict[str, Any]:
+    return {name: {"enabled": fn.enabled, **fn.cache.stats()} for name, fn in _memos.items()}
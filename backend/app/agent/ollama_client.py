@@ -0,0 +1,107 @@
+import json
+import asyncio
+import httpx
+from typing import Any, AsyncIterator, Dict, Optional
+
+# erreurs de connexion pour lesquelles on peut rejouer la requête (reset, keep-alive fermé côté serveur)
+RETRYABLE_ERRORS = (httpx.ConnectError, httpx.RemoteProtocolError, httpx.ReadError, httpx.WriteError)
+
+
+class OllamaClient:
+    """
+    Client async réutilisable pour l'API /api/chat d'Ollama.
+    - connexions persistantes (un httpx.AsyncClient par boucle asyncio)
+    - keep_alive: durée pendant laquelle Ollama garde le modèle chargé (ex: "30m", "-1")
+    - timeouts connect / read séparés
+    - retry sur reset de connexion
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        keep_alive: Optional[str] = None,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 120.0,
+        retries: int = 2,
+        max_connections: int = 10,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.keep_alive = keep_alive
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.retries = retries
+        self.max_connections = max_connections
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._client_loop is not loop:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+            self._client_loop = loop
+        return self._client
+
+    def _with_keep_alive(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        if self.keep_alive and "keep_alive" not in payload:
+            return {**payload, "keep_alive": self.keep_alive}
+        return payload
+
+    async def chat(self, payload: Dict[str, Any], timeout: Optional[httpx.Timeout] = None) -> Dict[str, Any]:
+        """
+        POST /api/chat non streamé, retourne le JSON d'Ollama.
+        """
+        payload = self._with_keep_alive({**payload, "stream": False})
+        attempt = 0
+        while True:
+            try:
+                r = await self._get_client().post("/api/chat", json=payload, timeout=timeout or self.timeout)
+                r.raise_for_status()
+                return r.json()
+            except RETRYABLE_ERRORS:
+                attempt += 1
+                if attempt > self.retries:
+                    raise
+                await asyncio.sleep(0.1 * attempt)
+
+    async def chat_stream(
+        self, payload: Dict[str, Any], timeout: Optional[httpx.Timeout] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        POST /api/chat streamé: rend chaque objet NDJSON envoyé par Ollama.
+        Le retry n'est possible qu'avant le premier chunk reçu.
+        """
+        payload = self._with_keep_alive({**payload, "stream": True})
+        attempt = 0
+        while True:
+            received = False
+            try:
+                async with self._get_client().stream(
+                    "POST", "/api/chat", json=payload, timeout=timeout or self.timeout
+                ) as r:
+                    r.raise_for_status()
+                    async for line in r.aiter_lines():
+                        if not line:
+                            continue
+                        received = True
+                        data = json.loads(line)
+                        yield data
+                        if data.get("done"):
+                            return
+                return
+            except RETRYABLE_ERRORS:
+                attempt += 1
+                if received or attempt > self.retries:
+                    raise
+                await asyncio.sleep(0.1 * attempt)
+
+    async def aclose(self) -> None:
+        if self._client is not None and self._client_loop is asyncio.get_running_loop():
+            await self._client.aclose()
+            self._client = None
+            self._client_loop = None
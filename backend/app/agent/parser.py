@@ -1,30 +1,73 @@
-def extract_destination(message: str):
-    message = message.lower()
+from functools import lru_cache
 
-    cities = ["lisbonne", "paris", "rome", "madrid", "barcelone", "bangkok"]
+from app.agent import keywords as kw
+from app.agent.gazetteer import GAZETTEER, find_city
+from app.agent.matcher import match_message
+from app.agent.text import normalize
+
+# Mots fréquents jamais pris pour une ville mal orthographiée ("ville" -> "lille")
+_FUZZY_SKIP = {
+    normalize(word)
+    for word in kw.TRAVEL_KEYWORDS + kw.WEATHER_KEYWORDS + kw.FLIGHT_KEYWORDS + kw.HOTEL_KEYWORDS + kw.KB_KEYWORDS
+} | {
+    "ville", "villes", "quelle", "quelles", "quels", "combien", "demain", "semaine",
+    "weekend", "plage", "soleil", "pays", "moins", "cher", "chere", "pendant", "depuis",
+}
+# mots après lesquels on attend un lieu ("vol pour lisbone", "depuis marseile")
+_PLACE_MARKERS = {"a", "au", "aux", "de", "d", "du", "depuis", "pour", "vers"}
+
+
+def extract_cities(message: str):
+    """
+    Ids des villes citées, dans l'ordre du message.
+    Noms et alias exacts d'abord (un seul parcours, app/agent/matcher.py),
+    sinon recherche approchée ("lisbone", "bangkock"), seulement dans un message de voyage.
+    """
+    matches = match_message(message)
+    keys = matches.get("city")
+    ids = []
+    for key in keys:
+        # "new york" contient aussi "york": le nom le plus long l'emporte
+        if any(other != key and f" {key} " in f" {other} " for other in keys):
+            continue
+        city = GAZETTEER.lookup(key, fuzzy=False)
+        if city and city["id"] not in ids:
+            ids.append(city["id"])
+    if ids or not matches.has("travel"):
+        return ids
+    return list(_fuzzy_cities(message or ""))
 
-    for city in cities:
-        if city in message:
-            return city
-    return None
+
+@lru_cache(maxsize=1024)
+def _fuzzy_cities(message: str):
+    # seuls les mots en position de lieu sont comparés aux villes: après _PLACE_MARKERS,
+    # ou avec une majuscule hors début de message ("on part à Lisbone", "Bangkock ou Rome")
+    words = [(word, raw[:1].isupper()) for raw in message.split() for word in normalize(raw).split()]
+    ids = []
+    previous = None
+    for i, (word, capitalized) in enumerate(words):
+        in_place_slot = previous in _PLACE_MARKERS or (capitalized and i > 0)
+        previous = word
+        if not in_place_slot or word in _FUZZY_SKIP or word.isdigit():
+            continue
+        city = GAZETTEER.fuzzy(word)
+        if city and city["id"] not in ids:
+            ids.append(city["id"])
+    return tuple(ids)
+
+
+def extract_destination(message: str):
+    # première ville du référentiel (app/agent/gazetteer.py) dans l'ordre du message
+    cities = extract_cities(message)
+    return cities[0] if cities else None
 
 def detect_intent(message: str):
-    keywords = ["quand", "meilleure période", "partir", "voyager", "aller"]
-    message = message.lower()
-
-    return any(k in message for k in keywords)
-
-CITY_MAPPING = {
-    "lisbonne": "Lisbon",
-    "paris": "Paris",
-    "rome": "Rome",
-    "madrid": "Madrid",
-    "barcelone": "Barcelona",
-    "bangkok": "Bangkok"
-}
+    return match_message(message).has("period")
 
 def normalize_city_for_tool(city: str):
-    return CITY_MAPPING.get(city.lower(), city)
+    # nom anglais attendu par wttr.in ("lisbonne" -> "Lisbon")
+    found = find_city(city)
+    return found["en"] if found else city
 
 import re
 
@@ -0,0 +1,77 @@
+import copy
+import os
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from app.agent.text import normalize
+from app.mcp.cache import TTLCache
+from app.mcp.service import CACHE_TTL_SECONDS
+from app.metrics import AGENT_RESPONSE_CACHE
+
+# Cache des réponses complètes de /agent/query (opt-in: AGENT_RESPONSE_CACHE=1).
+# Clé = message normalisé + intention et slots résolus; une réponse servie d'ici ne touche ni Ollama ni les tools.
+# Validité: AGENT_RESPONSE_CACHE_TTL_SECONDS sans tool, sinon la fraîcheur restante des données des tools
+# (CACHE_TTL_SECONDS moins leur âge). En mémoire du process: modèle et KB, lus au démarrage, ne changent pas pendant sa vie.
+AGENT_RESPONSE_CACHE_ENABLED = os.getenv("AGENT_RESPONSE_CACHE", "0").strip().lower() in {"1", "true", "yes", "on"}
+AGENT_RESPONSE_CACHE_MAXSIZE = int(os.getenv("AGENT_RESPONSE_CACHE_MAXSIZE", "1000"))
+AGENT_RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("AGENT_RESPONSE_CACHE_TTL_SECONDS", "3600"))
+
+# TTL du cache = la plus longue validité possible, chaque entrée porte la sienne
+_cache = TTLCache(AGENT_RESPONSE_CACHE_MAXSIZE, max(AGENT_RESPONSE_CACHE_TTL_SECONDS, *CACHE_TTL_SECONDS.values()))
+
+# champs propres à la requête d'origine, pas resservis
+_PER_REQUEST_FIELDS = ("deadline", "timings_ms", "answer_prompt")
+
+
+def response_key(message: str, intent: str, destination: Optional[str], origin: Optional[str], month: Optional[str]) -> Hashable:
+    return (normalize(message), intent, destination, origin, month)
+
+
+def lookup_response(key: Hashable) -> Optional[Tuple[Dict[str, Any], float]]:
+    """
+    Retourne (réponse {"answer", "decision"}, âge en secondes) ou None.
+    """
+    if not AGENT_RESPONSE_CACHE_ENABLED:
+        return None
+    hit = _cache.get(key)
+    if hit is None:
+        AGENT_RESPONSE_CACHE.inc(result="miss")
+        return None
+    entry, age, _ = hit
+    if age > entry["ttl"]:
+        _cache.invalidate(key)
+        AGENT_RESPONSE_CACHE.inc(result="expired")
+        return None
+    AGENT_RESPONSE_CACHE.inc(result="hit")
+    return copy.deepcopy(entry["response"]), age
+
+
+def response_ttl(tool_results: Dict[str, Any]) -> Optional[float]:
+    """
+    Validité d'une réponse construite sur ces résultats de tools; None si elle ne doit pas être gardée
+    (tool en erreur, donnée stale / last known good ou déjà expirée).
+    """
+    ttl = AGENT_RESPONSE_CACHE_TTL_SECONDS
+    for name, result in tool_results.items():
+        if not isinstance(result, dict) or result.get("status") != "ok" or result.get("stale"):
+            return None
+        left = CACHE_TTL_SECONDS.get(name, 0.0) - float(result.get("age_seconds") or 0.0)
+        if left <= 0:
+            return None
+        ttl = min(ttl, left)
+    return ttl
+
+
+def store_response(key: Hashable, response: Dict[str, Any], tool_results: Dict[str, Any]) -> None:
+    if not AGENT_RESPONSE_CACHE_ENABLED:
+        return
+    ttl = response_ttl(tool_results)
+    if ttl is None:
+        AGENT_RESPONSE_CACHE.inc(result="skip")
+        return
+    decision = {k: v for k, v in response["decision"].items() if k not in _PER_REQUEST_FIELDS}
+    _cache.set(key, {"response": copy.deepcopy({**response, "decision": decision}), "ttl": ttl})
+    AGENT_RESPONSE_CACHE.inc(result="store")
+
+
+def response_cache_stats() -> Dict[str, Any]:
+    return {"enabled": AGENT_RESPONSE_CACHE_ENABLED, **_cache.stats()}
@@ -1,17 +1,60 @@
 from fastapi import APIRouter
-import requests
+from fastapi.responses import StreamingResponse
+import os
 import re
+import json
+import asyncio
+from typing import Callable, Optional
 from datetime import date
+from functools import partial
 
 from app.agent.schemas import AgentQuery, AgentResponse
-from app.agent.kb import get_destination_info
+from app.agent.kb import MONTH_NAMES, destinations_for, get_destination_info, get_kb, month_number
 from app.agent.parser import extract_destination, normalize_city_for_tool
-from app.agent.llm import decide_tools, generate_answer, classify_intent_llm_4cats
+from app.agent.llm import (
+    AGENT_PIPELINE_MODE,
+    analyze_message,
+    decide_tools,
+    generate_answer,
+    generate_answer_stream,
+    classify_intent_llm_4cats,
+)
 from app.agent.intent import classify_intent_rules
+from app.agent.matcher import match_message
 from app.agent.airports import get_airport_code
+from app.agent.gazetteer import city_id, find_city
+from app.agent.executor import TOOL_TIMEOUT_ERROR, run_tools_concurrently
+from app.agent.dispatch import call_tool
+from app.mcp.tools.flight import flexible_date_pairs
+from app.agent.memo import memo_stats
+from app.agent.decision import (
+    apply_keyword_overrides,
+    decide_tools_from_analysis,
+    decide_tools_from_session,
+    decide_tools_rules,
+    keyword_tools,
+)
+from app.agent.response_cache import lookup_response, response_cache_stats, response_key, store_response
+from app.agent.session import load_session, remember_result, reusable_result, save_session, session_stats
+from app.agent.context import kb_suggestions_answer, template_answer
+from app.agent.deadline import (
+    AGENT_ANSWER_MIN_SECONDS,
+    DeadlineExceeded,
+    budget_for,
+    deadline_info,
+    remaining,
+    request_deadline,
+    tools_timeout,
+)
+from app.metrics import LLM_FALLBACKS, stage, timings_breakdown, track_request
 
 router = APIRouter()
 
+# vols avec un mois seul ("en mars"): recherche dates flexibles (/mcp/flights/batch)
+FLEXIBLE_DATES = os.getenv("AGENT_FLEXIBLE_DATES", "1").strip().lower() not in ("0", "false", "no")
+# "où partir en avril ?": nombre max de destinations proposées depuis la KB
+KB_SUGGESTIONS_LIMIT = int(os.getenv("KB_SUGGESTIONS_LIMIT", "5"))
+
 # ----------------------------
 #parsing (simple & fiable)
 MONTHS_FR_TO_NUM = {
@@ -29,20 +72,52 @@ MONTHS_FR_TO_NUM = {
     "décembre": "12", "decembre": "12",
 }
 
+_PLACE = r"([a-zA-Zéèêàçîôû\-]+(?:\s+[a-zA-Zéèêàçîôû\-]+){0,2})"
+
+def _longest_city(words: str, from_end: bool = False):
+    # "new york en mars" -> "new york", "vol de paris" (from_end) -> "paris":
+    # plus long morceau reconnu par le référentiel, collé au "à" / "->"
+    parts = words.split()
+    for n in range(len(parts), 0, -1):
+        candidate = " ".join(parts[-n:] if from_end else parts[:n])
+        found = city_id(candidate, fuzzy=False)
+        if found:
+            return found
+    word = parts[-1] if from_end else parts[0]
+    return city_id(word) or word
+
 def extract_route_cities(message: str):
     m = message.lower().strip()
     patterns = [
-        r"\bde\s+([a-zA-Zéèêàçîôû\-]+)\s+(?:a|à)\s+([a-zA-Zéèêàçîôû\-]+)\b",
-        r"\bdepuis\s+([a-zA-Zéèêàçîôû\-]+)\s+(?:vers|pour)\s+([a-zA-Zéèêàçîôû\-]+)\b",
-        r"\b([a-zA-Zéèêàçîôû\-]+)\s*(?:->|→)\s*([a-zA-Zéèêàçîôû\-]+)\b",
+        rf"\bde\s+{_PLACE}\s+(?:a|à)\s+{_PLACE}",
+        rf"\bdepuis\s+{_PLACE}\s+(?:vers|pour)\s+{_PLACE}",
+        rf"\b{_PLACE}\s*(?:->|→)\s*{_PLACE}",
     ]
     for p in patterns:
         match = re.search(p, m)
         if match:
-            return match.group(1), match.group(2)
+            return _longest_city(match.group(1), from_end=True), _longest_city(match.group(2))
     return None, None
 
 
+# ville de départ seule, dans un tour qui suit ("et depuis lyon ?", "je pars de nantes")
+_ORIGIN_ONLY_RE = re.compile(rf"\b(?:depuis|pars de|part de|partant de|départ de)\s+{_PLACE}")
+
+
+def _merge_session_slots(session: dict, message: str, origin, dest_city, destination, month):
+    """
+    Complète les slots du message avec ceux de la session.
+    Une ville seule devient l'origine si c'est la réponse attendue ("tu pars de quelle ville ?" -> "Paris")
+    ou si elle est introduite comme départ; la destination du voyage en cours est alors conservée.
+    """
+    pending = session["pending"] or {}
+    if not origin and not dest_city and destination and session["destination"] and destination != session["destination"]:
+        match = _ORIGIN_ONLY_RE.search(message.lower())
+        if pending.get("missing") == "origin" or (match and _longest_city(match.group(1)) == destination):
+            origin, destination = destination, None
+    return origin or session["origin"], destination or session["destination"], month or session["month"]
+
+
 def extract_month_or_dates(message: str):
     m = message.lower().strip()
 
@@ -87,16 +162,110 @@ def need_clarification_for_weather(dest_city):
     return None
 
 
-@router.post("/query", response_model=AgentResponse)
-def query_agent(payload: AgentQuery):
-    user_message = payload.message
+def _clarification_response(clarification, tool_name, intent, destination, kb_info, tools_called, decision_path):
+    return AgentResponse(
+        answer=clarification,
+        decision={
+            "intent": intent,
+            "destination": destination,
+            "kb_used": bool(kb_info),
+            "tools_called": tools_called,
+            "llm_decision": {
+                "use_tools": False,
+                "tools": [],
+                "reason": f"Missing parameters for {tool_name}: {clarification}"
+            },
+            "decision_path": decision_path,
+        }
+    )
+
+
+def _kb_suggestions_response(user_message, intent, month):
+    """
+    Sans destination, un mois / climat / tag cité suffit à répondre depuis les index de la KB, sans LLM.
+    None si la KB n'a rien pour ces critères (la question suit alors le pipeline normal).
+    """
+    terms = get_kb().match_terms(user_message)
+    if not (month or terms["climate"] or terms["tag"]):
+        return None
+    ids = destinations_for(month=month, climate=terms["climate"], tag=terms["tag"])[:KB_SUGGESTIONS_LIMIT]
+    if not ids:
+        return None
+
+    criteria = []
+    if month:
+        criteria.append(f"en {MONTH_NAMES[month_number(month)]}")
+    if terms["climate"]:
+        criteria.append(f"climat {terms['climate']}")
+    if terms["tag"]:
+        criteria.append(terms["tag"])
+    suggestions = []
+    for dest_id in ids:
+        city = find_city(dest_id, fuzzy=False)
+        suggestions.append((city["fr"] if city else dest_id.title(), get_destination_info(dest_id)))
+    return AgentResponse(
+        answer=kb_suggestions_answer(suggestions, criteria),
+        decision={
+            "intent": intent,
+            "destination": None,
+            "kb_used": True,
+            "tools_called": [],
+            "llm_decision": {"use_tools": False, "tools": [], "reason": "KB: destinations for " + ", ".join(criteria)},
+            "decision_path": "kb",
+            "kb_matches": ids,
+        }
+    )
+
+
+def _no_emit(event: str, data: dict):
+    pass
+
+
+async def _prepare_answer(user_message: str, emit: Callable[[str, dict], None] = _no_emit, session: Optional[dict] = None):
+    """
+    Étapes 0 à 3 du pipeline (intention, parsing, décision, tools).
+    Retourne une AgentResponse si on peut répondre sans LLM (small talk, clarification...),
+    sinon le contexte (dict) pour generate_answer.
+    emit(event, data) reçoit les étapes de progression (utilisé par /query/stream).
+    session (app/agent/session.py): slots et résultats des tours précédents, mis à jour sur place.
+    """
 
     # =========================================================
     # 0) Intention AVANT tout (small talk / hors périmètre)
     # =========================================================
-    intent = classify_intent_rules(user_message)
+    structured = AGENT_PIPELINE_MODE == "structured"
+    analysis = None  # mode structured: intention + tools + slots en un seul appel LLM
+
+    pending = session["pending"] if session else None
+    trip_tools = (pending or {}).get("tools") or (session["tools"] if session else [])
+
+    with stage("classify_intent_rules"):
+        intent = classify_intent_rules(user_message)
+    if (pending or trip_tools) and intent in ("ambigu", "hors_perimetre") and (
+        extract_destination(user_message) or extract_month_or_dates(user_message)
+    ):
+        # suite du voyage en cours: réponse à la clarification ("Paris", "en mai") ou changement de slot ("et depuis lyon ?")
+        intent = "intent_metier"
+    if intent == "ambigu" and any(get_kb().match_terms(user_message).values()) and (
+        pending or match_message(user_message).has("travel") or extract_month_or_dates(user_message)
+    ):
+        # climat ou thème connu de la KB dans un contexte de voyage ("un coin chaud en mai ?");
+        # un terme seul ("culture", "histoire") ne suffit pas, et hors_perimetre n'est jamais repêché
+        intent = "intent_metier"
     if intent == "ambigu":
-        intent = classify_intent_llm_4cats(user_message)
+        try:
+            if structured:
+                with stage("analyze_message"):
+                    analysis = await analyze_message(user_message)
+                intent = analysis["intent"]
+            else:
+                with stage("classify_intent_llm_4cats"):
+                    intent = await classify_intent_llm_4cats(user_message)
+        except DeadlineExceeded:
+            # plus le temps de demander au LLM: on traite la demande comme un voyage
+            LLM_FALLBACKS.inc(stage="classify_intent", reason="deadline")
+            intent = "intent_metier"
+    emit("intent", {"intent": intent})
 
     if intent == "small_talk":
         return AgentResponse(
@@ -131,71 +300,124 @@ def query_agent(payload: AgentQuery):
     # =========================================================
     # 1) Parsing route (origin/destination) & destination métier
     # =========================================================
-    origin_city, dest_city = extract_route_cities(user_message)
-    destination = dest_city or extract_destination(user_message)  # ex: "bangkok"
+    with stage("parse_slots"):
+        origin_city, dest_city = extract_route_cities(user_message)
+        destination = dest_city or extract_destination(user_message)  # ex: "bangkok"
+        month = extract_month_or_dates(user_message)
+        new_slots = bool(origin_city or destination or month)
+        if session is not None:
+            origin_city, destination, month = _merge_session_slots(
+                session, user_message, origin_city, dest_city, destination, month
+            )
+
+    def _fill_slots_from(analysis):
+        # le parsing déterministe reste prioritaire, le LLM ne complète que les trous
+        nonlocal origin_city, destination, month
+        origin_city = origin_city or analysis["origin"]
+        destination = destination or analysis["destination"]
+        month = month or analysis["month"]
+
+    if analysis:
+        _fill_slots_from(analysis)
     kb_info = get_destination_info(destination)
 
+    # "où partir en avril ?": réponse directe depuis les index de la KB
+    if not destination and not keyword_tools(user_message):
+        suggested = _kb_suggestions_response(user_message, intent, month)
+        if suggested is not None:
+            if session is not None:
+                session.update(origin=origin_city, month=month, pending=None)
+            emit("decision", {"decision_path": "kb", "tools": []})
+            return suggested
+
+    # réponse complète déjà calculée pour la même question et les mêmes slots (AGENT_RESPONSE_CACHE=1)
+    cache_key = response_key(user_message, intent, destination, origin_city, month)
+    cached = lookup_response(cache_key)
+    if cached is not None:
+        response, age = cached
+        response["decision"]["response_cache"] = {"hit": True, "age_seconds": round(age, 1)}
+        if session is not None:
+            session.update(origin=origin_city, destination=destination, month=month, pending=None)
+            if response["decision"]["llm_decision"].get("use_tools"):
+                session["tools"] = [t.get("name") for t in response["decision"]["llm_decision"].get("tools", [])]
+        emit("decision", {"decision_path": "response_cache", "tools": []})
+        return AgentResponse(**response)
+
     tools_called = []
     tool_results = {}
 
     # =========================================================
-    # 2) Décision LLM tool/no-tool
-    # =========================================================
-    llm_decision = decide_tools(
-        user_message=user_message,
-        destination=destination,
-        kb_info=kb_info,
-        available_tools=["weather", "flights", "hotels"]
-    )
-
-    # =========================================================
-    # 2bis) OVERRIDES RULE-BASED (weather + flights + hotels)
+    # 2) Décision tool/no-tool: règles d'abord, LLM si elles ne tranchent pas
     # =========================================================
-    msg = user_message.lower()
-
-    force_weather = any(k in msg for k in ["météo", "meteo", "temps", "aujourd", "actuel", "actuelle", "maintenant", "prévision", "prevision"])
-    force_flights = any(k in msg for k in ["vol", "vols", "billet", "billets", "avion", "aéroport", "aeroport", "prix"])
-    force_hotels = any(k in msg for k in ["hotel", "hôtel", "logement", "hébergement", "hebergement", "nuit", "nuits", "booking"])
+    with stage("decide_tools_rules"):
+        llm_decision = None
+        decision_path = "rules"
+        if trip_tools and new_slots and not keyword_tools(user_message) and not match_message(user_message).has("kb"):
+            # le message complète la clarification ou ne change qu'un slot: mêmes tools qu'au tour précédent
+            llm_decision = decide_tools_from_session(trip_tools, destination, origin=origin_city, month=month)
+            decision_path = "session"
+        if llm_decision is None:
+            decision_path = "rules"
+            llm_decision = decide_tools_rules(
+                user_message,
+                destination,
+                kb_info,
+                origin=origin_city,
+                month=month,
+            )
+
+    try:
+        if llm_decision is None and structured:
+            decision_path = "structured"
+            if analysis is None:
+                with stage("analyze_message"):
+                    analysis = await analyze_message(user_message)
+                _fill_slots_from(analysis)
+                kb_info = get_destination_info(destination)
+            llm_decision = decide_tools_from_analysis(analysis, destination, origin=origin_city, month=month)
+            llm_decision = apply_keyword_overrides(llm_decision, user_message, destination)
+
+        if llm_decision is None:
+            decision_path = "llm"
+            with stage("decide_tools"):
+                llm_decision = await decide_tools(
+                    user_message=user_message,
+                    destination=destination,
+                    kb_info=kb_info,
+                    available_tools=["weather", "flights", "hotels"]
+                )
+
+            # =====================================================
+            # 2bis) OVERRIDES RULE-BASED (weather + flights + hotels)
+            # =====================================================
+            llm_decision = apply_keyword_overrides(llm_decision, user_message, destination)
+    except DeadlineExceeded:
+        # échéance atteinte pendant l'appel LLM: seuls les mots-clés décident
+        LLM_FALLBACKS.inc(stage="decide_tools", reason="deadline")
+        decision_path = "deadline"
+        llm_decision = apply_keyword_overrides(
+            {"use_tools": False, "tools": [], "reason": "Deadline reached before LLM decision"},
+            user_message,
+            destination,
+        )
+    emit("decision", {"decision_path": decision_path, "tools": [t.get("name") for t in llm_decision.get("tools", [])]})
 
-    def _has_tool(decision: dict, tool_name: str) -> bool:
-        return any(t.get("name") == tool_name for t in decision.get("tools", []))
+    if session is not None:
+        session.update(origin=origin_city, destination=destination, month=month, pending=None)
+        if llm_decision.get("use_tools"):
+            session["tools"] = [t.get("name") for t in llm_decision.get("tools", [])]
 
-    # WEATHER override
-    if force_weather and destination:
-        if not llm_decision.get("use_tools"):
-            llm_decision["use_tools"] = True
-            llm_decision["tools"] = [{"name": "weather", "params": {}}]
-            llm_decision["reason"] = "Rule-based override: user asked for current weather"
-        else:
-            if not _has_tool(llm_decision, "weather"):
-                llm_decision["tools"].append({"name": "weather", "params": {}})
-                llm_decision["reason"] = (llm_decision.get("reason", "") + " + weather override").strip()
-
-    # FLIGHTS override
-    if force_flights and destination:
-        if not llm_decision.get("use_tools"):
-            llm_decision["use_tools"] = True
-            llm_decision["tools"] = [{"name": "flights", "params": {}}]
-            llm_decision["reason"] = "Rule-based override: user asked for flights/prices"
-        else:
-            if not _has_tool(llm_decision, "flights"):
-                llm_decision["tools"].append({"name": "flights", "params": {}})
-                llm_decision["reason"] = (llm_decision.get("reason", "") + " + flights override").strip()
-
-    # HOTELS override
-    if force_hotels and destination:
-        if not llm_decision.get("use_tools"):
-            llm_decision["use_tools"] = True
-            llm_decision["tools"] = [{"name": "hotels", "params": {}}]
-            llm_decision["reason"] = "Rule-based override: user asked for hotels/accommodation"
-        else:
-            if not _has_tool(llm_decision, "hotels"):
-                llm_decision["tools"].append({"name": "hotels", "params": {}})
-                llm_decision["reason"] = (llm_decision.get("reason", "") + " + hotels override").strip()
+    def _clarify(clarification, tool_name, missing):
+        if session is not None:
+            # le prochain message ne fera que compléter ce slot
+            session["pending"] = {"tools": [t.get("name") for t in llm_decision.get("tools", [])], "missing": missing}
+        return _clarification_response(clarification, tool_name, intent, destination, kb_info, tools_called, decision_path)
 
     # =========================================================
-    # 3) Exécuter les tools décidés
+    # 3) Préparer les tools décidés (params + clarifications)
     # =========================================================
+    planned = {}  # name -> (label tools_called, tool MCP, params)
+
     if llm_decision.get("use_tools") and destination:
         for tool in llm_decision.get("tools", []):
             name = tool.get("name")
@@ -203,119 +425,255 @@ def query_agent(payload: AgentQuery):
 
             city_for_tool = normalize_city_for_tool(destination)
 
-            try:
-                if name == "weather":
-                    clarification = need_clarification_for_weather(destination)
-                    if clarification:
-                        return AgentResponse(
-                            answer=clarification,
-                            decision={
-                                "intent": intent,
-                                "destination": destination,
-                                "kb_used": bool(kb_info),
-                                "tools_called": tools_called,
-                                "llm_decision": {
-                                    "use_tools": False,
-                                    "tools": [],
-                                    "reason": f"Missing parameters for weather: {clarification}"
-                                }
-                            }
-                        )
-
-                    resp = requests.post(
-                        "http://127.0.0.1:8000/mcp/weather",
-                        json={"city": city_for_tool},
-                        timeout=20
-                    )
-                    resp.raise_for_status()
-                    tool_results["weather"] = resp.json()
-                    tools_called.append("weather_scraper")
-
-                elif name == "hotels":
-                    month = params.get("month", None) or extract_month_or_dates(user_message)
-                    clarification = need_clarification_for_hotels(destination, month)
-                    if clarification:
-                        return AgentResponse(
-                            answer=clarification,
-                            decision={
-                                "intent": intent,
-                                "destination": destination,
-                                "kb_used": bool(kb_info),
-                                "tools_called": tools_called,
-                                "llm_decision": {
-                                    "use_tools": False,
-                                    "tools": [],
-                                    "reason": f"Missing parameters for hotels: {clarification}"
-                                }
-                            }
-                        )
-
-                    resp = requests.post(
-                        "http://127.0.0.1:8000/mcp/hotels",
-                        json={"city": destination, "month": month},
-                        timeout=45
-                    )
-                    resp.raise_for_status()
-                    tool_results["hotels"] = resp.json()
-                    tools_called.append("hotel_scraper")
-
-                elif name == "flights":
-                    origin_city_fallback = origin_city
-                    dest_city_fallback = dest_city or destination
-
-                    origin_iata = get_airport_code(origin_city_fallback) if origin_city_fallback else None
-                    dest_iata = get_airport_code(dest_city_fallback) if dest_city_fallback else None
-
-                    month = params.get("month", None) or extract_month_or_dates(user_message)
-                    clarification = need_clarification_for_flights(origin_iata, dest_iata, month)
-                    if clarification:
-                        return AgentResponse(
-                            answer=clarification,
-                            decision={
-                                "intent": intent,
-                                "destination": destination,
-                                "kb_used": bool(kb_info),
-                                "tools_called": tools_called,
-                                "llm_decision": {
-                                    "use_tools": False,
-                                    "tools": [],
-                                    "reason": f"Missing parameters for flights: {clarification}"
-                                }
-                            }
-                        )
-
-                    resp = requests.post(
-                        "http://127.0.0.1:8000/mcp/flights",
-                        json={"from": origin_iata, "to": dest_iata, "month": month},
-                        timeout=45
-                    )
-                    resp.raise_for_status()
-                    tool_results["flights"] = resp.json()
-                    tools_called.append("flight_scraper")
+            if name == "weather":
+                clarification = need_clarification_for_weather(destination)
+                if clarification:
+                    return _clarify(clarification, "weather", "destination")
 
-            except Exception as e:
-                tool_results[f"{name}_error"] = str(e)
+                planned["weather"] = ("weather_scraper", "weather", {"city": city_for_tool})
 
-    # =========================================================
-    # 4) Réponse finale via LLM
-    # =========================================================
-    final_answer = generate_answer(
-        user_message=user_message,
-        destination=destination,
-        kb_info=kb_info,
-        tool_results=tool_results if tool_results else None
-    )
+            elif name == "hotels":
+                tool_month = params.get("month", None) or month
+                clarification = need_clarification_for_hotels(destination, tool_month)
+                if clarification:
+                    return _clarify(clarification, "hotels", "destination" if not destination else "month")
+
+                planned["hotels"] = ("hotel_scraper", "hotels", {"city": destination, "month": tool_month})
+
+            elif name == "flights":
+                origin_city_fallback = origin_city
+                dest_city_fallback = dest_city or destination
+
+                origin_iata = get_airport_code(origin_city_fallback) if origin_city_fallback else None
+                dest_iata = get_airport_code(dest_city_fallback) if dest_city_fallback else None
+
+                tool_month = params.get("month", None) or month
+                clarification = need_clarification_for_flights(origin_iata, dest_iata, tool_month)
+                if clarification:
+                    missing = "origin" if not origin_iata else "destination" if not dest_iata else "month"
+                    return _clarify(clarification, "flights", missing)
+
+                params = {"from": origin_iata, "to": dest_iata, "month": tool_month}
+                if FLEXIBLE_DATES and flexible_date_pairs(month=tool_month):
+                    # mois seul: plusieurs couples de dates en parallèle, le moins cher gagne
+                    planned["flights"] = ("flight_batch_scraper", "flights_batch", params)
+                else:
+                    planned["flights"] = ("flight_scraper", "flights", params)
 
     # =========================================================
-    # 5) Retour
+    # 3bis) Exécuter les tools en parallèle (latence = le plus lent),
+    #       coupés à temps pour laisser AGENT_ANSWER_RESERVE_SECONDS à la réponse
     # =========================================================
-    return AgentResponse(
-        answer=final_answer,
-        decision={
-            "intent": intent,
-            "destination": destination,
-            "kb_used": bool(kb_info),
-            "tools_called": tools_called,
-            "llm_decision": llm_decision
-        }
+    # résultats déjà obtenus dans la session avec les mêmes paramètres: pas de nouveau scrape
+    reused = {}
+    for name, (_, tool, params) in planned.items():
+        previous = reusable_result(session, tool, params)
+        if previous is not None:
+            reused[name] = previous
+            emit("tool_finished", {"name": name, "status": "ok", "reused": True})
+
+    results, errors = {}, {}
+    calls = {name: partial(call_tool, tool, params) for name, (_, tool, params) in planned.items() if name not in reused}
+    if calls:
+        with stage("tools"):
+            results, errors = await run_tools_concurrently(
+                calls,
+                on_start=lambda name: emit("tool_started", {"name": name}),
+                on_finish=lambda name, error: emit("tool_finished", {"name": name, "status": "error" if error else "ok"}),
+                timeout=tools_timeout(),
+            )
+    for name, (_, tool, params) in planned.items():
+        if name in results:
+            remember_result(session, tool, params, results[name])
+    results.update(reused)
+
+    omitted_tools = []
+    for name, (label, _, _) in planned.items():
+        if name in results:
+            tool_results[name] = results[name]
+            tools_called.append(label)
+        elif errors.get(name) == TOOL_TIMEOUT_ERROR:
+            omitted_tools.append(name)
+        else:
+            tool_results[name] = {"status": "error", "error": errors.get(name, "unknown error")}
+
+    return {
+        "user_message": user_message,
+        "intent": intent,
+        "destination": destination,
+        "kb_info": kb_info,
+        "tool_results": tool_results,
+        "tools_called": tools_called,
+        "llm_decision": llm_decision,
+        "decision_path": decision_path,
+        "omitted_tools": omitted_tools,  # tools abandonnés à l'échéance
+        "reused_tools": list(reused),  # repris d'un tour précédent de la session
+        "answer_source": "llm",  # "template" si la réponse a été rédigée sans LLM
+        "answer_prompt": {},  # rempli par generate_answer (taille estimée du prompt)
+        "response_key": cache_key,
+    }
+
+
+def _final_decision(ctx: dict) -> dict:
+    decision = {
+        "intent": ctx["intent"],
+        "destination": ctx["destination"],
+        "kb_used": bool(ctx["kb_info"]),
+        "tools_called": ctx["tools_called"],
+        "llm_decision": ctx["llm_decision"],
+        "decision_path": ctx["decision_path"],
+        "omitted_tools": ctx["omitted_tools"],
+        "reused_tools": ctx["reused_tools"],
+        "answer_source": ctx["answer_source"],
+        "deadline": deadline_info(ctx["deadline_budget"]),
+        "answer_prompt": ctx["answer_prompt"],
+    }
+    timings = timings_breakdown()
+    if timings is not None:
+        # AGENT_DEBUG_TIMINGS=1: durées des étapes en ms (tool.<name> en parallèle, inclus dans tools)
+        decision["timings_ms"] = timings
+    return decision
+
+
+def _answer_in_time(ctx: dict) -> bool:
+    left = remaining()
+    return left is None or left >= AGENT_ANSWER_MIN_SECONDS
+
+
+def _store_response(ctx: dict, response: dict) -> None:
+    # seules les réponses LLM complètes sont resservies: pas de template, de tool omis
+    # ni de texte coupé à l'échéance (le streaming garde la réponse partielle)
+    left = remaining()
+    if ctx["answer_source"] == "llm" and not ctx["omitted_tools"] and (left is None or left > 0):
+        store_response(ctx["response_key"], response, ctx["tool_results"])
+
+
+def _template_answer(ctx: dict) -> str:
+    LLM_FALLBACKS.inc(stage="generate_answer", reason="deadline")
+    ctx["answer_source"] = "template"
+    return template_answer(ctx["destination"], ctx["kb_info"], ctx["tool_results"], ctx["omitted_tools"])
+
+
+@router.post("/query", response_model=AgentResponse)
+async def query_agent(payload: AgentQuery):
+    budget = budget_for(payload.deadline_seconds)
+    with request_deadline(budget), track_request("query"):
+        session = load_session(payload.session_id)
+        prepared = await _prepare_answer(payload.message, session=session)
+        save_session(payload.session_id, session)
+        if isinstance(prepared, AgentResponse):
+            return prepared
+        ctx = prepared
+        ctx["deadline_budget"] = budget
+
+        # =========================================================
+        # 4) Réponse finale via LLM (template si l'échéance est trop proche)
+        # =========================================================
+        final_answer = None
+        if _answer_in_time(ctx):
+            try:
+                with stage("generate_answer"):
+                    final_answer = await generate_answer(
+                        user_message=ctx["user_message"],
+                        destination=ctx["destination"],
+                        kb_info=ctx["kb_info"],
+                        tool_results=ctx["tool_results"] if ctx["tool_results"] else None,
+                        prompt_stats=ctx["answer_prompt"],
+                    )
+            except DeadlineExceeded:
+                pass
+        if final_answer is None:
+            final_answer = _template_answer(ctx)
+
+        # =========================================================
+        # 5) Retour
+        # =========================================================
+        response = AgentResponse(answer=final_answer, decision=_final_decision(ctx))
+        _store_response(ctx, response.model_dump())
+        return response
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/query/stream")
+async def query_agent_stream(payload: AgentQuery):
+    """
+    Même pipeline que /query, en Server-Sent Events:
+    intent, decision, tool_started, tool_finished, puis token (texte au fil de l'eau) et done.
+    L'événement done porte {"answer", "decision"} comme AgentResponse.
+    """
+    async def events():
+        budget = budget_for(payload.deadline_seconds)
+        with request_deadline(budget), track_request("query_stream"):
+            async for event in _events(budget):
+                yield event
+
+    async def _events(budget: float):
+        queue: asyncio.Queue = asyncio.Queue()
+        session = load_session(payload.session_id)
+
+        async def _run():
+            try:
+                return await _prepare_answer(
+                    payload.message,
+                    emit=lambda event, data: queue.put_nowait((event, data)),
+                    session=session,
+                )
+            finally:
+                queue.put_nowait(None)  # fin de la progression
+
+        prepare = asyncio.create_task(_run())
+        try:
+            while (item := await queue.get()) is not None:
+                yield _sse(*item)
+
+            prepared = await prepare
+            save_session(payload.session_id, session)
+            if isinstance(prepared, AgentResponse):
+                yield _sse("token", {"text": prepared.answer})
+                yield _sse("done", prepared.model_dump())
+                return
+            ctx = prepared
+            ctx["deadline_budget"] = budget
+
+            parts = []
+            if _answer_in_time(ctx):
+                stream = generate_answer_stream(
+                    user_message=ctx["user_message"],
+                    destination=ctx["destination"],
+                    kb_info=ctx["kb_info"],
+                    tool_results=ctx["tool_results"] if ctx["tool_results"] else None,
+                    prompt_stats=ctx["answer_prompt"],
+                )
+                try:
+                    with stage("generate_answer"):
+                        async for chunk in stream:
+                            parts.append(chunk)
+                            yield _sse("token", {"text": chunk})
+                except DeadlineExceeded:
+                    pass
+            if not parts:
+                parts.append(_template_answer(ctx))
+                yield _sse("token", {"text": parts[0]})
+
+            response = {"answer": "".join(parts).strip(), "decision": _final_decision(ctx)}
+            _store_response(ctx, response)
+            yield _sse("done", response)
+        except Exception as e:
+            yield _sse("error", {"error": str(e)})
+        finally:
+            if not prepare.done():
+                prepare.cancel()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
+
+
+@router.get("/stats")
+def agent_stats():
+    return {"llm_memo": memo_stats(), "sessions": session_stats(), "response_cache": response_cache_stats()}
@@ -1,7 +1,11 @@
+from typing import Optional
+
 from pydantic import BaseModel
 
 class AgentQuery(BaseModel):
     message: str
+    deadline_seconds: Optional[float] = None  # défaut AGENT_DEADLINE_SECONDS
+    session_id: Optional[str] = None  # suivi de conversation (app/agent/session.py), sans: requête isolée
 
 class AgentResponse(BaseModel):
     answer: str
@@ -0,0 +1,68 @@
+import os
+import time
+from typing import Any, Dict, Optional
+
+from app.mcp.cache import TTLCache
+from app.mcp.service import CACHE_TTL_SECONDS
+
+# État de conversation par session_id (AgentQuery.session_id), en mémoire du process:
+# slots résolus (origin, destination, month), tools du voyage en cours, clarification en attente
+# et derniers résultats de tools.
+AGENT_SESSION_TTL_SECONDS = float(os.getenv("AGENT_SESSION_TTL_SECONDS", "1800"))
+AGENT_SESSION_MAXSIZE = int(os.getenv("AGENT_SESSION_MAXSIZE", "5000"))
+
+_sessions = TTLCache(AGENT_SESSION_MAXSIZE, AGENT_SESSION_TTL_SECONDS)
+
+
+def new_session() -> Dict[str, Any]:
+    return {
+        "origin": None,
+        "destination": None,
+        "month": None,
+        "pending": None,  # {"tools": [...], "missing": "origin" | "destination" | "month"}
+        "tools": [],  # tools du dernier tour qui en utilisait (repris si un message ne change qu'un slot)
+        "tool_results": {},  # name -> {"params", "result", "fetched_at"}
+        "turns": 0,
+    }
+
+
+def load_session(session_id: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    État de la session (nouveau si inconnue ou expirée), None sans session_id.
+    """
+    if not session_id:
+        return None
+    hit = _sessions.get(session_id)
+    return hit[0] if hit is not None else new_session()
+
+
+def save_session(session_id: Optional[str], session: Optional[Dict[str, Any]]) -> None:
+    # TTL glissant: chaque tour repart de zéro
+    if session_id and session is not None:
+        session["turns"] += 1
+        _sessions.set(session_id, session)
+
+
+def remember_result(session: Optional[Dict[str, Any]], name: str, params: Dict[str, Any], result: Any) -> None:
+    if session is not None and isinstance(result, dict) and result.get("status") == "ok":
+        session["tool_results"][name] = {"params": params, "result": result, "fetched_at": time.monotonic()}
+
+
+def reusable_result(session: Optional[Dict[str, Any]], name: str, params: Dict[str, Any]) -> Optional[Any]:
+    """
+    Résultat d'un tour précédent pour les mêmes paramètres, tant qu'il est frais au sens du cache MCP
+    (CACHE_TTL_SECONDS du tool; flights_batch suit flights).
+    """
+    if session is None:
+        return None
+    entry = session["tool_results"].get(name)
+    if entry is None or entry["params"] != params:
+        return None
+    ttl = CACHE_TTL_SECONDS.get(name.split("_")[0], 0.0)
+    if time.monotonic() - entry["fetched_at"] > ttl:
+        return None
+    return entry["result"]
+
+
+def session_stats() -> Dict[str, Any]:
+    return _sessions.stats()
@@ -0,0 +1,14 @@
+import re
+import unicodedata
+
+
+def normalize(text: str) -> str:
+    """
+    Minuscules, sans accents ni ponctuation, espaces simples.
+    """
+    text = text.lower().strip()
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = re.sub(r"[^\w\s]", " ", text)
+    text = re.sub(r"\s+", " ", text).strip()
+    return text
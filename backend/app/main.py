@@ -1,11 +1,26 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
 from app.agent.router import router as agent_router
 from app.mcp.server import router as mcp_router
+from app.mcp.tools.http_client import aclose_client
+from app.mcp.resilience import UpstreamUnavailable, CircuitOpenError
+from app.agent.llm import ollama
+from app.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, render as render_metrics
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 load_dotenv()
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # ferme les connexions keep-alive des clients HTTP partagés
+    await aclose_client()
+    await ollama.aclose()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -15,8 +30,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(UpstreamUnavailable)
+async def upstream_unavailable(request: Request, exc: UpstreamUnavailable):
+    # circuit ouvert / quota atteint sans résultat de secours: 503 immédiat
+    retry_in = exc.retry_in if isinstance(exc, CircuitOpenError) else 1
+    return JSONResponse(
+        status_code=503,
+        content={"status": "error", "error": str(exc)},
+        headers={"Retry-After": str(max(1, int(retry_in)))},
+    )
+
+
 app.include_router(agent_router, prefix="/agent")
 app.include_router(mcp_router)
 @app.get("/")
 def root():
     return {"message": "Backend is running"}
+
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Métriques Prometheus (durées par étape et par tool, cache, erreurs upstream, replis LLM).
+    async: lu sur la boucle qui met les métriques à jour (un endpoint sync tournerait dans le threadpool).
+    """
+    return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
@@ -0,0 +1,72 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """
+    Cache borné (LRU) avec durée de vie par entrée.
+    - ttl: durée pendant laquelle une entrée est fraîche (secondes)
+    - stale_ttl: durée supplémentaire pendant laquelle elle peut encore être servie "stale"
+    - maxsize: nombre max d'entrées (les moins récemment utilisées sont évincées)
+    """
+
+    def __init__(self, maxsize: int, ttl: float, stale_ttl: float = 0.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Tuple[Any, float, bool]]:
+        """
+        Retourne (value, age_seconds, is_stale) ou None si absent / expiré.
+        """
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+
+        stored_at, value = item
+        age = time.monotonic() - stored_at
+        if age > self.ttl + self.stale_ttl:
+            del self._data[key]
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        is_stale = age > self.ttl
+        if is_stale:
+            self.stale_hits += 1
+        else:
+            self.hits += 1
+        return value, age, is_stale
+
+    def set(self, key: Hashable, value: Any, age: float = 0.0) -> None:
+        # age > 0: valeur déjà vieille (ex: relue depuis le store persistant)
+        self._data[key] = (time.monotonic() - age, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "stale_ttl_seconds": self.stale_ttl,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+        }
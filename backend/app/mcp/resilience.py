@@ -0,0 +1,257 @@
+import os
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.agent.deadline import DeadlineExceeded
+from app.metrics import UPSTREAM_ERRORS
+
+# Protection des upstreams scrapés (Kayak, wttr.in), par host:
+# - token bucket: UPSTREAM_RATE_PER_SEC requêtes/s en régime établi, rafales de UPSTREAM_BURST
+#   (par host: UPSTREAM_RATE_LIMITS="www.kayak.fr=1:3,wttr.in=5:10")
+# - circuit breaker: ouvert après BREAKER_FAILURES échecs consécutifs (timeout, réseau, 429, 5xx),
+#   une requête d'essai est laissée passer après BREAKER_RESET_SECONDS
+UPSTREAM_RATE_PER_SEC = float(os.getenv("UPSTREAM_RATE_PER_SEC", "2"))
+UPSTREAM_BURST = int(os.getenv("UPSTREAM_BURST", "8"))
+UPSTREAM_MAX_WAIT_SECONDS = float(os.getenv("UPSTREAM_MAX_WAIT_SECONDS", "2"))
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "30"))
+
+
+def _parse_rate_limits(raw: str) -> Dict[str, Tuple[float, int]]:
+    limits: Dict[str, Tuple[float, int]] = {}
+    for item in raw.split(","):
+        host, _, spec = item.strip().partition("=")
+        rate, _, burst = spec.partition(":")
+        try:
+            limits[host.strip()] = (float(rate), int(burst or UPSTREAM_BURST))
+        except ValueError:
+            continue
+    return limits
+
+
+UPSTREAM_RATE_LIMITS = _parse_rate_limits(os.getenv("UPSTREAM_RATE_LIMITS", ""))
+
+
+class UpstreamUnavailable(Exception):
+    """
+    Requête refusée sans appeler l'upstream (circuit ouvert ou quota dépassé).
+    """
+
+
+class CircuitOpenError(UpstreamUnavailable):
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(f"circuit open for {host} (retry in {retry_in:.0f}s)")
+        self.host = host
+        self.retry_in = retry_in
+
+
+class RateLimitedError(UpstreamUnavailable):
+    def __init__(self, host: str):
+        super().__init__(f"rate limit reached for {host}")
+        self.host = host
+
+
+class TokenBucket:
+    """
+    rate jetons/s, au plus burst jetons en réserve.
+    Un appel qui devrait attendre plus de max_wait est refusé tout de suite.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, max_wait: float) -> Optional[float]:
+        """
+        Réserve un jeton: retourne l'attente nécessaire (0 si dispo) ou None si > max_wait.
+        La réservation est immédiate (tokens peut devenir négatif): pas de verrou nécessaire.
+        """
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        wait = max(0.0, (1 - self.tokens) / self.rate)
+        if wait > max_wait:
+            return None
+        self.tokens -= 1
+        return wait
+
+    async def acquire(self, host: str, max_wait: float) -> None:
+        wait = self.reserve(max_wait)
+        if wait is None:
+            raise RateLimitedError(host)
+        if wait:
+            await asyncio.sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    closed -> (failure_threshold échecs consécutifs) -> open -> (reset_timeout) -> half_open
+    half_open: une seule requête d'essai; succès -> closed, échec -> open.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.last_error: Optional[str] = None
+        self.rejected = 0
+        self._probe = False
+
+    def retry_in(self) -> float:
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        if self.state == "open" and self.retry_in() == 0:
+            self.state = "half_open"
+            self._probe = False
+        if self.state == "half_open":
+            if self._probe:
+                self.rejected += 1
+                return False
+            self._probe = True
+            return True
+        if self.state == "open":
+            self.rejected += 1
+            return False
+        return True
+
+    def release(self) -> None:
+        # requête abandonnée sans verdict (annulée, refusée par le limiter)
+        self._probe = False
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.failures = 0
+        self._probe = False
+
+    def record_failure(self, error: str) -> None:
+        self.failures += 1
+        self.last_error = error
+        self._probe = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "retry_in_seconds": round(self.retry_in(), 1) if self.state == "open" else 0.0,
+            "rejected": self.rejected,
+            "last_error": self.last_error,
+        }
+
+
+_buckets: Dict[str, TokenBucket] = {}
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def _bucket(host: str) -> TokenBucket:
+    bucket = _buckets.get(host)
+    if bucket is None:
+        rate, burst = UPSTREAM_RATE_LIMITS.get(host, (UPSTREAM_RATE_PER_SEC, UPSTREAM_BURST))
+        bucket = _buckets[host] = TokenBucket(rate, burst)
+    return bucket
+
+
+def _breaker(host: str) -> CircuitBreaker:
+    breaker = _breakers.get(host)
+    if breaker is None:
+        breaker = _breakers[host] = CircuitBreaker(BREAKER_FAILURES, BREAKER_RESET_SECONDS)
+    return breaker
+
+
+class _Outcome:
+    # statut HTTP vu par upstream_guard (None: pas de réponse)
+    status: Optional[int] = None
+
+    def observe(self, response: httpx.Response) -> None:
+        self.status = response.status_code
+
+
+def _is_upstream_failure(status: int) -> bool:
+    return status == 429 or status >= 500
+
+
+@asynccontextmanager
+async def upstream_guard(url: str, deadline_bound: bool = False) -> AsyncIterator[_Outcome]:
+    """
+    Entoure un appel upstream: circuit breaker puis token bucket du host.
+    Lève CircuitOpenError / RateLimitedError sans appeler l'upstream.
+    L'appelant signale la réponse via outcome.observe(response);
+    timeouts, erreurs réseau, 429 et 5xx comptent comme échecs.
+    deadline_bound: le timeout a été raccourci par l'échéance de la requête agent. Un timeout ne dit alors
+    rien de l'upstream: DeadlineExceeded est levée sans compter d'échec (sinon un client avec un petit
+    deadline_seconds ouvrirait le circuit pour tout le monde).
+    """
+    host = urlsplit(url).netloc
+    breaker = _breaker(host)
+    if not breaker.allow():
+        UPSTREAM_ERRORS.inc(host=host, reason="circuit_open")
+        raise CircuitOpenError(host, breaker.retry_in())
+    try:
+        await _bucket(host).acquire(host, UPSTREAM_MAX_WAIT_SECONDS)
+    except RateLimitedError:
+        UPSTREAM_ERRORS.inc(host=host, reason="rate_limited")
+        breaker.release()
+        raise
+    except BaseException:
+        breaker.release()
+        raise
+
+    outcome = _Outcome()
+    failed = False
+    try:
+        yield outcome
+    except httpx.TimeoutException as e:
+        if not deadline_bound:
+            failed = True
+            UPSTREAM_ERRORS.inc(host=host, reason="timeout")
+            breaker.record_failure(f"{type(e).__name__}: {e}")
+            raise
+        UPSTREAM_ERRORS.inc(host=host, reason="deadline")
+        raise DeadlineExceeded("request deadline exceeded") from e
+    except httpx.TransportError as e:
+        failed = True
+        UPSTREAM_ERRORS.inc(host=host, reason="transport")
+        breaker.record_failure(f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        if failed:
+            pass
+        elif outcome.status is None:
+            breaker.release()
+        elif _is_upstream_failure(outcome.status):
+            UPSTREAM_ERRORS.inc(host=host, reason=f"http_{outcome.status}")
+            breaker.record_failure(f"HTTP {outcome.status}")
+        else:
+            breaker.record_success()
+
+
+def breaker_states() -> Dict[str, Any]:
+    """
+    État par host (endpoint GET /mcp/breakers).
+    """
+    return {
+        host: {
+            **breaker.snapshot(),
+            "rate_per_sec": _bucket(host).rate,
+            "burst": _bucket(host).burst,
+            "tokens": round(max(_bucket(host).tokens, 0.0), 2),
+        }
+        for host, breaker in _breakers.items()
+    }
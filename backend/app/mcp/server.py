@@ -1,24 +1,53 @@
+import asyncio
 from fastapi import APIRouter
-from app.mcp.tools.weather import scrape_weather
-from app.mcp.tools.flight import scrape_flights
-from app.mcp.tools.hotel import scrape_hotels
+from app.mcp.service import run_tool, run_flights_batch, cache_stats, singleflight_stats, store_stats
+from app.mcp.tools.flight_extract import extract_stats
+from app.mcp.resilience import breaker_states
 
 router = APIRouter(prefix="/mcp")
 
 @router.post("/weather")
-def weather_tool(payload: dict):
-    city = payload.get("city")
-    return scrape_weather(city)
+async def weather_tool(payload: dict):
+    return await run_tool("weather", {"city": payload.get("city")})
 
 @router.post("/flights")
-def flight_tool(payload: dict):
-    origin = payload.get("from")
-    destination = payload.get("to")
-    month = payload.get("month")
-    return scrape_flights(origin, destination, month)
+async def flight_tool(payload: dict):
+    return await run_tool("flights", {
+        "from": payload.get("from"),
+        "to": payload.get("to"),
+        "month": payload.get("month"),
+    })
+
+@router.post("/flights/batch")
+async def flight_batch_tool(payload: dict):
+    return await run_flights_batch({
+        "from": payload.get("from"),
+        "to": payload.get("to"),
+        "month": payload.get("month"),
+        "window": payload.get("window"),
+        "dates": payload.get("dates"),
+        "nights": payload.get("nights"),
+        "step_days": payload.get("step_days"),
+    })
 
 @router.post("/hotels")
-def hotel_tool(payload: dict):
-    city = payload.get("city")
-    month = payload.get("month")
-    return scrape_hotels(city, month)
+async def hotel_tool(payload: dict):
+    return await run_tool("hotels", {"city": payload.get("city"), "month": payload.get("month")})
+
+@router.get("/stats")
+async def stats():
+    # compteurs lus sur la boucle qui les met à jour; seul le store SQLite (bloquant) passe par un thread
+    return {
+        "cache": cache_stats(),
+        "singleflight": singleflight_stats(),
+        "store": await asyncio.to_thread(store_stats),
+        "flight_extract": extract_stats(),
+    }
+
+@router.get("/breakers")
+async def breakers():
+    """
+    État des circuit breakers et des quotas par host upstream.
+    async: breakers et buckets sont créés sur la boucle, ne pas les parcourir depuis le threadpool.
+    """
+    return breaker_states()
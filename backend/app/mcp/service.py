@@ -0,0 +1,289 @@
+import os
+import time
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from app.agent.deadline import detach_deadline
+from app.agent.gazetteer import city_id
+from app.mcp.cache import TTLCache
+from app.mcp.singleflight import SingleFlight
+from app.mcp.store import get_store
+from app.metrics import MCP_CACHE, MCP_SCRAPE_SECONDS, MCP_TOOLS_IN_FLIGHT
+from app.mcp.tools.weather import scrape_weather_async
+from app.mcp.tools.flight import scrape_flights_async, flexible_date_pairs, _month_to_dates as _flight_dates
+from app.mcp.tools.hotel import scrape_hotels_async, _month_to_dates as _hotel_dates
+
+# TTL par tool: la météo bouge vite, les prix moins
+CACHE_TTL_SECONDS = {
+    "weather": float(os.getenv("CACHE_TTL_WEATHER", "600")),
+    "flights": float(os.getenv("CACHE_TTL_FLIGHTS", "10800")),
+    "hotels": float(os.getenv("CACHE_TTL_HOTELS", "21600")),
+}
+# fenêtre pendant laquelle une entrée expirée est encore servie (refresh en arrière-plan)
+CACHE_STALE_SECONDS = {
+    "weather": float(os.getenv("CACHE_STALE_WEATHER", "1800")),
+    "flights": float(os.getenv("CACHE_STALE_FLIGHTS", "21600")),
+    "hotels": float(os.getenv("CACHE_STALE_HOTELS", "43200")),
+}
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1000"))
+
+
+def _city_key(city: Optional[str]) -> str:
+    # "Lisbon" et "lisbonne" partagent la même entrée de cache
+    city = (city or "").strip()
+    return (city_id(city) or city.lower()) if city else ""
+
+
+def _weather_key(p: Dict[str, Any]) -> Optional[Hashable]:
+    city = _city_key(p.get("city"))
+    return ("weather", city) if city else None
+
+
+def _flights_key(p: Dict[str, Any]) -> Optional[Hashable]:
+    origin = (p.get("from") or "").strip().upper()
+    destination = (p.get("to") or "").strip().upper()
+    depart, ret = _flight_dates(p.get("month"))
+    if not origin or not destination or not depart or not ret:
+        return None
+    return ("flights", origin, destination, depart, ret)
+
+
+def _hotels_key(p: Dict[str, Any]) -> Optional[Hashable]:
+    city = _city_key(p.get("city"))
+    checkin, checkout = _hotel_dates(p.get("month"))
+    if not city or not checkin or not checkout:
+        return None
+    return ("hotels", city, checkin, checkout)
+
+
+# name -> (scraper async appelé avec le payload /mcp/<name>, clé de cache normalisée)
+TOOLS: Dict[str, tuple] = {
+    "weather": (lambda p: scrape_weather_async(p.get("city")), _weather_key),
+    "flights": (lambda p: scrape_flights_async(p.get("from"), p.get("to"), p.get("month")), _flights_key),
+    "hotels": (lambda p: scrape_hotels_async(p.get("city"), p.get("month")), _hotels_key),
+}
+
+_caches: Dict[str, TTLCache] = {
+    name: TTLCache(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS[name], CACHE_STALE_SECONDS[name])
+    for name in TOOLS
+}
+
+# dernier résultat valide par clé, servi (stale) quand l'upstream échoue ou que son circuit est ouvert
+CACHE_LAST_GOOD_SECONDS = float(os.getenv("CACHE_LAST_GOOD_SECONDS", "172800"))
+
+_last_good: Dict[str, TTLCache] = {name: TTLCache(CACHE_MAX_ENTRIES, CACHE_LAST_GOOD_SECONDS) for name in TOOLS}
+
+# /mcp/flights/batch: recherches de dates lancées en même temps
+FLIGHT_BATCH_CONCURRENCY = int(os.getenv("FLIGHT_BATCH_CONCURRENCY", "4"))
+
+# scrapes identiques simultanés -> un seul appel upstream
+_singleflight = SingleFlight()
+
+# refresh en arrière-plan: on garde une référence (sinon le task peut être GC)
+_refreshing: Dict[Hashable, asyncio.Task] = {}
+
+
+def _with_marker(result: Any, cached: bool, age: float) -> Any:
+    if not isinstance(result, dict):
+        return result
+    return {**result, "cached": cached, "age_seconds": round(age, 1)}
+
+
+async def _fetch_and_store(name: str, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+    async def _fetch():
+        # fetch partagé (single-flight, refresh): pas borné par l'échéance de la requête qui l'a lancé,
+        # chaque appelant borne sa propre attente (tools_timeout)
+        detach_deadline()
+        start = time.perf_counter()
+        status = "error"
+        try:
+            with MCP_TOOLS_IN_FLIGHT.track(tool=name):
+                result = await fetch()
+            if isinstance(result, dict):
+                status = result.get("status", "error")
+        finally:
+            MCP_SCRAPE_SECONDS.observe(time.perf_counter() - start, tool=name, status=status)
+        # on ne garde que les résultats exploitables
+        if isinstance(result, dict) and result.get("status") == "ok":
+            _caches[name].set(key, result)
+            _last_good[name].set(key, result)
+            store = get_store()
+            if store is not None:
+                await asyncio.to_thread(
+                    store.set, name, key, result, CACHE_TTL_SECONDS[name], CACHE_STALE_SECONDS[name]
+                )
+        return result
+
+    return await _singleflight.do(key, _fetch)
+
+
+def _last_known_good(name: str, key: Hashable, error: Any) -> Optional[Dict[str, Any]]:
+    hit = _last_good[name].get(key)
+    if hit is None:
+        return None
+    value, age, _ = hit
+    MCP_CACHE.inc(tool=name, result="last_known_good")
+    return {**_with_marker(value, True, age), "stale": True, "fallback": "last_known_good", "upstream_error": str(error)}
+
+
+def _schedule_refresh(name: str, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> None:
+    if key in _refreshing or _singleflight.in_flight(key):
+        return
+
+    async def _refresh():
+        try:
+            await _fetch_and_store(name, key, fetch)
+        except Exception:
+            # l'entrée stale reste servie jusqu'à la fin de sa fenêtre
+            pass
+        finally:
+            _refreshing.pop(key, None)
+
+    _refreshing[key] = asyncio.create_task(_refresh())
+
+
+async def run_tool(name: str, payload: Dict[str, Any]) -> Any:
+    """
+    Point d'entrée unique des tools MCP (endpoints /mcp/* et agent en mode local).
+    - cache TTL + LRU par tool, clé = paramètres normalisés
+    - stale-while-revalidate: une entrée expirée est servie tout de suite et rafraîchie en fond
+    - single-flight: les appels identiques simultanés partagent le même scrape
+    - store SQLite optionnel (MCP_STORE_PATH) partagé entre workers, lu après le cache mémoire
+    - upstream en échec ou circuit ouvert (app/mcp/resilience.py): dernier résultat valide pour la clé,
+      marqué stale/fallback, au lieu de l'erreur
+    Le résultat porte cached/age_seconds (scraped_at reste celui du scraping d'origine).
+    """
+    if name not in TOOLS:
+        raise ValueError(f"Unknown MCP tool: {name}")
+
+    scraper, make_key = TOOLS[name]
+    fetch = lambda: scraper(payload)
+
+    key = make_key(payload)
+    if key is None:
+        # paramètres invalides: le scraper renvoie directement son erreur
+        return await fetch()
+
+    hit = _caches[name].get(key)
+    if hit is not None:
+        value, age, is_stale = hit
+        MCP_CACHE.inc(tool=name, result="stale" if is_stale else "hit")
+        if is_stale:
+            _schedule_refresh(name, key, fetch)
+        return _with_marker(value, True, age)
+
+    store = get_store()
+    if store is not None:
+        hit = await asyncio.to_thread(store.get, key)
+        if hit is not None:
+            value, age, is_stale = hit
+            MCP_CACHE.inc(tool=name, result="store")
+            _caches[name].set(key, value, age=age)
+            _last_good[name].set(key, value, age=age)
+            if is_stale:
+                _schedule_refresh(name, key, fetch)
+            return _with_marker(value, True, age)
+
+    MCP_CACHE.inc(tool=name, result="miss")
+    try:
+        result = await _fetch_and_store(name, key, fetch)
+    except Exception as e:
+        fallback = _last_known_good(name, key, e)
+        if fallback is None:
+            raise
+        return fallback
+    if isinstance(result, dict) and result.get("status") != "ok":
+        fallback = _last_known_good(name, key, result.get("error"))
+        if fallback is not None:
+            return fallback
+    return _with_marker(result, False, 0.0)
+
+
+def _fare_price(result: Dict[str, Any]) -> Optional[int]:
+    fares = result.get("fares")
+    if fares:
+        return fares[0]["price"]
+    # résultat en cache antérieur aux "fares": prix texte "512 €"
+    digits = "".join(ch for ch in str(result.get("cheapest_price", "")) if ch.isdigit())
+    return int(digits) if digits else None
+
+
+async def run_flights_batch(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Recherche dates flexibles: un run_tool("flights") par couple de dates (cache, single-flight
+    et connexions partagés), au plus FLIGHT_BATCH_CONCURRENCY à la fois.
+    payload: {"from", "to"} + "dates" | "window" | "month" (voir flight.flexible_date_pairs),
+    options "nights", "step_days".
+    Retourne un résultat au format flights (meilleur couple) + "grid" trié du moins cher au plus cher.
+    """
+    origin, destination = payload.get("from"), payload.get("to")
+    if not origin or not destination:
+        return {"status": "error", "error": "origin and destination (IATA) are required", "source": "Kayak"}
+
+    options = {k: int(payload[k]) for k in ("nights", "step_days") if payload.get(k)}
+    pairs = flexible_date_pairs(payload.get("month"), payload.get("window"), payload.get("dates"), **options)
+    if not pairs:
+        return {
+            "status": "error",
+            "error": "no upcoming dates: give 'dates', 'window' (YYYY-MM-DD/YYYY-MM-DD) or 'month' (YYYY-MM)",
+            "origin": origin,
+            "destination": destination,
+            "source": "Kayak",
+        }
+
+    slots = asyncio.Semaphore(FLIGHT_BATCH_CONCURRENCY)
+
+    async def _search(depart: str, ret: str) -> Dict[str, Any]:
+        async with slots:
+            try:
+                return await run_tool("flights", {"from": origin, "to": destination, "month": f"{depart}/{ret}"})
+            except Exception as e:
+                return {"status": "error", "error": str(e)}
+
+    results = await asyncio.gather(*(_search(d, r) for d, r in pairs))
+
+    grid = []
+    for (depart, ret), result in zip(pairs, results):
+        ok = isinstance(result, dict) and result.get("status") == "ok"
+        grid.append({
+            "depart_date": depart,
+            "return_date": ret,
+            "price": _fare_price(result) if ok else None,
+            "cheapest_price": result.get("cheapest_price") if ok else None,
+            "url": result.get("url") if ok else None,
+            "cached": bool(result.get("cached")) if ok else False,
+            "scraped_at": result.get("scraped_at") if ok else None,
+            "error": None if ok else result.get("error"),
+        })
+    grid.sort(key=lambda row: (row["price"] is None, row["price"] or 0, row["depart_date"]))
+
+    best = grid[0] if grid[0]["price"] is not None else None
+    return {
+        "status": "ok" if any(row["error"] is None for row in grid) else "error",
+        "origin": origin,
+        "destination": destination,
+        "month_input": payload.get("month") or payload.get("window"),
+        "depart_date": best["depart_date"] if best else None,
+        "return_date": best["return_date"] if best else None,
+        "cheapest_price": best["cheapest_price"] if best else "Prix non trouvé",
+        "url": best["url"] if best else None,
+        "grid": grid,
+        "searched": len(grid),
+        "errors": sum(1 for row in grid if row["error"] is not None),
+        "cached": bool(best and best["cached"]),
+        "scraped_at": best["scraped_at"] if best else None,
+        "source": "Kayak",
+    }
+
+
+def cache_stats() -> Dict[str, Any]:
+    return {name: cache.stats() for name, cache in _caches.items()}
+
+
+def singleflight_stats() -> Dict[str, Any]:
+    return _singleflight.stats()
+
+
+def store_stats() -> Optional[Dict[str, Any]]:
+    store = get_store()
+    return store.stats() if store is not None else None
@@ -0,0 +1,45 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Regroupe les appels identiques simultanés: le premier appelant pour une clé
+    lance le fetch, les suivants attendent le même résultat (ou la même erreur).
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.executions = 0
+        self.saved = 0
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            self.executions += 1
+
+            def _done(t: asyncio.Task, key=key):
+                if self._inflight.get(key) is t:
+                    del self._inflight[key]
+                # marque l'erreur comme lue même si tous les appelants ont abandonné
+                if not t.cancelled():
+                    t.exception()
+
+            task.add_done_callback(_done)
+        else:
+            self.saved += 1
+
+        # shield: l'annulation d'un appelant n'annule pas le fetch partagé
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._inflight),
+            "executions": self.executions,
+            "saved_calls": self.saved,
+        }
@@ -0,0 +1,173 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+# Fichier SQLite partagé entre workers uvicorn (vide = store désactivé)
+MCP_STORE_PATH = os.getenv("MCP_STORE_PATH", "").strip()
+MCP_STORE_MAX_ROWS = int(os.getenv("MCP_STORE_MAX_ROWS", "20000"))
+MCP_STORE_MAX_MB = float(os.getenv("MCP_STORE_MAX_MB", "64"))
+MCP_STORE_COMPACT_EVERY = int(os.getenv("MCP_STORE_COMPACT_EVERY", "500"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tool_results (
+    key         TEXT PRIMARY KEY,
+    tool        TEXT NOT NULL,
+    value       TEXT NOT NULL,
+    stored_at   REAL NOT NULL,
+    fresh_until REAL NOT NULL,
+    stale_until REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tool_results_stale_until ON tool_results(stale_until);
+CREATE INDEX IF NOT EXISTS idx_tool_results_accessed_at ON tool_results(accessed_at);
+"""
+
+
+def _serialize_key(key: Hashable) -> str:
+    return json.dumps(key, ensure_ascii=False, separators=(",", ":"))
+
+
+class ResultStore:
+    """
+    Store persistant des résultats de tools MCP (SQLite en mode WAL).
+    - lisible/écrivable par plusieurs process en même temps
+    - expiration (fresh / stale), compaction périodique et plafonds de taille
+    Les méthodes sont bloquantes: les appeler via asyncio.to_thread.
+    """
+
+    def __init__(self, path: str, max_rows: int = MCP_STORE_MAX_ROWS, max_mb: float = MCP_STORE_MAX_MB):
+        self.path = path
+        self.max_rows = max_rows
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._local = threading.local()
+        self._writes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        conn = self._conn()
+        with conn:
+            conn.executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        # une connexion par thread (sqlite3 ne les partage pas entre threads)
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            # auto_vacuum doit être fixé avant la création des tables
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: Hashable) -> Optional[Tuple[Any, float, bool]]:
+        """
+        Retourne (value, age_seconds, is_stale) ou None si absent / expiré.
+        """
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT value, stored_at, fresh_until FROM tool_results WHERE key = ? AND stale_until > ?",
+            (_serialize_key(key), now),
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        conn.execute("UPDATE tool_results SET accessed_at = ? WHERE key = ?", (now, _serialize_key(key)))
+        self.hits += 1
+        value, stored_at, fresh_until = row
+        return json.loads(value), max(0.0, now - stored_at), now > fresh_until
+
+    def set(self, tool: str, key: Hashable, value: Any, ttl: float, stale_ttl: float) -> None:
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO tool_results "
+            "(key, tool, value, stored_at, fresh_until, stale_until, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                _serialize_key(key), tool, json.dumps(value, ensure_ascii=False),
+                now, now + ttl, now + ttl + stale_ttl, now,
+            ),
+        )
+
+        with self._lock:
+            self._writes += 1
+            due = self._writes % MCP_STORE_COMPACT_EVERY == 0
+        if due:
+            self.compact()
+
+    def compact(self) -> Dict[str, int]:
+        """
+        Supprime les entrées expirées puis applique les plafonds (lignes, taille fichier).
+        """
+        conn = self._conn()
+        expired = conn.execute("DELETE FROM tool_results WHERE stale_until <= ?", (time.time(),)).rowcount
+
+        evicted = 0
+        (rows,) = conn.execute("SELECT COUNT(*) FROM tool_results").fetchone()
+        if rows > self.max_rows:
+            evicted += conn.execute(
+                "DELETE FROM tool_results WHERE key IN "
+                "(SELECT key FROM tool_results ORDER BY accessed_at ASC LIMIT ?)",
+                (rows - self.max_rows,),
+            ).rowcount
+
+        # plafond de taille: on évince 10% des moins récemment lues tant que c'est trop gros
+        while self._size_bytes() > self.max_bytes:
+            (rows,) = conn.execute("SELECT COUNT(*) FROM tool_results").fetchone()
+            if rows == 0:
+                break
+            evicted += conn.execute(
+                "DELETE FROM tool_results WHERE key IN "
+                "(SELECT key FROM tool_results ORDER BY accessed_at ASC LIMIT ?)",
+                (max(1, rows // 10),),
+            ).rowcount
+            conn.execute("PRAGMA incremental_vacuum")
+
+        conn.execute("PRAGMA incremental_vacuum")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return {"expired": expired, "evicted": evicted}
+
+    def _size_bytes(self) -> int:
+        conn = self._conn()
+        (page_count,) = conn.execute("PRAGMA page_count").fetchone()
+        (freelist,) = conn.execute("PRAGMA freelist_count").fetchone()
+        (page_size,) = conn.execute("PRAGMA page_size").fetchone()
+        return (page_count - freelist) * page_size
+
+    def stats(self) -> Dict[str, Any]:
+        (rows,) = self._conn().execute("SELECT COUNT(*) FROM tool_results").fetchone()
+        return {
+            "path": self.path,
+            "rows": rows,
+            "max_rows": self.max_rows,
+            "size_bytes": self._size_bytes(),
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+_store: Optional[ResultStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> Optional[ResultStore]:
+    """
+    Store partagé, ou None si MCP_STORE_PATH n'est pas configuré.
+    """
+    global _store
+    if not MCP_STORE_PATH:
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ResultStore(MCP_STORE_PATH)
+    return _store
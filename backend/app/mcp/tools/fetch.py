@@ -0,0 +1,109 @@
+import os
+import time
+import heapq
+import codecs
+from typing import Any, Callable, Dict, List, Optional
+
+from app.mcp.tools.http_client import http_stream
+
+# Téléchargement des pages scrapées: lu par morceaux, borné en taille,
+# interrompu dès que l'appelant a assez d'information.
+SCRAPE_MAX_BYTES = int(os.getenv("SCRAPE_MAX_BYTES", str(3 * 1024 * 1024)))
+SCRAPE_CHUNK_BYTES = int(os.getenv("SCRAPE_CHUNK_BYTES", str(64 * 1024)))
+
+
+async def fetch_text(
+    url: str,
+    *,
+    timeout: float,
+    on_chunk: Optional[Callable[[str], bool]] = None,
+    keep_text: bool = True,
+    max_bytes: int = SCRAPE_MAX_BYTES,
+    **kwargs: Any,
+) -> Dict[str, Any]:
+    """
+    GET en streaming. Lève httpx.HTTPStatusError comme raise_for_status.
+    - on_chunk(text): appelé pour chaque morceau décodé, retourne True pour arrêter la lecture
+    - keep_text: False si l'appelant traite tout dans on_chunk (la page n'est pas gardée)
+    - max_bytes: au-delà, la lecture s'arrête (truncated=True)
+    Retourne {url, text, bytes, truncated, stopped_early, fetch_ms}.
+    """
+    start = time.perf_counter()
+    chunks: List[str] = []
+    read = 0
+    truncated = stopped_early = False
+
+    async with http_stream(url, timeout=timeout, **kwargs) as response:
+        response.raise_for_status()
+        decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+        async for raw in response.aiter_bytes(SCRAPE_CHUNK_BYTES):
+            read += len(raw)
+            chunk = decoder.decode(raw)
+            if keep_text:
+                chunks.append(chunk)
+            if on_chunk is not None and on_chunk(chunk):
+                stopped_early = True
+                break
+            if read >= max_bytes:
+                truncated = True
+                break
+        else:
+            tail = decoder.decode(b"", final=True)
+            if keep_text:
+                chunks.append(tail)
+            if on_chunk is not None and tail:
+                on_chunk(tail)
+        final_url = str(response.url)
+
+    return {
+        "url": final_url,
+        "text": "".join(chunks) if keep_text else None,
+        "bytes": read,
+        "truncated": truncated,
+        "stopped_early": stopped_early,
+        "fetch_ms": round((time.perf_counter() - start) * 1000, 1),
+    }
+
+
+class LowestPrices:
+    """
+    Les n plus petits prix vus dans un flux de texte (tas borné, O(log n) par prix).
+    Les derniers caractères de chaque morceau sont gardés pour le suivant:
+    un prix coupé entre deux morceaux ("1 2" | "34 €") n'est lu qu'une fois, en entier.
+    - extract(text) -> List[int]: prix trouvés dans un texte
+    """
+
+    TAIL = 24
+
+    def __init__(self, n: int, extract: Callable[[str], List[int]]):
+        self.n = n
+        self.extract = extract
+        self.seen = 0
+        self._heap: List[int] = []  # valeurs négatives: le sommet est le plus grand des n gardés
+        self._tail = ""
+
+    def feed(self, chunk: str) -> None:
+        text = self._tail + chunk
+        cut = max(len(text) - self.TAIL, 0)
+        floor = max(cut - self.TAIL, 0)
+        # ne pas couper au milieu d'un montant
+        while cut > floor and (text[cut - 1].isdigit() or text[cut - 1].isspace()):
+            cut -= 1
+        self._add(text[:cut])
+        self._tail = text[cut:]
+
+    def close(self) -> List[int]:
+        self._add(self._tail)
+        self._tail = ""
+        return self.lowest()
+
+    def _add(self, text: str) -> None:
+        for price in self.extract(text):
+            self.seen += 1
+            if len(self._heap) < self.n:
+                heapq.heappush(self._heap, -price)
+            elif -price > self._heap[0]:
+                heapq.heapreplace(self._heap, -price)
+
+    def lowest(self) -> List[int]:
+        return sorted(-p for p in self._heap)
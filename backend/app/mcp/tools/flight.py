@@ -1,7 +1,42 @@
+import os
 import re
-import requests
-from datetime import date
-from bs4 import BeautifulSoup
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, List, Optional, Tuple
+
+from app.mcp.tools.flight_extract import extract_flight_fares, record_extract
+from app.mcp.tools.fetch import fetch_text
+from app.mcp.tools.http_client import run_sync
+
+# racine du site scrapé (KAYAK_BASE_URL=http://127.0.0.1:9100 pour scripts/fake_upstreams.py)
+KAYAK_BASE_URL = os.getenv("KAYAK_BASE_URL", "https://www.kayak.fr").rstrip("/")
+
+# 0 (défaut): toute la page de résultats est lue (jusqu'à SCRAPE_MAX_BYTES).
+# N > 0: lecture arrêtée après N cartes résultat. La page est triée par "meilleur" vol (sort=bestflight_a),
+# pas par prix: les tarifs les moins chers plus bas dans la page sont manqués
+# (scripts/fixtures/flights_dom_1500k, N=15: 141 € remonté au lieu de 89 €).
+FLIGHT_STOP_AFTER_RESULTS = int(os.getenv("FLIGHT_STOP_AFTER_RESULTS", "0"))
+_RESULT_MARKER = 'data-testid="resultPrice"'
+
+# dates flexibles (/mcp/flights/batch): un aller tous les FLIGHT_BATCH_STEP_DAYS jours,
+# retour FLIGHT_BATCH_NIGHTS nuits plus tard, FLIGHT_BATCH_MAX_DATES couples au plus
+FLIGHT_BATCH_NIGHTS = int(os.getenv("FLIGHT_BATCH_NIGHTS", "7"))
+FLIGHT_BATCH_STEP_DAYS = int(os.getenv("FLIGHT_BATCH_STEP_DAYS", "4"))
+FLIGHT_BATCH_MAX_DATES = int(os.getenv("FLIGHT_BATCH_MAX_DATES", "8"))
+
+def stop_after_results(limit: int) -> Callable[[str], bool]:
+    """
+    on_chunk pour fetch_text: True une fois limit cartes résultat lues (jamais si limit <= 0).
+    """
+    seen = 0
+
+    def _on_chunk(chunk: str) -> bool:
+        nonlocal seen
+        seen += chunk.count(_RESULT_MARKER)
+        return 0 < limit <= seen
+
+    return _on_chunk
+
 
 def _month_to_dates(month: str):
     """
@@ -32,17 +67,68 @@ def _month_to_dates(month: str):
     return None, None
 
 
-def _pick_price_from_text(text: str) -> str | None:
-    """
-    Fallback simple: cherche un prix en € dans le HTML.
-    """
-    m = re.search(r"(\d[\d\s]{1,10})\s?€", text)
-    if not m:
+def _parse_day(value: str) -> Optional[date]:
+    try:
+        return date.fromisoformat(str(value).strip())
+    except ValueError:
         return None
-    return m.group(0).strip()
 
 
-def scrape_flights(origin: str, destination: str, month: str):
+def _spread(items: list, limit: int) -> list:
+    # limit éléments répartis régulièrement (premier et dernier inclus)
+    if len(items) <= limit:
+        return items
+    if limit <= 1:
+        return items[:limit]
+    return [items[round(i * (len(items) - 1) / (limit - 1))] for i in range(limit)]
+
+
+def flexible_date_pairs(
+    month: Optional[str] = None,
+    window: Optional[str] = None,
+    dates: Optional[list] = None,
+    nights: int = FLIGHT_BATCH_NIGHTS,
+    step_days: int = FLIGHT_BATCH_STEP_DAYS,
+    max_dates: int = FLIGHT_BATCH_MAX_DATES,
+) -> List[Tuple[str, str]]:
+    """
+    Couples (aller, retour) à chercher, par ordre de priorité:
+    - dates: ["2026-03-01/2026-03-08", ["2026-03-05", "2026-03-12"], ...]
+    - window: 'YYYY-MM-DD/YYYY-MM-DD' = fenêtre des dates de départ
+    - month: 'YYYY-MM' = tous les départs du mois
+    Les départs passés sont ignorés. Liste vide si rien d'exploitable.
+    """
+    pairs: List[Tuple[date, date]] = []
+    if dates:
+        for item in dates:
+            parts = item.split("/") if isinstance(item, str) else list(item or [])
+            if len(parts) != 2:
+                continue
+            depart, ret = _parse_day(parts[0]), _parse_day(parts[1])
+            if depart and ret and date.today() <= depart <= ret:
+                pairs.append((depart, ret))
+        pairs = pairs[:max_dates]
+    else:
+        start = end = None
+        if window and "/" in window:
+            first, last = window.split("/", 1)
+            start, end = _parse_day(first), _parse_day(last)
+        elif month and re.fullmatch(r"\d{4}-\d{2}", month.strip()):
+            y, m = (int(x) for x in month.strip().split("-"))
+            if 1 <= m <= 12:
+                start = date(y, m, 1)
+                end = date(y + m // 12, m % 12 + 1, 1) - timedelta(days=1)
+        if not start or not end or start > end:
+            return []
+        step = max(step_days, 1)
+        departures = [start + timedelta(days=i) for i in range(0, (end - start).days + 1, step)]
+        departures = _spread([d for d in departures if d >= date.today()], max_dates)
+        pairs = [(d, d + timedelta(days=nights)) for d in departures]
+
+    return [(d.isoformat(), r.isoformat()) for d, r in pairs]
+
+
+async def scrape_flights_async(origin: str, destination: str, month: str):
     """
     origin/destination doivent être des IATA (CDG, BKK, etc.)
     month peut être 'YYYY-MM' ou 'YYYY-MM-DD/YYYY-MM-DD'
@@ -66,7 +152,7 @@ def scrape_flights(origin: str, destination: str, month: str):
             "source": "Kayak"
         }
 
-    url = f"https://www.kayak.fr/flights/{origin}-{destination}/{depart_date}/{return_date}"
+    url = f"{KAYAK_BASE_URL}/flights/{origin}-{destination}/{depart_date}/{return_date}"
     params = {"sort": "bestflight_a"}
 
     headers = {
@@ -78,36 +164,14 @@ def scrape_flights(origin: str, destination: str, month: str):
         "Accept-Language": "fr-FR,fr;q=0.9,en;q=0.8",
     }
 
-    response = requests.get(url, headers=headers, params=params, timeout=20)
-    response.raise_for_status()
-
-    html = response.text
-    soup = BeautifulSoup(html, "html.parser")
-
-    # Tentatives de sélecteurs (Kayak change souvent)
-    selectors = [
-        ("div", {"data-testid": "resultPrice"}),        # parfois
-        ("span", {"class": re.compile(r".*price.*", re.I)}),  # heuristique
-    ]
-
-    found_price = None
-
-    # 1) selectors
-    for tag_name, attrs in selectors:
-        try:
-            el = soup.find(tag_name, attrs=attrs)
-            if el and el.get_text(strip=True):
-                txt = el.get_text(" ", strip=True)
-                p = _pick_price_from_text(txt)
-                if p:
-                    found_price = p
-                    break
-        except Exception:
-            pass
-
-    # 2) fallback regex global
-    if not found_price:
-        found_price = _pick_price_from_text(html)
+    page = await fetch_text(
+        url, headers=headers, params=params, timeout=20, on_chunk=stop_after_results(FLIGHT_STOP_AFTER_RESULTS)
+    )
+
+    # parsing CPU (JSON embarqué / lxml) hors de la boucle asyncio
+    extracted = await asyncio.to_thread(extract_flight_fares, page["text"])
+    record_extract(extracted["method"], extracted["parse_ms"])
+    fares = extracted["fares"]
 
     return {
         "status": "ok",
@@ -116,7 +180,20 @@ def scrape_flights(origin: str, destination: str, month: str):
         "depart_date": depart_date,
         "return_date": return_date,
         "month_input": month,
-        "cheapest_price": found_price if found_price else "Prix non trouvé",
-        "url": response.url,
-        "source": "Kayak"
+        "cheapest_price": f"{fares[0]['price']} €" if fares else "Prix non trouvé",
+        "fares": fares,
+        "extraction": extracted["method"],
+        "parse_ms": extracted["parse_ms"],
+        "bytes_read": page["bytes"],
+        "early_stop": page["stopped_early"],
+        "url": page["url"],
+        "source": "Kayak",
+        "scraped_at": datetime.now(timezone.utc).isoformat()
     }
+
+
+def scrape_flights(origin: str, destination: str, month: str):
+    """
+    Version synchrone (scripts / shell) de scrape_flights_async.
+    """
+    return run_sync(scrape_flights_async(origin, destination, month))
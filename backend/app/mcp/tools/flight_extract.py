@@ -0,0 +1,237 @@
+import os
+import re
+import json
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+# Extraction des tarifs d'une page résultats Kayak, de la plus fiable à la moins fiable:
+# 1) état JSON embarqué (<script type="application/json">, ld+json, window.X = {...})
+# 2) DOM ciblé: seuls les nœuds prix sont construits (cible de parseur lxml, ou SoupStrainer si lxml absent)
+# 3) regex "123 €" sur le texte brut (dernier recours)
+FLIGHT_MAX_FARES = int(os.getenv("FLIGHT_MAX_FARES", "5"))
+FLIGHT_MIN_PRICE = int(os.getenv("FLIGHT_MIN_PRICE", "15"))
+FLIGHT_MAX_PRICE = int(os.getenv("FLIGHT_MAX_PRICE", "20000"))
+
+_JSON_SCRIPT_RE = re.compile(
+    r"<script[^>]*type=[\"']application/(?:ld\+)?json[\"'][^>]*>(.*?)</script>",
+    re.S | re.I,
+)
+_WINDOW_STATE_RE = re.compile(r"<script[^>]*>\s*window\.[\w.$]+\s*=\s*(\{.*?\})\s*;?\s*</script>", re.S)
+_EUR_RE = re.compile(r"(\d[\d\s\u202f\u00a0]{0,10})\s?€")
+
+PRICE_KEYS = ("price", "totalPrice", "displayPrice", "lowestPrice", "cheapestPrice", "amount")
+AIRLINE_KEYS = ("airline", "airlineName", "carrier", "carrierName")
+DOM_XPATH = (
+    "//*[@data-testid='resultPrice']"
+    " | //span[contains(translate(@class, 'PRICE', 'price'), 'price')]"
+)
+JSON_MAX_NODES = 200_000
+
+# mis à jour par record_extract, sur la boucle asyncio (pas depuis le thread de extract_flight_fares)
+_stats: Dict[str, Any] = {"pages": 0, "total_ms": 0.0, "max_ms": 0.0, "methods": {}}
+
+
+def _lxml_available() -> bool:
+    try:
+        import lxml.html  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+_HAS_LXML = _lxml_available()
+
+
+def _to_price(value: Any) -> Optional[int]:
+    """
+    512, 512.4, "512", "1 234 €", {"amount": 512} -> int en euros (None si non plausible).
+    """
+    if isinstance(value, dict):
+        value = next((value[k] for k in ("amount", "value", "price") if k in value), None)
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        price = int(round(value))
+    else:
+        text = str(value).strip()
+        try:
+            return _to_price(float(text))
+        except ValueError:
+            pass
+        digits = re.sub(r"[^\d]", "", text.split(",")[0])
+        if not digits:
+            return None
+        price = int(digits)
+    return price if FLIGHT_MIN_PRICE <= price <= FLIGHT_MAX_PRICE else None
+
+
+def _rank(fares: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # un tarif par prix (le premier vu garde la compagnie), du moins cher au plus cher
+    by_price: Dict[int, Dict[str, Any]] = {}
+    for fare in fares:
+        by_price.setdefault(fare["price"], fare)
+    return [by_price[p] for p in sorted(by_price)[:FLIGHT_MAX_FARES]]
+
+
+def _fares_from_json(data: Any) -> List[Dict[str, Any]]:
+    fares = []
+    stack = [data]
+    seen = 0
+    while stack and seen < JSON_MAX_NODES:
+        node = stack.pop()
+        seen += 1
+        if isinstance(node, list):
+            stack.extend(node)
+            continue
+        if not isinstance(node, dict):
+            continue
+        currency = node.get("currency") or node.get("priceCurrency") or node.get("currencyCode")
+        if currency in (None, "EUR", "€"):
+            for key in PRICE_KEYS:
+                if key == "amount" and currency is None:
+                    continue  # "amount" seul: trop ambigu (bagages, taxes...)
+                price = _to_price(node.get(key))
+                if price:
+                    fare = {"price": price, "currency": "EUR"}
+                    airline = next((node[k] for k in AIRLINE_KEYS if isinstance(node.get(k), str)), None)
+                    if airline:
+                        fare["airline"] = airline
+                    fares.append(fare)
+                    break
+        stack.extend(v for v in node.values() if isinstance(v, (dict, list)))
+    return fares
+
+
+def extract_from_json(html: str) -> List[Dict[str, Any]]:
+    fares = []
+    for pattern in (_JSON_SCRIPT_RE, _WINDOW_STATE_RE):
+        for block in pattern.findall(html):
+            try:
+                data = json.loads(block)
+            except ValueError:
+                continue
+            fares.extend(_fares_from_json(data))
+    return _rank(fares)
+
+
+def _is_price_node(tag: str, attrib: Dict[str, str]) -> bool:
+    # mêmes cibles que DOM_XPATH
+    if attrib.get("data-testid") == "resultPrice":
+        return True
+    return tag == "span" and "price" in attrib.get("class", "").lower()
+
+
+class _PriceTarget:
+    """
+    Cible du parseur lxml (événements, pas d'arbre): seul le texte des nœuds prix est gardé,
+    le reste de la page (scripts, cartes, filler) est lu sans être construit.
+    """
+
+    def __init__(self):
+        self.texts: List[str] = []
+        self._depth = 0
+        self._parts: List[str] = []
+
+    def start(self, tag, attrib):
+        if self._depth:
+            self._depth += 1
+        elif _is_price_node(tag, attrib):
+            self._depth = 1
+            self._parts = []
+
+    def end(self, tag):
+        if self._depth:
+            self._depth -= 1
+            if not self._depth:
+                self.texts.append("".join(self._parts))
+
+    def data(self, data):
+        if self._depth:
+            self._parts.append(data)
+
+    def close(self):
+        return self.texts
+
+
+def _texts_lxml(html: str) -> List[str]:
+    from lxml import etree
+
+    # avec une cible, fromstring renvoie _PriceTarget.close() au lieu d'un arbre
+    return etree.fromstring(html, etree.HTMLParser(target=_PriceTarget()))
+
+
+def _texts_soup(html: str) -> List[str]:
+    from bs4 import BeautifulSoup, SoupStrainer
+
+    # parse_only: seuls les nœuds prix (et leur contenu) sont construits, même cibles que DOM_XPATH
+    strainers = [
+        SoupStrainer(attrs={"data-testid": "resultPrice"}),
+        SoupStrainer("span", attrs={"class": re.compile(r"price", re.I)}),
+    ]
+    texts: List[str] = []
+    for strainer in strainers:
+        soup = BeautifulSoup(html, "html.parser", parse_only=strainer)
+        texts.extend(el.get_text(" ", strip=True) for el in soup.contents if hasattr(el, "get_text"))
+        if texts:
+            break
+    return texts
+
+
+def extract_from_dom(html: str) -> List[Dict[str, Any]]:
+    texts = _texts_lxml(html) if _HAS_LXML else _texts_soup(html)
+    return extract_from_text(" ".join(texts))
+
+
+def extract_from_text(text: str) -> List[Dict[str, Any]]:
+    fares = []
+    for raw in _EUR_RE.findall(text):
+        price = _to_price(raw)
+        if price:
+            fares.append({"price": price, "currency": "EUR"})
+    return _rank(fares)
+
+
+EXTRACTORS = [
+    ("json", extract_from_json),
+    ("dom", extract_from_dom),
+    ("regex", extract_from_text),
+]
+
+
+def extract_flight_fares(html: str) -> Dict[str, Any]:
+    """
+    Tarifs classés du moins cher au plus cher (FLIGHT_MAX_FARES max).
+    Retourne {fares, method, parse_ms}; method=None si aucun prix trouvé.
+    Appel CPU: à lancer via asyncio.to_thread, puis record_extract sur la boucle.
+    """
+    start = time.perf_counter()
+    fares: List[Dict[str, Any]] = []
+    method = None
+    for name, extract in EXTRACTORS:
+        try:
+            fares = extract(html)
+        except Exception:
+            fares = []
+        if fares:
+            method = name
+            break
+    parse_ms = round((time.perf_counter() - start) * 1000, 2)
+    return {"fares": fares, "method": method, "parse_ms": parse_ms}
+
+
+def record_extract(method: Optional[str], parse_ms: float) -> None:
+    _stats["pages"] += 1
+    _stats["total_ms"] += parse_ms
+    _stats["max_ms"] = max(_stats["max_ms"], parse_ms)
+    _stats["methods"][method or "none"] = _stats["methods"].get(method or "none", 0) + 1
+
+
+def extract_stats() -> Dict[str, Any]:
+    pages = _stats["pages"]
+    return {
+        "pages": pages,
+        "avg_parse_ms": round(_stats["total_ms"] / pages, 2) if pages else 0.0,
+        "max_parse_ms": _stats["max_ms"],
+        "methods": dict(_stats["methods"]),
+        "parser": "lxml" if _HAS_LXML else "html.parser",
+    }
@@ -1,8 +1,21 @@
+import os
 import re
-import requests
 from datetime import date, datetime, timezone
 
 from app.agent.stays import get_stay_location
+from app.mcp.tools.fetch import fetch_text, LowestPrices
+from app.mcp.tools.http_client import run_sync
+
+# racine du site scrapé (même variable que les vols)
+KAYAK_BASE_URL = os.getenv("KAYAK_BASE_URL", "https://www.kayak.fr").rstrip("/")
+
+# échantillon: les HOTEL_SAMPLE_SIZE prix les plus bas de la page
+HOTEL_SAMPLE_SIZE = int(os.getenv("HOTEL_SAMPLE_SIZE", "10"))
+# 0 (défaut): toute la liste de résultats est lue (jusqu'à SCRAPE_MAX_BYTES).
+# N > 0: lecture arrêtée après N prix. Moins d'octets lus, mais les hôtels les moins chers plus bas
+# dans la page sont manqués: sur une page de 200 résultats (scripts/fixtures/hotels_1500k),
+# N=150 rate 3 des 10 prix les plus bas et le minimum remonté est faux.
+HOTEL_MAX_PRICES_SCANNED = int(os.getenv("HOTEL_MAX_PRICES_SCANNED", "0"))
 
 
 def _month_to_dates(month: str):
@@ -46,7 +59,7 @@ def _extract_eur_prices(text: str):
     return prices
 
 
-def scrape_hotels(city: str, month: str):
+async def scrape_hotels_async(city: str, month: str):
     """
     Scraping Kayak stays:
     URL format:
@@ -61,7 +74,7 @@ def scrape_hotels(city: str, month: str):
     if not loc:
         return {
             "status": "error",
-            "error": f"Unknown city for stays mapping: {city}. Add slug/pid in app/agent/stays.py",
+            "error": f"Unknown city for stays mapping: {city}. Add kayak_stay (slug/pid) in app/agent/data/gazetteer.json",
             "city": city,
             "source": "Kayak"
         }
@@ -79,7 +92,7 @@ def scrape_hotels(city: str, month: str):
     slug = loc["slug"]
     pid = loc["pid"]
 
-    url = f"https://www.kayak.fr/hotels/{slug}-p{pid}/{checkin}/{checkout}/2adults;map"
+    url = f"{KAYAK_BASE_URL}/hotels/{slug}-p{pid}/{checkin}/{checkout}/2adults;map"
     params = {"sort": "rank_a"}
 
     headers = {
@@ -92,14 +105,17 @@ def scrape_hotels(city: str, month: str):
     }
 
     try:
-        r = requests.get(url, params=params, headers=headers, timeout=25, allow_redirects=True)
-        r.raise_for_status()
+        # page lue en streaming: seuls les HOTEL_SAMPLE_SIZE prix les plus bas sont gardés (tas),
+        # lecture arrêtée après HOTEL_MAX_PRICES_SCANNED prix si la limite est activée
+        lowest = LowestPrices(HOTEL_SAMPLE_SIZE, _extract_eur_prices)
 
-        html = r.text
-        prices = sorted(_extract_eur_prices(html))
+        def _on_chunk(chunk: str) -> bool:
+            lowest.feed(chunk)
+            return 0 < HOTEL_MAX_PRICES_SCANNED <= lowest.seen
 
-        # on prend les 10 plus bas comme échantillon (heuristique)
-        sample = prices[:10]
+        r = await fetch_text(url, params=params, headers=headers, timeout=25, on_chunk=_on_chunk, keep_text=False)
+
+        sample = lowest.close()
         if sample:
             min_price = sample[0]
             avg_price = int(sum(sample) / len(sample))
@@ -118,7 +134,10 @@ def scrape_hotels(city: str, month: str):
             "min_price_eur": min_price if found else "Prix non trouvé",
             "avg_price_eur": avg_price if found else "Prix non trouvé",
             "sample_size": len(sample),
-            "url": r.url,
+            "prices_scanned": lowest.seen,
+            "bytes_read": r["bytes"],
+            "early_stop": r["stopped_early"],
+            "url": r["url"],
             "source": "Kayak",
             "scraped_at": datetime.now(timezone.utc).isoformat()
         }
@@ -131,7 +150,14 @@ def scrape_hotels(city: str, month: str):
             "checkin": checkin,
             "checkout": checkout,
             "error": str(e),
-            "url": r.url if "r" in locals() else url,
+            "url": url,
             "source": "Kayak",
             "scraped_at": datetime.now(timezone.utc).isoformat()
         }
+
+
+def scrape_hotels(city: str, month: str):
+    """
+    Version synchrone (scripts / shell) de scrape_hotels_async.
+    """
+    return run_sync(scrape_hotels_async(city, month))
@@ -0,0 +1,122 @@
+import os
+import asyncio
+import httpx
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+from urllib.parse import urlsplit
+
+from app.agent.deadline import clamp_timeout
+from app.mcp.resilience import upstream_guard
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "50"))
+HTTP_MAX_PER_HOST = int(os.getenv("HTTP_MAX_PER_HOST", "8"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+
+
+def _http2_available() -> bool:
+    # HTTP/2 seulement si le paquet h2 est installé (pip install "httpx[http2]")
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+# Un client httpx est lié à la boucle asyncio qui l'a créé:
+# on garde donc le client (et les sémaphores par host) avec leur boucle.
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_host_slots: Dict[str, asyncio.Semaphore] = {}
+
+
+def get_client() -> httpx.AsyncClient:
+    """
+    Client HTTP partagé (keep-alive, HTTP/2 si dispo) pour tous les scrapers.
+    Doit être appelé depuis une coroutine.
+    """
+    global _client, _client_loop, _host_slots
+
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client = httpx.AsyncClient(
+            http2=_http2_available(),
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )
+        _client_loop = loop
+        _host_slots = {}
+    return _client
+
+
+def _host_slot(url: str) -> asyncio.Semaphore:
+    host = urlsplit(url).netloc
+    slot = _host_slots.get(host)
+    if slot is None:
+        slot = asyncio.Semaphore(HTTP_MAX_PER_HOST)
+        _host_slots[host] = slot
+    return slot
+
+
+async def http_get(url: str, *, timeout: float, **kwargs: Any) -> httpx.Response:
+    """
+    GET via le client partagé, borné à HTTP_MAX_PER_HOST requêtes simultanées par host.
+    Upstream protégé (app/mcp/resilience.py): peut lever UpstreamUnavailable sans appel réseau.
+    Pendant une requête agent, timeout est borné au temps restant (app/agent/deadline.py).
+    """
+    bounded = clamp_timeout(timeout)
+    client = get_client()
+    async with upstream_guard(url, deadline_bound=bounded < timeout) as outcome:
+        async with _host_slot(url):
+            response = await client.get(url, timeout=bounded, **kwargs)
+        outcome.observe(response)
+        return response
+
+
+async def http_post(url: str, *, timeout: float, **kwargs: Any) -> httpx.Response:
+    timeout = clamp_timeout(timeout)
+    client = get_client()
+    async with _host_slot(url):
+        return await client.post(url, timeout=timeout, **kwargs)
+
+
+@asynccontextmanager
+async def http_stream(url: str, *, timeout: float, **kwargs: Any) -> AsyncIterator[httpx.Response]:
+    """
+    GET en streaming (corps lu au fil de l'eau), même borne et même protection que http_get.
+    """
+    bounded = clamp_timeout(timeout)
+    client = get_client()
+    async with upstream_guard(url, deadline_bound=bounded < timeout) as outcome:
+        async with _host_slot(url):
+            async with client.stream("GET", url, timeout=bounded, **kwargs) as response:
+                outcome.observe(response)
+                yield response
+
+
+async def aclose_client() -> None:
+    """
+    Ferme le client s'il appartient à la boucle courante (shutdown de l'app).
+    """
+    global _client, _client_loop
+
+    if _client is not None and _client_loop is asyncio.get_running_loop():
+        await _client.aclose()
+        _client = None
+        _client_loop = None
+
+
+def run_sync(coro):
+    """
+    Exécute un scraper async depuis du code synchrone (scripts, shell).
+    """
+    async def _runner():
+        try:
+            return await coro
+        finally:
+            await aclose_client()
+
+    return asyncio.run(_runner())
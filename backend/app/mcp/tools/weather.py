@@ -13,10 +13,16 @@ def scrape_weather(city: str):
     }
 """
 
-import requests
+import os
 from datetime import datetime, timezone
 
-def scrape_weather(city: str):
+from app.mcp.tools.http_client import http_get, run_sync
+
+# racine du service météo (WTTR_BASE_URL=http://127.0.0.1:9100/wttr pour scripts/fake_upstreams.py)
+WTTR_BASE_URL = os.getenv("WTTR_BASE_URL", "https://wttr.in").rstrip("/")
+
+
+async def scrape_weather_async(city: str):
     """
     Tool météo simple via wttr.in
     - city: str (ex: 'Bangkok', 'Lisbon')
@@ -25,7 +31,7 @@ def scrape_weather(city: str):
     if not city:
         return {"status": "error", "error": "city is required", "source": "wttr.in"}
 
-    url = f"https://wttr.in/{city}"
+    url = f"{WTTR_BASE_URL}/{city}"
     params = {"format": "3", "lang": "fr"}
 
     headers = {
@@ -38,7 +44,7 @@ def scrape_weather(city: str):
     }
 
     try:
-        r = requests.get(url, params=params, headers=headers, timeout=10)
+        r = await http_get(url, params=params, headers=headers, timeout=10)
         r.raise_for_status()
 
         raw = r.text.strip()
@@ -47,7 +53,7 @@ def scrape_weather(city: str):
             "status": "ok",
             "city": city,
             "raw": raw,
-            "url": r.url,
+            "url": str(r.url),
             "source": "wttr.in",
             "scraped_at": datetime.now(timezone.utc).isoformat()
         }
@@ -60,3 +66,10 @@ def scrape_weather(city: str):
             "source": "wttr.in",
             "scraped_at": datetime.now(timezone.utc).isoformat()
         }
+
+
+def scrape_weather(city: str):
+    """
+    Version synchrone (scripts / shell) de scrape_weather_async.
+    """
+    return run_sync(scrape_weather_async(city))
@@ -0,0 +1,233 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Métriques au format texte Prometheus (GET /metrics), sans dépendance externe.
+# Mises à jour et lecture (GET /metrics, endpoint async) se font sur la boucle asyncio: pas de verrou.
+# Ni mise à jour ni lecture depuis un thread (endpoint sync, asyncio.to_thread).
+# AGENT_DEBUG_TIMINGS=1: le détail des durées de la requête est aussi ajouté à "decision".
+AGENT_DEBUG_TIMINGS = os.getenv("AGENT_DEBUG_TIMINGS", "0").strip().lower() in {"1", "true", "yes", "on"}
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# secondes: des règles (~ms) aux scrapes et à la génération LLM (dizaines de secondes)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+REGISTRY: List["_Metric"] = []
+
+
+def _fmt(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        REGISTRY.append(self)
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...], extra: Sequence[Tuple[str, str]] = ()) -> str:
+        pairs = [*zip(self.labelnames, key), *extra]
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{self._labels(key)} {_fmt(value)}" for key, value in sorted(self._values.items())]
+
+    def render(self) -> str:
+        return "\n".join([f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self.samples()])
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    @contextmanager
+    def track(self, **labels: Any) -> Iterator[None]:
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    """
+    Compteurs par bucket (non cumulés en mémoire, cumulés au rendu), somme et nombre d'observations.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            state = self._values[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        state["counts"][index] += 1
+        state["sum"] += value
+        state["count"] += 1
+
+    def count(self, **labels: Any) -> int:
+        state = self._values.get(self._key(labels))
+        return state["count"] if state else 0
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, state in sorted(self._values.items()):
+            cumulative = 0
+            for bound, n in zip([*self.buckets, float("inf")], state["counts"]):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{self._labels(key, [('le', _fmt(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {_fmt(round(state['sum'], 6))}")
+            lines.append(f"{self.name}_count{self._labels(key)} {state['count']}")
+        return lines
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+
+def render() -> str:
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+# =========================================================
+# Agent (/agent/query, /agent/query/stream)
+# =========================================================
+AGENT_REQUESTS_IN_FLIGHT = Gauge("agent_requests_in_flight", "Requêtes agent en cours", ["endpoint"])
+AGENT_REQUEST_SECONDS = Histogram("agent_request_seconds", "Durée totale d'une requête agent", ["endpoint"])
+AGENT_STAGE_SECONDS = Histogram(
+    "agent_stage_seconds",
+    "Durée par étape du pipeline (règles, appels LLM, tools, réponse)",
+    ["stage"],
+)
+AGENT_TOOL_SECONDS = Histogram("agent_tool_seconds", "Durée d'un tool vue par l'agent", ["tool", "status"])
+AGENT_RESPONSE_CACHE = Counter(
+    "agent_response_cache_total",
+    "Cache des réponses complètes (hit, miss, expired, store, skip)",
+    ["result"],
+)
+LLM_FALLBACKS = Counter(
+    "llm_fallbacks_total",
+    "Étapes LLM remplacées par un repli (règles, mots-clés, template)",
+    ["stage", "reason"],
+)
+
+# =========================================================
+# LLM (Ollama)
+# =========================================================
+LLM_CALLS_IN_FLIGHT = Gauge("llm_calls_in_flight", "Appels Ollama en cours", ["mode"])
+LLM_CALL_SECONDS = Histogram("llm_call_seconds", "Durée d'un appel Ollama", ["mode", "status"])
+LLM_MEMO = Counter("llm_memo_total", "Mémoïsation des appels LLM", ["name", "result"])
+
+# =========================================================
+# Tools MCP et upstreams
+# =========================================================
+MCP_TOOLS_IN_FLIGHT = Gauge("mcp_scrapes_in_flight", "Scrapes upstream en cours", ["tool"])
+MCP_SCRAPE_SECONDS = Histogram("mcp_scrape_seconds", "Durée d'un scrape (hors cache)", ["tool", "status"])
+MCP_CACHE = Counter(
+    "mcp_cache_total",
+    "Résultats de run_tool par provenance (hit, stale, store, miss, last_known_good)",
+    ["tool", "result"],
+)
+UPSTREAM_ERRORS = Counter("upstream_errors_total", "Échecs et refus des appels upstream", ["host", "reason"])
+
+
+# =========================================================
+# Détail des durées d'une requête (decision["timings_ms"])
+# =========================================================
+class _RequestTimings:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+
+_timings: ContextVar[Optional[_RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def record_timing(name: str, seconds: float) -> None:
+    timings = _timings.get()
+    if timings is not None:
+        timings.stages[name] = round(timings.stages.get(name, 0.0) + seconds * 1000, 1)
+
+
+@contextmanager
+def track_request(endpoint: str) -> Iterator[None]:
+    """
+    Requête agent: gauge in-flight, durée totale et détail des étapes (hérité par les tâches).
+    """
+    token = _timings.set(_RequestTimings())
+    start = time.perf_counter()
+    AGENT_REQUESTS_IN_FLIGHT.inc(endpoint=endpoint)
+    try:
+        yield
+    finally:
+        AGENT_REQUESTS_IN_FLIGHT.dec(endpoint=endpoint)
+        AGENT_REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint)
+        _timings.reset(token)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        AGENT_STAGE_SECONDS.observe(elapsed, stage=name)
+        record_timing(name, elapsed)
+
+
+def timings_breakdown() -> Optional[Dict[str, float]]:
+    """
+    Durées en ms des étapes déjà passées + total écoulé; None hors requête ou sans AGENT_DEBUG_TIMINGS.
+    """
+    timings = _timings.get()
+    if not AGENT_DEBUG_TIMINGS or timings is None:
+        return None
+    return {**timings.stages, "total": round((time.perf_counter() - timings.start) * 1000, 1)}
@@ -0,0 +1,205 @@
+"""
+Micro-benchmarks hors réseau de l'extraction des prix, sur le corpus scripts/fixtures/
+(voir scripts/make_fixtures.py). Pour chaque page et chaque extracteur:
+débit (ops/s, ms/op), pic mémoire alloué (tracemalloc) et exactitude par rapport à manifest.json.
+
+    python scripts/bench_extract.py
+    python scripts/bench_extract.py --filter flights_dom --min-time 1 --json > avant.json
+
+Vols (app/mcp/tools/flight_extract.py): chaque couche seule (json, dom lxml, dom html.parser, regex)
+puis la chaîne complète extract_flight_fares, sur la page entière et sur la lecture en flux du scraper
+(arrêt éventuel après FLIGHT_STOP_AFTER_RESULTS cartes). Exactitude: prix le moins cher juste + part des
+FLIGHT_MAX_FARES meilleurs tarifs retrouvés.
+Hôtels (app/mcp/tools/hotel.py): _extract_eur_prices sur la page entière (précision / rappel des prix)
+et la lecture en flux du scraper (LowestPrices, arrêt éventuel après HOTEL_MAX_PRICES_SCANNED prix):
+part des HOTEL_SAMPLE_SIZE prix les plus bas de la page retrouvés.
+"""
+import argparse
+import gc
+import gzip
+import json
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.mcp.tools import flight_extract as fx  # noqa: E402
+from app.mcp.tools.fetch import SCRAPE_CHUNK_BYTES, LowestPrices  # noqa: E402
+from app.mcp.tools.flight import FLIGHT_STOP_AFTER_RESULTS, stop_after_results  # noqa: E402
+from app.mcp.tools.hotel import HOTEL_MAX_PRICES_SCANNED, HOTEL_SAMPLE_SIZE, _extract_eur_prices  # noqa: E402
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+
+def load_fixture(name: str) -> str:
+    path = FIXTURES / name
+    if name.endswith(".gz"):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return f.read()
+    return path.read_text(encoding="utf-8")
+
+
+def _prices(fares: List[Dict[str, Any]]) -> List[int]:
+    return [f["price"] for f in fares]
+
+
+def _dom_lxml(html: str) -> List[int]:
+    return _prices(fx.extract_from_text(" ".join(fx._texts_lxml(html))))
+
+
+def _dom_soup(html: str) -> List[int]:
+    return _prices(fx.extract_from_text(" ".join(fx._texts_soup(html))))
+
+
+def _flight_stream(html: str) -> List[int]:
+    # même lecture que scrape_flights_async: morceaux de SCRAPE_CHUNK_BYTES, arrêt après FLIGHT_STOP_AFTER_RESULTS cartes (si > 0)
+    on_chunk = stop_after_results(FLIGHT_STOP_AFTER_RESULTS)
+    step = SCRAPE_CHUNK_BYTES
+    end = len(html)
+    for start in range(0, len(html), step):
+        if on_chunk(html[start:start + step]):
+            end = start + step
+            break
+    return _prices(fx.extract_flight_fares(html[:end])["fares"])
+
+
+def _hotel_stream(html: str) -> List[int]:
+    # même lecture que scrape_hotels_async: morceaux de SCRAPE_CHUNK_BYTES, arrêt après HOTEL_MAX_PRICES_SCANNED prix (si > 0)
+    lowest = LowestPrices(HOTEL_SAMPLE_SIZE, _extract_eur_prices)
+    step = SCRAPE_CHUNK_BYTES
+    for start in range(0, len(html), step):
+        lowest.feed(html[start:start + step])
+        if 0 < HOTEL_MAX_PRICES_SCANNED <= lowest.seen:
+            break
+    return lowest.close()
+
+
+FLIGHT_EXTRACTORS: Dict[str, Callable[[str], List[int]]] = {
+    "json": lambda html: _prices(fx.extract_from_json(html)),
+    "dom_lxml": _dom_lxml,
+    "dom_soup": _dom_soup,
+    "regex": lambda html: _prices(fx.extract_from_text(html)),
+    "pipeline": lambda html: _prices(fx.extract_flight_fares(html)["fares"]),
+    "stream_stop": _flight_stream,
+}
+if not fx._HAS_LXML:
+    del FLIGHT_EXTRACTORS["dom_lxml"]
+
+HOTEL_EXTRACTORS: Dict[str, Callable[[str], List[int]]] = {
+    "regex": _extract_eur_prices,
+    "stream_heap": _hotel_stream,
+}
+
+
+def flight_accuracy(got: List[int], expected: Dict[str, Any]) -> Dict[str, Any]:
+    fares = expected["fares"]
+    return {
+        "cheapest_ok": bool(got) and got[0] == fares[0],
+        "top_found": round(len(set(got) & set(fares)) / len(fares), 2),
+    }
+
+
+def hotel_accuracy(name: str, got: List[int], expected: Dict[str, Any]) -> Dict[str, Any]:
+    truth = expected["prices"]
+    if name == "stream_heap":
+        lowest = sorted(truth)[:HOTEL_SAMPLE_SIZE]
+        return {
+            "cheapest_ok": bool(got) and got[0] == lowest[0],
+            "top_found": round(sum((Counter(got) & Counter(lowest)).values()) / len(lowest), 2),
+        }
+    common = sum((Counter(got) & Counter(truth)).values())
+    return {
+        "precision": round(common / len(got), 3) if got else 0.0,
+        "recall": round(common / len(truth), 3),
+    }
+
+
+def time_it(fn: Callable[[str], Any], arg: str, min_time: float) -> Dict[str, float]:
+    fn(arg)  # échauffement (imports, regex compilées)
+    runs = 0
+    start = time.perf_counter()
+    while True:
+        fn(arg)
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time and runs >= 3:
+            break
+    return {"ops_per_s": round(runs / elapsed, 1), "ms_per_op": round(elapsed / runs * 1000, 3), "runs": runs}
+
+
+def peak_alloc(fn: Callable[[str], Any], arg: str) -> int:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        base, _ = tracemalloc.get_traced_memory()
+        fn(arg)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak - base
+
+
+def run(filter_: Optional[str], min_time: float) -> List[Dict[str, Any]]:
+    manifest = json.loads((FIXTURES / "manifest.json").read_text(encoding="utf-8"))["fixtures"]
+    rows = []
+    for entry in manifest:
+        if entry["kind"] not in ("flights", "hotels"):
+            continue  # réponses wttr: servies par fake_upstreams.py, pas d'extraction à mesurer
+        if filter_ and filter_ not in entry["file"]:
+            continue
+        html = load_fixture(entry["file"])
+        extractors = FLIGHT_EXTRACTORS if entry["kind"] == "flights" else HOTEL_EXTRACTORS
+        for name, fn in extractors.items():
+            got = fn(html)
+            if entry["kind"] == "flights":
+                accuracy = flight_accuracy(got, entry["expected"])
+            else:
+                accuracy = hotel_accuracy(name, got, entry["expected"])
+            rows.append({
+                "fixture": entry["file"],
+                "kb": round(entry["bytes"] / 1024),
+                "extractor": name,
+                **time_it(fn, html, min_time),
+                "peak_kib": round(peak_alloc(fn, html) / 1024, 1),
+                "found": len(got),
+                "accuracy": accuracy,
+                "verified": entry.get("verified", True),
+            })
+    return rows
+
+
+def print_table(rows: List[Dict[str, Any]]) -> None:
+    header = f"{'fixture':<34}{'KB':>6}  {'extracteur':<12}{'ops/s':>10}{'ms/op':>10}{'pic KiB':>10}{'trouvés':>9}  exactitude"
+    print(header)
+    print("-" * (len(header) + 20))
+    for r in rows:
+        accuracy = " ".join(f"{k}={v}" for k, v in r["accuracy"].items())
+        if not r["verified"]:
+            accuracy += " (attendu non vérifié)"
+        print(
+            f"{r['fixture']:<34}{r['kb']:>6}  {r['extractor']:<12}{r['ops_per_s']:>10}{r['ms_per_op']:>10}"
+            f"{r['peak_kib']:>10}{r['found']:>9}  {accuracy}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filter", help="sous-chaîne du nom de fixture")
+    parser.add_argument("--min-time", type=float, default=0.3, help="durée minimale de mesure par extracteur (s)")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    rows = run(args.filter, args.min_time)
+    if args.json:
+        json.dump(rows, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
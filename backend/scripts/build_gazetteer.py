@@ -0,0 +1,104 @@
+"""
+Génère le référentiel complet chargé par l'application (app/agent/data/gazetteer_full.json)
+à partir du référentiel de base app/agent/data/gazetteer.json et d'une liste d'aéroports:
+- airports.csv d'OurAirports (https://ourairports.com/data/, domaine public):
+  aéroports large/medium à vols réguliers
+- ou airports.csv du paquet airportsdata (https://github.com/mborsetti/airportsdata, MIT):
+  tous les aéroports avec code IATA
+
+    python scripts/build_gazetteer.py airports.csv app/agent/data/gazetteer_full.json
+
+Les entrées du référentiel de base (noms FR, alias, kayak_stay) sont conservées telles quelles;
+les autres villes sont ajoutées avec leur nom anglais et leurs aéroports.
+"""
+import csv
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.agent.text import normalize  # noqa: E402
+
+BASE = Path(__file__).resolve().parents[1] / "app" / "agent" / "data" / "gazetteer.json"
+AIRPORT_TYPES = {"large_airport": 0, "medium_airport": 1}
+
+# Noms de villes qui sont aussi des mots ou prénoms courants en français: reconnus comme ville
+# dans n'importe quel message ("je pars avec pierre", "la porte", "durant l'été"), ils ne sont pas ajoutés.
+COMMON_WORDS = {
+    "alliance", "alma", "assis", "atlantic", "baise", "bourg", "bush", "canton", "cascade", "central",
+    "circle", "coca", "colon", "concordia", "council", "crane", "dauphin", "delta", "destin", "durant",
+    "eau claire", "enterprise", "fond du lac", "gage", "globe", "gore", "havre", "jackpot", "la grande",
+    "la grande 3", "la grande 4", "la porte", "le mars", "lock", "male", "marathon", "mare", "marina",
+    "mena", "mercedes", "mobile", "nain", "omega", "orange", "page", "paradise", "portage", "price",
+    "providence", "racine", "ranger", "reading", "ruby", "saga", "saint jean", "save", "sion", "son la",
+    "temple", "tete", "the pas", "trail", "turbo", "union", "vingt cinq",
+    # prénoms
+    "adam", "alice", "amos", "annette", "anthony", "charlotte", "clovis", "david", "eugene", "george",
+    "hugo", "jordan", "marion", "mary", "philip", "pierre", "valentine",
+}
+
+
+def _airports(airports_csv: str):
+    """
+    (pays, ville, rang, code IATA) pour chaque aéroport retenu, format OurAirports ou airportsdata.
+    """
+    with open(airports_csv, encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        ourairports = "iata_code" in (reader.fieldnames or [])
+        for row in reader:
+            if ourairports:
+                if row.get("type") not in AIRPORT_TYPES or row.get("scheduled_service") != "yes":
+                    continue
+                yield (row["iso_country"], (row.get("municipality") or "").strip(),
+                       AIRPORT_TYPES[row["type"]], (row.get("iata_code") or "").strip().upper())
+            else:
+                # pas de type d'aéroport: les internationaux d'abord
+                rank = 0 if "international" in row.get("name", "").lower() else 1
+                yield (row["country"], (row.get("city") or "").strip(), rank, (row.get("iata") or "").strip().upper())
+
+
+def build(airports_csv: str, base_path: Path = BASE):
+    with open(base_path, encoding="utf-8") as f:
+        cities = json.load(f)["cities"]
+    known_codes = {code for city in cities for code in city["airports"]}
+    known_names = {normalize(name) for city in cities for name in [city["id"], city["fr"], city["en"], *city.get("aliases", [])]}
+
+    # (pays, ville) -> [(rang aéroport, code)]
+    found = {}
+    for country, town, rank, code in _airports(airports_csv):
+        if len(code) != 3 or not town or code in known_codes:
+            continue
+        found.setdefault((country, town), []).append((rank, code))
+
+    added = 0
+    for (country, town), codes in sorted(found.items()):
+        key = normalize(town)
+        # noms courts, mots courants ou déjà pris: trop de faux positifs dans les messages
+        if len(key) < 4 or key in known_names or key in COMMON_WORDS:
+            continue
+        known_names.add(key)
+        cities.append({
+            "id": key,
+            "fr": town,
+            "en": town,
+            "country": country,
+            "airports": [code for _, code in sorted(codes)],
+        })
+        added += 1
+    return cities, added
+
+
+def main():
+    if len(sys.argv) != 3:
+        print(__doc__)
+        sys.exit(1)
+    cities, added = build(sys.argv[1])
+    lines = ",\n".join(json.dumps(city, ensure_ascii=False) for city in cities)
+    with open(sys.argv[2], "w", encoding="utf-8") as f:
+        f.write('{\n"version": 1,\n"cities": [\n' + lines + "\n]\n}\n")
+    print(f"{len(cities)} villes ({added} ajoutées) -> {sys.argv[2]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Faux upstreams locaux pour les tests de charge (scripts/loadtest.py): Ollama, Kayak et wttr.in
+sur un seul port, avec latence, taille de page et taux d'échec réglables.
+
+    python scripts/fake_upstreams.py --port 9100 --token-ms 15 --page-delay-ms 400 --failure-rate 0.05
+
+Puis lancer l'API en la pointant dessus:
+
+    OLLAMA_BASE_URL=http://127.0.0.1:9100 \\
+    KAYAK_BASE_URL=http://127.0.0.1:9100 \\
+    WTTR_BASE_URL=http://127.0.0.1:9100/wttr \\
+    UPSTREAM_RATE_LIMITS=127.0.0.1:9100=1000:1000 \\
+    AGENT_DEBUG_TIMINGS=1 \\
+    uvicorn app.main:app --port 8000
+
+Routes:
+- POST /api/chat                     (Ollama: réponse JSON ou NDJSON en streaming, token par token)
+- GET  /flights/{route}/{dep}/{ret}  (page résultats vols, data-testid="resultPrice")
+- GET  /hotels/{path}                (page résultats hôtels, <span class="price">)
+- GET  /wttr/{city}                  (format=3: "Ville: ☀️ +24°C")
+"""
+import argparse
+import asyncio
+import json
+import random
+import zlib
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+
+SETTINGS = {
+    "token_ms": 15.0,  # génération: délai par token
+    "ttft_ms": 150.0,  # délai avant le premier token (évaluation du prompt)
+    "answer_tokens": 120,  # longueur de la réponse finale
+    "llm_parallel": 4,  # requêtes traitées en même temps (OLLAMA_NUM_PARALLEL)
+    "page_delay_ms": 400.0,  # délai avant le premier octet des pages
+    "chunk_delay_ms": 5.0,  # délai entre deux morceaux de page
+    "page_kb": 400,  # taille visée des pages vols / hôtels
+    "results": 40,  # résultats par page
+    "failure_rate": 0.0,  # part des pages en 503
+    "hang_rate": 0.0,  # part des pages qui ne répondent pas (timeouts)
+}
+CHUNK_BYTES = 16 * 1024
+
+_llm_slots: asyncio.Semaphore = None  # créé au démarrage (boucle uvicorn)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _llm_slots
+    _llm_slots = asyncio.Semaphore(SETTINGS["llm_parallel"])
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+def _rng(key: str) -> random.Random:
+    # mêmes prix pour la même URL: les réponses sont comparables d'un run à l'autre
+    return random.Random(zlib.crc32(key.encode()))
+
+
+def _filler(rng: random.Random, size: int) -> str:
+    words = ["escale", "bagage", "classe", "économique", "durée", "aller", "retour", "direct", "horaires", "offre"]
+    out, n = [], 0
+    while n < size:
+        word = rng.choice(words)
+        out.append(word)
+        n += len(word) + 1
+    return " ".join(out)
+
+
+def _page(items: list, head: str, size: int, rng: random.Random) -> str:
+    per_item = max(0, (size - len(head)) // max(len(items), 1) - 80)
+    body = "".join(f'<div class="result">{item}<p>{_filler(rng, per_item)}</p></div>\n' for item in items)
+    return f"<html><head><title>{head}</title></head><body>{body}</body></html>"
+
+
+async def _maybe_fail():
+    roll = random.random()
+    if roll < SETTINGS["hang_rate"]:
+        await asyncio.sleep(3600)
+    if roll < SETTINGS["hang_rate"] + SETTINGS["failure_rate"]:
+        return Response("Service Unavailable", status_code=503)
+    await asyncio.sleep(SETTINGS["page_delay_ms"] / 1000)
+    return None
+
+
+def _streamed(html: str) -> StreamingResponse:
+    data = html.encode("utf-8")
+
+    async def body():
+        for start in range(0, len(data), CHUNK_BYTES):
+            yield data[start:start + CHUNK_BYTES]
+            await asyncio.sleep(SETTINGS["chunk_delay_ms"] / 1000)
+
+    return StreamingResponse(body(), media_type="text/html; charset=utf-8")
+
+
+@app.get("/flights/{route}/{depart}/{ret}")
+async def flights(route: str, depart: str, ret: str):
+    failed = await _maybe_fail()
+    if failed:
+        return failed
+    rng = _rng(f"{route}/{depart}/{ret}")
+    prices = [rng.randint(90, 1400) for _ in range(SETTINGS["results"])]
+    items = [f'<div data-testid="resultPrice">{p} €</div><span class="airline">Air Test</span>' for p in prices]
+    return _streamed(_page(items, f"Vols {route}", SETTINGS["page_kb"] * 1024, rng))
+
+
+@app.get("/hotels/{path:path}")
+async def hotels(path: str):
+    failed = await _maybe_fail()
+    if failed:
+        return failed
+    rng = _rng(path)
+    prices = [rng.randint(35, 600) for _ in range(SETTINGS["results"])]
+    items = [f'<h3>Hôtel {i}</h3><span class="price">{p} €</span>' for i, p in enumerate(prices)]
+    return _streamed(_page(items, "Hôtels", SETTINGS["page_kb"] * 1024, rng))
+
+
+@app.get("/wttr/{city}")
+async def wttr(city: str):
+    failed = await _maybe_fail()
+    if failed:
+        return failed
+    rng = _rng(city)
+    return PlainTextResponse(f"{city}: {rng.choice(['☀️', '⛅️', '🌧'])}  +{rng.randint(5, 35)}°C\n")
+
+
+def _llm_content(body: dict) -> str:
+    system = body["messages"][0]["content"]
+    if "format" in body:
+        return json.dumps({"intent": "intent_metier", "tools": ["weather"], "origin": None, "destination": None, "month": None})
+    if "JSON valide" in system or "use_tools" in system:
+        return json.dumps({"use_tools": True, "tools": [{"name": "weather", "params": {}}], "reason": "fake decision"})
+    if "classificateur" in system:
+        return "intent_metier"
+    words = ["Voici", "quelques", "conseils", "pour", "ton", "voyage", ":", "la", "meilleure", "période", "est", "au", "printemps."]
+    return " ".join(words[i % len(words)] for i in range(SETTINGS["answer_tokens"]))
+
+
+@app.post("/api/chat")
+async def chat(request: Request):
+    body = await request.json()
+    tokens = _llm_content(body).split(" ")
+    created = datetime.now(timezone.utc).isoformat()
+
+    if not body.get("stream"):
+        async with _llm_slots:
+            await asyncio.sleep((SETTINGS["ttft_ms"] + SETTINGS["token_ms"] * len(tokens)) / 1000)
+        return JSONResponse({
+            "model": body.get("model"),
+            "created_at": created,
+            "message": {"role": "assistant", "content": " ".join(tokens)},
+            "done": True,
+        })
+
+    async def ndjson():
+        async with _llm_slots:
+            await asyncio.sleep(SETTINGS["ttft_ms"] / 1000)
+            for i, token in enumerate(tokens):
+                text = token if i == 0 else " " + token
+                yield json.dumps({"model": body.get("model"), "message": {"role": "assistant", "content": text}, "done": False}) + "\n"
+                await asyncio.sleep(SETTINGS["token_ms"] / 1000)
+            yield json.dumps({"model": body.get("model"), "created_at": created, "done": True}) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    for name, default in SETTINGS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(default), default=default)
+    args = parser.parse_args()
+    SETTINGS.update({name: getattr(args, name) for name in SETTINGS})
+
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
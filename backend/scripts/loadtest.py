@@ -0,0 +1,208 @@
+"""
+Test de charge de /agent/query: rejoue un mélange de messages de voyage réalistes
+à une concurrence donnée et affiche le débit et les p50/p95/p99 par étape.
+
+    python scripts/fake_upstreams.py &          # faux Ollama / Kayak / wttr.in (voir son aide)
+    AGENT_DEBUG_TIMINGS=1 ... uvicorn app.main:app --port 8000 &
+    python scripts/loadtest.py --concurrency 16 --requests 400
+
+Les durées par étape viennent de decision["timings_ms"] (AGENT_DEBUG_TIMINGS=1 côté API);
+sans ce flag seules les durées côté client sont affichées.
+--stream utilise /agent/query/stream et mesure aussi le délai du premier token.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+MONTHS = ["janvier", "février", "mars", "avril", "mai", "juin", "juillet", "septembre", "octobre", "novembre"]
+ORIGINS = ["paris", "lyon", "marseille", "bordeaux", "nantes", "toulouse"]
+# villes avec page hôtels Kayak connue (kayak_stay du référentiel)
+DESTINATIONS = ["lisbonne", "rome", "madrid", "bangkok", "barcelone", "paris"]
+
+# (poids, gabarit): mélange proche du trafic réel, dont small talk et hors périmètre
+TEMPLATES = [
+    (5, "vols de {origin} à {dest} en {month}"),
+    (3, "un hôtel à {dest} en {month} ?"),
+    (3, "quelle météo à {dest} en ce moment ?"),
+    (3, "je pars de {origin} pour {dest} en {month}, tu peux me trouver vol et hôtel ?"),
+    (2, "quand partir à {dest} ?"),
+    (2, "un week-end à {dest} en {month}, ça vaut le coup ?"),
+    (1, "bonjour !"),
+    (1, "merci beaucoup"),
+    (1, "écris-moi une fonction python qui trie une liste"),
+    (1, "{dest} ?"),
+]
+
+PERCENTILES = (50, 95, 99)
+
+
+def build_messages(n: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    weights = [w for w, _ in TEMPLATES]
+    out = []
+    for _ in range(n):
+        template = rng.choices([t for _, t in TEMPLATES], weights=weights)[0]
+        out.append(template.format(
+            origin=rng.choice(ORIGINS),
+            dest=rng.choice([d for d in DESTINATIONS if d != "paris"] if "{origin}" in template else DESTINATIONS),
+            month=rng.choice(MONTHS),
+        ))
+    return out
+
+
+def percentile(values: List[float], p: float) -> float:
+    # rang le plus proche
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+async def _query(client: httpx.AsyncClient, message: str, deadline: Optional[float]) -> Dict[str, Any]:
+    payload = {"message": message}
+    if deadline:
+        payload["deadline_seconds"] = deadline
+    start = time.perf_counter()
+    r = await client.post("/agent/query", json=payload)
+    elapsed = (time.perf_counter() - start) * 1000
+    body = r.json() if r.status_code == 200 else {}
+    return {"status": r.status_code, "client_ms": elapsed, "decision": body.get("decision") or {}}
+
+
+async def _query_stream(client: httpx.AsyncClient, message: str, deadline: Optional[float]) -> Dict[str, Any]:
+    payload = {"message": message}
+    if deadline:
+        payload["deadline_seconds"] = deadline
+    start = time.perf_counter()
+    first_token = None
+    decision: Dict[str, Any] = {}
+    event = None
+    async with client.stream("POST", "/agent/query/stream", json=payload) as r:
+        async for line in r.aiter_lines():
+            if line.startswith("event: "):
+                event = line[7:]
+            elif line.startswith("data: "):
+                if event == "token" and first_token is None:
+                    first_token = (time.perf_counter() - start) * 1000
+                elif event == "done":
+                    decision = json.loads(line[6:]).get("decision") or {}
+                elif event == "error":
+                    return {"status": 599, "client_ms": (time.perf_counter() - start) * 1000, "decision": {}}
+        status = r.status_code
+    result = {"status": status, "client_ms": (time.perf_counter() - start) * 1000, "decision": decision}
+    if first_token is not None:
+        result["first_token_ms"] = first_token
+    return result
+
+
+async def run(args) -> Dict[str, Any]:
+    messages = build_messages(args.requests + args.warmup, args.seed)
+    send = _query_stream if args.stream else _query
+    queue: asyncio.Queue = asyncio.Queue()
+    for message in messages[args.warmup:]:
+        queue.put_nowait(message)
+
+    results: List[Dict[str, Any]] = []
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        for message in messages[:args.warmup]:
+            await send(client, message, args.deadline)
+
+        async def worker():
+            while not queue.empty():
+                message = queue.get_nowait()
+                try:
+                    results.append(await send(client, message, args.deadline))
+                except httpx.HTTPError as e:
+                    results.append({"status": 0, "client_ms": None, "decision": {}, "error": type(e).__name__})
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        wall = time.perf_counter() - start
+
+    return summarize(results, wall, args.concurrency)
+
+
+def summarize(results: List[Dict[str, Any]], wall: float, concurrency: int) -> Dict[str, Any]:
+    samples: Dict[str, List[float]] = {}
+
+    def add(name: str, value: Optional[float]):
+        if value is not None:
+            samples.setdefault(name, []).append(value)
+
+    answer_sources: Counter = Counter()
+    omitted: Counter = Counter()
+    for r in results:
+        add("client", r["client_ms"])
+        add("first_token", r.get("first_token_ms"))
+        decision = r["decision"]
+        for name, ms in (decision.get("timings_ms") or {}).items():
+            add(name, ms)
+        if decision.get("answer_source"):
+            answer_sources[decision["answer_source"]] += 1
+        omitted.update(decision.get("omitted_tools") or [])
+
+    stages = {
+        name: {
+            "n": len(values),
+            **{f"p{p}": round(percentile(values, p), 1) for p in PERCENTILES},
+            "max": round(max(values), 1),
+        }
+        for name, values in samples.items()
+    }
+    return {
+        "requests": len(results),
+        "concurrency": concurrency,
+        "wall_seconds": round(wall, 2),
+        "throughput_rps": round(len(results) / wall, 2) if wall else 0.0,
+        "status": dict(Counter(r["status"] for r in results)),
+        "answer_source": dict(answer_sources),
+        "omitted_tools": dict(omitted),
+        "stages_ms": stages,
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(
+        f"{report['requests']} requêtes en {report['wall_seconds']}s -> {report['throughput_rps']} req/s "
+        f"(concurrence {report['concurrency']})"
+    )
+    print(f"statuts HTTP: {report['status']}  réponses: {report['answer_source']}  tools omis: {report['omitted_tools']}")
+    header = f"{'étape (ms)':<28}{'n':>6}" + "".join(f"{'p' + str(p):>10}" for p in PERCENTILES) + f"{'max':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, s in sorted(report["stages_ms"].items(), key=lambda item: -item[1]["p50"]):
+        print(f"{name:<28}{s['n']:>6}" + "".join(f"{s['p' + str(p)]:>10}" for p in PERCENTILES) + f"{s['max']:>10}")
+    if not any(name not in ("client", "first_token") for name in report["stages_ms"]):
+        print("(pas de détail par étape: lancer l'API avec AGENT_DEBUG_TIMINGS=1)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=5, help="requêtes séquentielles non comptées")
+    parser.add_argument("--stream", action="store_true", help="utilise /agent/query/stream")
+    parser.add_argument("--deadline", type=float, default=None, help="deadline_seconds envoyé avec chaque requête")
+    parser.add_argument("--timeout", type=float, default=180.0, help="timeout HTTP côté client (s)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="rapport JSON (comparaison entre runs)")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.json:
+        json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
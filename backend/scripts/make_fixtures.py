@@ -0,0 +1,229 @@
+"""
+Corpus de pages pour les benchmarks d'extraction (scripts/bench_extract.py), dans scripts/fixtures/:
+pages vols et hôtels au format Kayak (plusieurs tailles et mises en page) et réponses wttr.in,
+avec les prix attendus dans manifest.json.
+
+    python scripts/make_fixtures.py                      # régénère le corpus synthétique (déterministe)
+    python scripts/make_fixtures.py --anonymize page.html --kind flights --name flights_lis_recorded
+
+--anonymize ajoute une page enregistrée depuis le navigateur: scripts JS, styles, commentaires,
+liens, e-mails et jetons sont retirés; seuls le HTML et les états JSON restent.
+Les prix attendus sont alors ceux de l'extracteur actuel, à vérifier à la main ("verified": false).
+"""
+import argparse
+import gzip
+import json
+import random
+import re
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+MANIFEST = FIXTURES / "manifest.json"
+
+AIRLINES = ["Air France", "TAP Air Portugal", "Vueling", "Lufthansa", "ITA Airways", "Qatar Airways", "easyJet"]
+FILLER = (
+    "Escale à {city} · {h}h{m:02d} · Bagage cabine inclus · Vol opéré par {airline} · "
+    "Conditions tarifaires et modification selon la compagnie · "
+)
+NBSP, NNBSP = "\u00a0", "\u202f"
+
+
+def _eur(price: int, sep: str = " ") -> str:
+    # 1234 -> "1 234 €" (séparateur de milliers comme sur kayak.fr)
+    digits = f"{price:,}".replace(",", sep)
+    return f"{digits}{NBSP}€"
+
+
+def _write(name: str, text: str) -> str:
+    FIXTURES.mkdir(exist_ok=True)
+    if name.endswith(".gz"):
+        # mtime=0: fichier identique d'une génération à l'autre
+        with open(FIXTURES / name, "wb") as f:
+            with gzip.GzipFile(fileobj=f, mode="wb", mtime=0) as gz:
+                gz.write(text.encode("utf-8"))
+    else:
+        (FIXTURES / name).write_text(text, encoding="utf-8")
+    return name
+
+
+def _head(title: str, rng: random.Random, script_kb: int, banner: bool = True) -> str:
+    # gros bundle JS inline (non JSON) comme sur les vraies pages
+    js = "".join(f"var m{i}=function(a){{return a*{rng.randint(1, 99)}}};" for i in range(script_kb * 30))
+    nav = "".join(f'<li><a href="/deals/{i}">Offre {i}</a></li>' for i in range(40))
+    return (
+        f"<!DOCTYPE html><html lang=\"fr\"><head><meta charset=\"utf-8\"><title>{title}</title>"
+        f"<script>{js}</script><style>.nrc6{{display:flex}}</style></head>"
+        f"<body><header><ul>{nav}</ul></header>"
+        + (f'<div class="promo-banner">Alerte prix : vols dès 19{NBSP}€ cet hiver !</div>' if banner else "")
+    )
+
+
+def flight_page(seed: int, results: int, layout: str, target_kb: int, sep: str = " "):
+    """
+    layout: json (état JSON + cartes), dom (cartes data-testid="resultPrice"), text (prix dans le texte seul)
+    Bruit: bannière promo et frais de bagages en € hors des nœuds prix.
+    """
+    rng = random.Random(seed)
+    prices = [rng.randint(60, 2400) for _ in range(results)]
+    airlines = [rng.choice(AIRLINES) for _ in range(results)]
+
+    # version texte (page simplifiée): pas de bannière promo
+    parts = [_head("Vols LIS", rng, script_kb=max(4, target_kb // 20), banner=layout != "text")]
+    if layout == "json":
+        state = {"searchId": "x", "results": [
+            {"resultId": f"r{i}", "price": {"amount": p, "currency": "EUR"}, "airline": a, "legs": [{"duration": rng.randint(90, 900)}]}
+            for i, (p, a) in enumerate(zip(prices, airlines))
+        ]}
+        parts.append(f'<script type="application/json" id="__STATE__">{json.dumps(state)}</script>')
+
+    filler_len = max(0, target_kb * 1024 // max(results, 1) - 400)
+    for i, (price, airline) in enumerate(zip(prices, airlines)):
+        filler = ""
+        while len(filler) < filler_len:
+            filler += FILLER.format(city=rng.choice(["Madrid", "Zurich", "Doha"]), h=rng.randint(1, 20), m=rng.randint(0, 59), airline=airline)
+        fee = f'<span class="bag-fee">Bagage en soute +{rng.randint(25, 70)}{NBSP}€</span>'
+        if layout == "text":
+            parts.append(f"<p>{airline} — aller-retour à {_eur(price, sep)} {filler}</p>")
+        else:
+            parts.append(
+                f'<div class="nrc6" data-resultid="r{i}"><div class="nrc6-inner">'
+                f'<span class="airline-name">{airline}</span>'
+                f'<div class="f8F1-price-text" data-testid="resultPrice">{_eur(price, sep)}</div>'
+                f"{fee}<p>{filler}</p></div></div>"
+            )
+    parts.append("</body></html>")
+
+    expected = sorted(set(prices))[:5]
+    return "".join(parts), {"fares": expected}
+
+
+def hotel_page(seed: int, results: int, target_kb: int, taxes: bool = False):
+    """
+    Cartes hôtel <span class="price">; taxes=True ajoute "+ 14 € de taxes" (bruit compté par l'extracteur regex).
+    """
+    rng = random.Random(seed)
+    prices = [rng.randint(35, 650) for _ in range(results)]
+    parts = [_head("Hôtels", rng, script_kb=max(4, target_kb // 20))]
+    filler_len = max(0, target_kb * 1024 // max(results, 1) - 300)
+    for i, price in enumerate(prices):
+        filler = ("Annulation gratuite · Petit-déjeuner inclus · Wi-Fi gratuit · " * (filler_len // 60 + 1))[:filler_len]
+        tax = f"<small>+ {rng.randint(3, 25)}{NBSP}€ de taxes et frais</small>" if taxes else ""
+        parts.append(
+            f'<div class="hotel-card"><h3>Hôtel {i}</h3><div class="rating">{rng.randint(60, 98) / 10}</div>'
+            f'<span class="price">{_eur(price)}</span>{tax}<p>{filler}</p></div>'
+        )
+    parts.append("</body></html>")
+    return "".join(parts), {"prices": prices}
+
+
+WTTR = {
+    "wttr_bangkok.txt": "Bangkok: ⛅️  +31°C",
+    "wttr_lisbonne.txt": "Lisbonne: ☀️   +19°C",
+    "wttr_tokyo.txt": "Tokyo: 🌦   +8°C",
+    "wttr_unknown.txt": "Unknown location; please try ~48.8,2.3",
+}
+
+
+def build():
+    entries = []
+
+    def add(name, kind, layout, page):
+        html, expected = page
+        _write(name, html)
+        entries.append({
+            "file": name,
+            "kind": kind,
+            "layout": layout,
+            "bytes": len(html.encode("utf-8")),
+            "expected": expected,
+            "verified": True,
+        })
+
+    add("flights_json_30k.html.gz", "flights", "json", flight_page(1, 15, "json", 30))
+    add("flights_dom_250k.html.gz", "flights", "dom", flight_page(2, 40, "dom", 250))
+    add("flights_dom_nnbsp_250k.html.gz", "flights", "dom", flight_page(3, 40, "dom", 250, sep=NNBSP))
+    add("flights_dom_1500k.html.gz", "flights", "dom", flight_page(4, 120, "dom", 1500))
+    add("flights_text_60k.html.gz", "flights", "text", flight_page(5, 20, "text", 60))
+    add("hotels_60k.html.gz", "hotels", "cards", hotel_page(6, 25, 60))
+    add("hotels_400k.html.gz", "hotels", "cards", hotel_page(7, 80, 400))
+    add("hotels_taxes_400k.html.gz", "hotels", "cards+taxes", hotel_page(8, 80, 400, taxes=True))
+    add("hotels_1500k.html.gz", "hotels", "cards", hotel_page(9, 200, 1500))
+    for name, line in WTTR.items():
+        _write(name, line + "\n")
+        entries.append({"file": name, "kind": "wttr", "layout": "format3", "bytes": len(line.encode()) + 1, "expected": {"raw": line}, "verified": True})
+
+    _save_manifest(entries)
+    print(f"{len(entries)} fixtures -> {FIXTURES}")
+
+
+_SCRIPT_RE = re.compile(r"<script(?![^>]*application/(?:ld\+)?json)[^>]*>.*?</script>", re.S | re.I)
+_STYLE_RE = re.compile(r"<style[^>]*>.*?</style>", re.S | re.I)
+_COMMENT_RE = re.compile(r"<!--.*?-->", re.S)
+_LINK_RE = re.compile(r'\b(href|src|action|data-[\w-]*url)="[^"]*"', re.I)
+_EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+\.[\w.]+")
+_TOKEN_RE = re.compile(r"\b[A-Za-z0-9_\-]{24,}\b")
+
+
+def anonymize(html: str) -> str:
+    html = _SCRIPT_RE.sub("", html)
+    html = _STYLE_RE.sub("", html)
+    html = _COMMENT_RE.sub("", html)
+    html = _LINK_RE.sub(r'\1="#"', html)
+    html = _EMAIL_RE.sub("user@example.com", html)
+    return _TOKEN_RE.sub("x", html)
+
+
+def add_recorded(path: str, kind: str, name: str):
+    from app.mcp.tools.flight_extract import extract_flight_fares
+    from app.mcp.tools.hotel import _extract_eur_prices
+
+    html = anonymize(Path(path).read_text(encoding="utf-8", errors="replace"))
+    if kind == "flights":
+        expected = {"fares": [f["price"] for f in extract_flight_fares(html)["fares"]]}
+    else:
+        expected = {"prices": _extract_eur_prices(html)}
+    file = _write(f"{name}.html.gz", html)
+
+    entries = [e for e in _load_manifest() if e["file"] != file]
+    entries.append({
+        "file": file,
+        "kind": kind,
+        "layout": "recorded",
+        "bytes": len(html.encode("utf-8")),
+        "expected": expected,
+        "verified": False,  # à relire: attendu = sortie de l'extracteur actuel
+    })
+    _save_manifest(entries)
+    print(f"{file}: {expected}")
+
+
+def _load_manifest():
+    if not MANIFEST.exists():
+        return []
+    return json.loads(MANIFEST.read_text(encoding="utf-8"))["fixtures"]
+
+
+def _save_manifest(entries):
+    # les pages enregistrées (--anonymize) sont conservées lors d'une régénération
+    keep = [e for e in _load_manifest() if e["layout"] == "recorded" and e["file"] not in {x["file"] for x in entries}]
+    lines = ",\n".join(json.dumps(e, ensure_ascii=False) for e in entries + keep)
+    MANIFEST.write_text('{\n"version": 1,\n"fixtures": [\n' + lines + "\n]\n}\n", encoding="utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--anonymize", metavar="PAGE_HTML")
+    parser.add_argument("--kind", choices=["flights", "hotels"], default="flights")
+    parser.add_argument("--name")
+    args = parser.parse_args()
+    if args.anonymize:
+        add_recorded(args.anonymize, args.kind, args.name or Path(args.anonymize).stem)
+    else:
+        build()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Fixtures communes: corpus hors réseau (scripts/fixtures/) et remise à zéro de l'état global
+des modules (caches MCP, breakers et token buckets par host) entre deux tests.
+"""
+import gzip
+import json
+from pathlib import Path
+from typing import Any, Dict, List
+
+import httpx
+import pytest
+
+from app.mcp import resilience, service
+from app.mcp.tools import http_client
+
+FIXTURES = Path(__file__).resolve().parents[1] / "scripts" / "fixtures"
+
+
+def load_fixture(name: str) -> str:
+    path = FIXTURES / name
+    if name.endswith(".gz"):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return f.read()
+    return path.read_text(encoding="utf-8")
+
+
+def manifest(kind: str) -> List[Dict[str, Any]]:
+    entries = json.loads((FIXTURES / "manifest.json").read_text(encoding="utf-8"))["fixtures"]
+    return [e for e in entries if e["kind"] == kind]
+
+
+@pytest.fixture(autouse=True)
+def clean_state(monkeypatch):
+    for cache in (*service._caches.values(), *service._last_good.values()):
+        cache.clear()
+    service._refreshing.clear()
+    resilience._breakers.clear()
+    resilience._buckets.clear()
+    # pas de limite de débit par défaut: les tests qui en ont besoin créent leur TokenBucket
+    monkeypatch.setattr(resilience, "UPSTREAM_RATE_PER_SEC", 0.0)
+    yield
+    resilience._breakers.clear()
+    resilience._buckets.clear()
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """
+    Sert body (ou status) à toutes les requêtes du client partagé; retourne la liste des requêtes reçues.
+    """
+    requests: List[httpx.Request] = []
+
+    def serve(body: str = "", status: int = 200) -> List[httpx.Request]:
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            return httpx.Response(status, content=body.encode("utf-8"))
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(http_client, "get_client", lambda: client)
+        return requests
+
+    return serve
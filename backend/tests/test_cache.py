@@ -0,0 +1,137 @@
+"""
+TTLCache (LRU + TTL + fenêtre stale) et stale-while-revalidate de service.run_tool.
+L'âge des entrées est simulé avec set(..., age=...) plutôt qu'en attendant.
+"""
+import asyncio
+
+import pytest
+
+from app.mcp import service
+from app.mcp.cache import TTLCache
+
+PAYLOAD = {"city": "Lisbonne"}
+KEY = ("weather", service._city_key("Lisbonne"))
+
+
+def test_fresh_stale_expired():
+    cache = TTLCache(10, ttl=60, stale_ttl=30)
+    cache.set("fresh", 1)
+    cache.set("stale", 2, age=75)
+    cache.set("expired", 3, age=95)
+
+    value, age, is_stale = cache.get("fresh")
+    assert (value, is_stale) == (1, False) and age < 1
+    value, age, is_stale = cache.get("stale")
+    assert (value, is_stale) == (2, True) and age >= 75
+    assert cache.get("expired") is None
+    assert "expired" not in cache._data
+    assert cache.stats()["hits"] == 1 and cache.stats()["stale_hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_no_stale_window_by_default():
+    cache = TTLCache(10, ttl=60)
+    cache.set("k", 1, age=61)
+    assert cache.get("k") is None
+
+
+def test_lru_eviction_keeps_recently_read():
+    cache = TTLCache(2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # "b" devient le moins récemment utilisé
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a")[0] == 1 and cache.get("c")[0] == 3
+    assert len(cache) == 2
+
+
+def test_set_replaces_value_and_age():
+    cache = TTLCache(10, ttl=60, stale_ttl=30)
+    cache.set("k", "old", age=75)
+    cache.set("k", "new")
+    value, _, is_stale = cache.get("k")
+    assert (value, is_stale) == ("new", False)
+
+
+def _fake_scraper(monkeypatch, results):
+    calls = []
+
+    async def scrape(payload):
+        calls.append(payload)
+        result = results[min(len(calls), len(results)) - 1]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    monkeypatch.setitem(service.TOOLS, "weather", (scrape, service._weather_key))
+    return calls
+
+
+def test_miss_then_hit(monkeypatch):
+    calls = _fake_scraper(monkeypatch, [{"status": "ok", "raw": "+19°C"}])
+
+    first = asyncio.run(service.run_tool("weather", PAYLOAD))
+    second = asyncio.run(service.run_tool("weather", {"city": "lisbonne "}))
+
+    assert len(calls) == 1
+    assert first["cached"] is False and second["cached"] is True
+    assert second["raw"] == "+19°C"
+
+
+def test_errors_are_not_cached(monkeypatch):
+    calls = _fake_scraper(monkeypatch, [{"status": "error", "error": "boom"}, {"status": "ok", "raw": "+19°C"}])
+
+    assert asyncio.run(service.run_tool("weather", PAYLOAD))["status"] == "error"
+    assert asyncio.run(service.run_tool("weather", PAYLOAD))["status"] == "ok"
+    assert len(calls) == 2
+
+
+def test_stale_entry_served_then_refreshed(monkeypatch):
+    calls = _fake_scraper(monkeypatch, [{"status": "ok", "raw": "+21°C"}])
+    ttl = service.CACHE_TTL_SECONDS["weather"]
+    service._caches["weather"].set(KEY, {"status": "ok", "raw": "+19°C"}, age=ttl + 1)
+
+    async def scenario():
+        served = await service.run_tool("weather", PAYLOAD)
+        refresh = service._refreshing[KEY]
+        # une deuxième requête pendant le refresh ne relance pas de scrape
+        await service.run_tool("weather", PAYLOAD)
+        await refresh
+        return served
+
+    served = asyncio.run(scenario())
+
+    assert served["raw"] == "+19°C" and served["cached"] is True
+    assert served["age_seconds"] >= ttl
+    assert len(calls) == 1
+    assert KEY not in service._refreshing
+    value, _, is_stale = service._caches["weather"].get(KEY)
+    assert value["raw"] == "+21°C" and not is_stale
+
+
+def test_failed_refresh_keeps_stale_entry(monkeypatch):
+    _fake_scraper(monkeypatch, [RuntimeError("upstream down")])
+    ttl = service.CACHE_TTL_SECONDS["weather"]
+    service._caches["weather"].set(KEY, {"status": "ok", "raw": "+19°C"}, age=ttl + 1)
+
+    async def scenario():
+        await service.run_tool("weather", PAYLOAD)
+        await service._refreshing[KEY]
+        return await service.run_tool("weather", PAYLOAD)
+
+    again = asyncio.run(scenario())
+    assert again["raw"] == "+19°C" and again["cached"] is True
+
+
+def test_invalid_payload_bypasses_cache(monkeypatch):
+    calls = _fake_scraper(monkeypatch, [{"status": "error", "error": "city is required"}])
+    for _ in range(2):
+        assert asyncio.run(service.run_tool("weather", {}))["status"] == "error"
+    assert len(calls) == 2
+    assert len(service._caches["weather"]) == 0
+
+
+def test_unknown_tool():
+    with pytest.raises(ValueError):
+        asyncio.run(service.run_tool("trains", {}))
@@ -0,0 +1,163 @@
+"""
+Échéance de bout en bout: temps restant, bornes des timeouts, tâches partagées détachées,
+timeout raccourci par l'échéance sans effet sur le circuit breaker.
+"""
+import asyncio
+
+import httpx
+import pytest
+
+from app.agent import deadline
+from app.agent.deadline import (
+    DeadlineExceeded,
+    budget_for,
+    clamp_timeout,
+    detach_deadline,
+    remaining,
+    request_deadline,
+    tools_timeout,
+    within_deadline,
+)
+from app.mcp import resilience, service
+from app.mcp.tools import http_client
+from app.mcp.tools.http_client import http_get
+
+URL = "https://upstream.test/search"
+
+
+def test_no_deadline_outside_a_request():
+    assert remaining() is None
+    assert tools_timeout() is None
+    assert clamp_timeout(20) == 20
+
+
+def test_remaining_and_reset():
+    with request_deadline(10):
+        assert 9 < remaining() <= 10
+        with request_deadline(2):
+            assert remaining() <= 2
+        assert remaining() > 9
+    assert remaining() is None
+
+
+def test_clamp_timeout():
+    with request_deadline(5):
+        assert clamp_timeout(20) <= 5
+        assert clamp_timeout(1) == 1
+    with request_deadline(-0.1):
+        with pytest.raises(DeadlineExceeded):
+            clamp_timeout(20)
+
+
+def test_tools_timeout_keeps_answer_reserve(monkeypatch):
+    monkeypatch.setattr(deadline, "AGENT_ANSWER_RESERVE_SECONDS", 8)
+    with request_deadline(45):
+        assert 36 < tools_timeout() <= 37
+    # petit budget: la réserve est bornée à la moitié du restant
+    with request_deadline(6):
+        assert 2.9 < tools_timeout() <= 3
+    with request_deadline(-1):
+        assert tools_timeout() == 0
+
+
+def test_budget_for(monkeypatch):
+    monkeypatch.setattr(deadline, "AGENT_DEADLINE_SECONDS", 45)
+    monkeypatch.setattr(deadline, "AGENT_DEADLINE_MAX_SECONDS", 120)
+    assert budget_for(None) == 45
+    assert budget_for(0) == 45
+    assert budget_for(10) == 10
+    assert budget_for(600) == 120
+
+
+def test_detach_deadline_is_local_to_the_task():
+    async def shared():
+        detach_deadline()
+        return remaining()
+
+    async def scenario():
+        with request_deadline(10):
+            inner = await asyncio.create_task(shared())
+            return inner, remaining()
+
+    inner, outer = asyncio.run(scenario())
+    assert inner is None
+    assert outer is not None and outer > 9
+
+
+def test_shared_scrape_is_not_bound_by_the_caller_deadline(monkeypatch):
+    seen = []
+
+    async def scrape(payload):
+        seen.append(remaining())
+        return {"status": "ok", "raw": "+19°C"}
+
+    monkeypatch.setitem(service.TOOLS, "weather", (scrape, service._weather_key))
+
+    async def scenario():
+        with request_deadline(1):
+            await service.run_tool("weather", {"city": "Lisbonne"})
+
+    asyncio.run(scenario())
+    assert seen == [None]
+
+
+def test_within_deadline():
+    async def slow():
+        await asyncio.sleep(1)
+
+    async def scenario():
+        assert await within_deadline(asyncio.sleep(0, "no deadline")) == "no deadline"
+        with request_deadline(0.02):
+            with pytest.raises(DeadlineExceeded):
+                await within_deadline(slow())
+        with request_deadline(-1):
+            coro = slow()
+            with pytest.raises(DeadlineExceeded):
+                await within_deadline(coro)
+            assert coro.cr_frame is None  # fermée, pas de "coroutine was never awaited"
+
+    asyncio.run(scenario())
+
+
+def _timing_out_upstream(monkeypatch):
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        raise httpx.ReadTimeout("read timed out", request=request)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(http_client, "get_client", lambda: client)
+    monkeypatch.setattr(resilience, "BREAKER_FAILURES", 1)
+    return requests
+
+
+def test_deadline_bound_timeout_does_not_open_the_circuit(monkeypatch):
+    requests = _timing_out_upstream(monkeypatch)
+
+    async def scenario():
+        with request_deadline(1):
+            for _ in range(3):
+                with pytest.raises(DeadlineExceeded):
+                    await http_get(URL, timeout=20)
+
+    asyncio.run(scenario())
+    breaker = resilience._breaker("upstream.test")
+    assert len(requests) == 3
+    assert breaker.state == "closed" and breaker.failures == 0
+
+
+def test_upstream_timeout_still_opens_the_circuit(monkeypatch):
+    requests = _timing_out_upstream(monkeypatch)
+
+    async def scenario():
+        # timeout demandé plus court que le restant: le timeout est celui de l'upstream
+        with request_deadline(30):
+            with pytest.raises(httpx.ReadTimeout):
+                await http_get(URL, timeout=5)
+        with pytest.raises(resilience.CircuitOpenError):
+            await http_get(URL, timeout=5)
+
+    asyncio.run(scenario())
+    assert len(requests) == 1
+    assert resilience._breaker("upstream.test").state == "open"
@@ -0,0 +1,183 @@
+"""
+Circuit breaker, token bucket, upstream_guard sur le client partagé et repli last-known-good de run_tool.
+"""
+import asyncio
+
+import pytest
+
+from app.mcp import resilience, service
+from app.mcp.resilience import CircuitBreaker, CircuitOpenError, RateLimitedError, TokenBucket
+from app.mcp.tools.http_client import http_get
+
+URL = "https://upstream.test/search"
+
+
+def _expire(breaker: CircuitBreaker) -> None:
+    breaker.opened_at -= breaker.reset_timeout + 1
+
+
+def test_breaker_opens_after_threshold():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure("HTTP 503")
+    assert breaker.state == "closed"
+
+    breaker.record_failure("HTTP 503")
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert breaker.rejected == 1
+    assert 29 < breaker.retry_in() <= 30
+    assert breaker.snapshot()["last_error"] == "HTTP 503"
+
+
+def test_success_resets_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    breaker.record_failure("timeout")
+    breaker.record_failure("timeout")
+    breaker.record_success()
+    breaker.record_failure("timeout")
+    assert breaker.state == "closed" and breaker.failures == 1
+
+
+def test_half_open_allows_a_single_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure("HTTP 500")
+    _expire(breaker)
+
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow() and breaker.allow()
+
+
+def test_failed_probe_reopens():
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=30)
+    for _ in range(5):
+        breaker.record_failure("HTTP 500")
+    _expire(breaker)
+
+    assert breaker.allow()
+    breaker.record_failure("HTTP 500")
+    assert breaker.state == "open"
+    assert breaker.retry_in() > 29
+    assert not breaker.allow()
+
+
+def test_released_probe_lets_next_request_try():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure("HTTP 500")
+    _expire(breaker)
+
+    assert breaker.allow()
+    breaker.release()  # requête annulée: pas de verdict
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+
+
+def test_token_bucket_burst_then_wait():
+    bucket = TokenBucket(rate=2, burst=2)
+    assert bucket.reserve(max_wait=0) == 0
+    assert bucket.reserve(max_wait=0) == 0
+    assert bucket.reserve(max_wait=0.1) is None
+    wait = bucket.reserve(max_wait=1)
+    assert 0.4 < wait <= 0.5
+    # la réservation est prise: le suivant attend un jeton de plus
+    assert 0.9 < bucket.reserve(max_wait=1) <= 1.0
+
+
+def test_token_bucket_disabled():
+    bucket = TokenBucket(rate=0, burst=1)
+    assert all(bucket.reserve(max_wait=0) == 0 for _ in range(100))
+
+
+def test_guard_opens_circuit_on_5xx(upstream, monkeypatch):
+    monkeypatch.setattr(resilience, "BREAKER_FAILURES", 2)
+    requests = upstream(status=503)
+
+    async def scenario():
+        for _ in range(2):
+            assert (await http_get(URL, timeout=5)).status_code == 503
+        with pytest.raises(CircuitOpenError) as e:
+            await http_get(URL, timeout=5)
+        return e.value
+
+    error = asyncio.run(scenario())
+    assert len(requests) == 2  # le circuit ouvert n'appelle pas l'upstream
+    assert error.host == "upstream.test"
+    assert resilience.breaker_states()["upstream.test"]["state"] == "open"
+
+
+def test_guard_4xx_is_not_an_upstream_failure(upstream, monkeypatch):
+    monkeypatch.setattr(resilience, "BREAKER_FAILURES", 1)
+    upstream(status=404)
+
+    async def scenario():
+        for _ in range(3):
+            await http_get(URL, timeout=5)
+
+    asyncio.run(scenario())
+    assert resilience.breaker_states()["upstream.test"]["state"] == "closed"
+
+
+def test_guard_rate_limit_rejects_without_calling(upstream, monkeypatch):
+    monkeypatch.setattr(resilience, "UPSTREAM_RATE_LIMITS", {"upstream.test": (0.1, 1)})
+    requests = upstream("ok")
+
+    async def scenario():
+        await http_get(URL, timeout=5)
+        with pytest.raises(RateLimitedError):
+            await http_get(URL, timeout=5)
+
+    asyncio.run(scenario())
+    assert len(requests) == 1
+    # refus du limiter: ni échec ni probe bloqué
+    assert resilience._breaker("upstream.test").failures == 0
+
+
+def _weather_scraper(monkeypatch, outcome):
+    async def scrape(payload):
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setitem(service.TOOLS, "weather", (scrape, service._weather_key))
+
+
+def _seed_last_good(age: float):
+    key = service._weather_key({"city": "Lisbonne"})
+    service._last_good["weather"].set(key, {"status": "ok", "raw": "+19°C"}, age=age)
+
+
+@pytest.mark.parametrize(
+    "outcome",
+    [CircuitOpenError("wttr.in", 12.0), RateLimitedError("wttr.in"), {"status": "error", "error": "HTTP 503"}],
+    ids=["circuit_open", "rate_limited", "error_result"],
+)
+def test_last_known_good_on_upstream_failure(monkeypatch, outcome):
+    _weather_scraper(monkeypatch, outcome)
+    _seed_last_good(age=7200)
+
+    result = asyncio.run(service.run_tool("weather", {"city": "Lisbonne"}))
+
+    assert result["raw"] == "+19°C"
+    assert result["stale"] is True and result["fallback"] == "last_known_good"
+    assert result["cached"] is True and result["age_seconds"] >= 7200
+    assert result["upstream_error"]
+
+
+def test_no_last_known_good_raises(monkeypatch):
+    _weather_scraper(monkeypatch, CircuitOpenError("wttr.in", 12.0))
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(service.run_tool("weather", {"city": "Lisbonne"}))
+
+
+def test_last_known_good_expires(monkeypatch):
+    _weather_scraper(monkeypatch, {"status": "error", "error": "HTTP 503"})
+    _seed_last_good(age=service.CACHE_LAST_GOOD_SECONDS + 1)
+
+    result = asyncio.run(service.run_tool("weather", {"city": "Lisbonne"}))
+    assert result == {"status": "error", "error": "HTTP 503", "cached": False, "age_seconds": 0.0}
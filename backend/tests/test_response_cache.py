@@ -0,0 +1,90 @@
+"""
+Cache des réponses /agent/query: validité tirée de la fraîcheur des tools, champs par requête retirés.
+"""
+import pytest
+
+from app.agent import response_cache
+from app.agent.response_cache import lookup_response, response_key, response_ttl, store_response
+from app.mcp.service import CACHE_TTL_SECONDS
+
+RESPONSE = {
+    "answer": "Vol le moins cher: 89 €",
+    "decision": {"intent": "flights", "deadline": {"budget_seconds": 45}, "timings_ms": {"total": 812}},
+}
+
+
+@pytest.fixture(autouse=True)
+def enabled(monkeypatch):
+    monkeypatch.setattr(response_cache, "AGENT_RESPONSE_CACHE_ENABLED", True)
+    response_cache._cache.clear()
+
+
+def test_ttl_without_tools():
+    assert response_ttl({}) == response_cache.AGENT_RESPONSE_CACHE_TTL_SECONDS
+
+
+def test_ttl_is_the_shortest_remaining_freshness(monkeypatch):
+    monkeypatch.setattr(response_cache, "AGENT_RESPONSE_CACHE_TTL_SECONDS", 1e9)
+    results = {
+        "flights": {"status": "ok", "age_seconds": 100.0},
+        "weather": {"status": "ok", "age_seconds": 60.0},
+    }
+    assert response_ttl(results) == CACHE_TTL_SECONDS["weather"] - 60
+
+
+def test_ttl_capped_by_setting(monkeypatch):
+    monkeypatch.setattr(response_cache, "AGENT_RESPONSE_CACHE_TTL_SECONDS", 30)
+    assert response_ttl({"flights": {"status": "ok", "age_seconds": 0}}) == 30
+
+
+@pytest.mark.parametrize(
+    "result",
+    [
+        {"status": "error", "error": "HTTP 503"},
+        {"status": "ok", "stale": True, "fallback": "last_known_good"},
+        {"status": "ok", "age_seconds": CACHE_TTL_SECONDS["weather"]},
+        "pas un dict",
+    ],
+    ids=["error", "stale", "expired", "not_a_dict"],
+)
+def test_not_cacheable(result):
+    assert response_ttl({"weather": result}) is None
+
+
+def test_round_trip_strips_per_request_fields():
+    key = response_key("Vols Paris Lisbonne en mars ?", "flights", "LIS", "CDG", "2027-03")
+    store_response(key, RESPONSE, {"flights": {"status": "ok", "age_seconds": 0}})
+
+    hit, age = lookup_response(response_key("vols paris lisbonne en mars", "flights", "LIS", "CDG", "2027-03"))
+
+    assert hit["answer"] == RESPONSE["answer"]
+    assert hit["decision"] == {"intent": "flights"}
+    assert age < 1
+    hit["answer"] = "modifiée"
+    assert lookup_response(key)[0]["answer"] == RESPONSE["answer"]
+
+
+def test_entry_expires_with_its_own_ttl():
+    key = response_key("météo lisbonne", "weather", "LIS", None, None)
+    age = 60.0
+    store_response(key, RESPONSE, {"weather": {"status": "ok", "age_seconds": age}})
+    entry, _, _ = response_cache._cache.get(key)
+    assert entry["ttl"] == min(response_cache.AGENT_RESPONSE_CACHE_TTL_SECONDS, CACHE_TTL_SECONDS["weather"] - age)
+
+    response_cache._cache.set(key, entry, age=entry["ttl"] + 1)
+    assert lookup_response(key) is None
+    assert len(response_cache._cache) == 0
+
+
+def test_uncacheable_response_not_stored():
+    key = response_key("météo lisbonne", "weather", "LIS", None, None)
+    store_response(key, RESPONSE, {"weather": {"status": "error", "error": "HTTP 503"}})
+    assert lookup_response(key) is None
+
+
+def test_disabled(monkeypatch):
+    monkeypatch.setattr(response_cache, "AGENT_RESPONSE_CACHE_ENABLED", False)
+    key = response_key("bonjour", "chat", None, None, None)
+    store_response(key, RESPONSE, {})
+    assert len(response_cache._cache) == 0
+    assert lookup_response(key) is None
@@ -0,0 +1,81 @@
+"""
+État de session multi-tours: TTL glissant, résultats de tools réutilisés tant qu'ils sont frais.
+"""
+import pytest
+
+from app.agent import session
+from app.agent.session import load_session, remember_result, reusable_result, save_session
+from app.mcp.service import CACHE_TTL_SECONDS
+
+PARAMS = {"from": "CDG", "to": "LIS", "month": "2027-03"}
+OK = {"status": "ok", "cheapest_price": "89 €"}
+
+
+@pytest.fixture(autouse=True)
+def clean_sessions():
+    session._sessions.clear()
+
+
+def test_no_session_without_id():
+    assert load_session(None) is None
+    assert load_session("") is None
+    save_session(None, {"turns": 0})
+    assert len(session._sessions) == 0
+
+
+def test_save_then_load():
+    state = load_session("s1")
+    assert state["turns"] == 0 and state["tool_results"] == {}
+    state["destination"] = "LIS"
+    save_session("s1", state)
+
+    again = load_session("s1")
+    assert again["destination"] == "LIS" and again["turns"] == 1
+    assert load_session("s2")["destination"] is None
+
+
+def test_expired_session_starts_over():
+    state = load_session("s1")
+    state["destination"] = "LIS"
+    save_session("s1", state)
+    session._sessions.set("s1", state, age=session.AGENT_SESSION_TTL_SECONDS + 1)
+
+    assert load_session("s1")["destination"] is None
+
+
+def test_save_slides_the_ttl():
+    state = load_session("s1")
+    session._sessions.set("s1", state, age=session.AGENT_SESSION_TTL_SECONDS - 1)
+    save_session("s1", load_session("s1"))
+    _, age, _ = session._sessions.get("s1")
+    assert age < 1
+
+
+def test_only_ok_results_are_remembered():
+    state = load_session("s1")
+    remember_result(state, "flights", PARAMS, {"status": "error", "error": "HTTP 503"})
+    assert reusable_result(state, "flights", PARAMS) is None
+
+    remember_result(state, "flights", PARAMS, OK)
+    assert reusable_result(state, "flights", PARAMS) is OK
+    remember_result(None, "flights", PARAMS, OK)  # sans session: rien à faire
+
+
+def test_reuse_needs_same_params():
+    state = load_session("s1")
+    remember_result(state, "flights", PARAMS, OK)
+    assert reusable_result(state, "flights", {**PARAMS, "month": "2027-04"}) is None
+    assert reusable_result(state, "hotels", PARAMS) is None
+    assert reusable_result(None, "flights", PARAMS) is None
+
+
+@pytest.mark.parametrize("name,tool", [("flights", "flights"), ("flights_batch", "flights"), ("weather", "weather")])
+def test_reuse_follows_tool_freshness(name, tool):
+    state = load_session("s1")
+    remember_result(state, name, PARAMS, OK)
+    entry = state["tool_results"][name]
+
+    entry["fetched_at"] -= CACHE_TTL_SECONDS[tool] - 5
+    assert reusable_result(state, name, PARAMS) is OK
+    entry["fetched_at"] -= 10
+    assert reusable_result(state, name, PARAMS) is None
@@ -0,0 +1,120 @@
+"""
+SingleFlight: appels identiques simultanés regroupés, erreur partagée, annulation d'un appelant.
+"""
+import asyncio
+import gc
+
+import pytest
+
+from app.mcp.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"status": "ok"}
+
+    async def scenario():
+        results = await asyncio.gather(*(flight.do("k", fetch) for _ in range(5)))
+        return results
+
+    results = asyncio.run(scenario())
+
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
+    assert flight.stats() == {"in_flight": 0, "executions": 1, "saved_calls": 4}
+
+
+def test_distinct_keys_run_separately():
+    flight = SingleFlight()
+
+    async def scenario():
+        return await asyncio.gather(
+            flight.do("a", lambda: asyncio.sleep(0, "a")),
+            flight.do("b", lambda: asyncio.sleep(0, "b")),
+        )
+
+    assert asyncio.run(scenario()) == ["a", "b"]
+    assert flight.executions == 2 and flight.saved == 0
+
+
+def test_sequential_calls_run_again():
+    flight = SingleFlight()
+
+    async def scenario():
+        await flight.do("k", lambda: asyncio.sleep(0, 1))
+        assert not flight.in_flight("k")
+        await flight.do("k", lambda: asyncio.sleep(0, 2))
+
+    asyncio.run(scenario())
+    assert flight.executions == 2
+
+
+def test_error_shared_by_all_callers():
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    async def scenario():
+        return await asyncio.gather(*(flight.do("k", fetch) for _ in range(3)), return_exceptions=True)
+
+    errors = asyncio.run(scenario())
+
+    assert all(isinstance(e, RuntimeError) for e in errors)
+    assert flight.executions == 1
+    assert not flight.in_flight("k")
+
+
+def test_cancelled_caller_does_not_cancel_shared_fetch():
+    flight = SingleFlight()
+    started = []
+
+    async def fetch():
+        started.append(1)
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def scenario():
+        first = asyncio.create_task(flight.do("k", fetch))
+        second = asyncio.create_task(flight.do("k", fetch))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        assert flight.in_flight("k")
+        return await second
+
+    assert asyncio.run(scenario()) == "done"
+    assert len(started) == 1
+
+
+def test_fetch_finishes_when_every_caller_gives_up():
+    flight = SingleFlight()
+    finished = []
+    unhandled = []
+
+    async def fetch():
+        await asyncio.sleep(0.02)
+        finished.append(1)
+        raise RuntimeError("nobody is listening")
+
+    async def scenario():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: unhandled.append(context))
+        try:
+            await asyncio.wait_for(flight.do("k", fetch), 0.005)
+        except asyncio.TimeoutError:
+            pass
+        await asyncio.sleep(0.05)
+        gc.collect()
+
+    asyncio.run(scenario())
+    assert finished == [1]
+    # l'erreur a été lue par le callback: pas de "Task exception was never retrieved"
+    assert unhandled == []
+    assert not flight.in_flight("k")